@@ -1,6 +1,8 @@
 """Agents package."""
 from agents.base_agent import BaseAgent, AgentResult, AgentStatus
-from agents.constraint_agent import ConstraintAgent
+from agents.constraint_agent import ConstraintAgent, IncrementalValidator
+from agents.optimizer_agent import OptimizerAgent
+from agents.repair_agent import RepairAgent
 from agents.timetable_agent import TimetableAgent
 
 __all__ = [
@@ -8,5 +10,8 @@ __all__ = [
     "AgentResult",
     "AgentStatus",
     "ConstraintAgent",
+    "IncrementalValidator",
+    "OptimizerAgent",
+    "RepairAgent",
     "TimetableAgent",
 ]
@@ -0,0 +1,213 @@
+"""Columnar (NumPy) form of schedule entries for bulk validation."""
+from typing import Any, Dict, List
+
+import numpy as np
+
+from agents.problem import to_minutes
+
+RESOURCE_KINDS = ("faculty", "classroom", "section")
+
+
+def _factorize(values: np.ndarray) -> tuple:
+    """
+    Integer codes for an array of values, numbered in order of first appearance.
+
+    Returns:
+        (codes, uniques) where uniques[codes[i]] == values[i]
+    """
+    uniques, first, codes = np.unique(values, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[codes.reshape(-1)], uniques[order]
+
+
+def _encode(values: List[Any]) -> tuple:
+    """
+    Integer codes for hashable labels, numbered in order of first appearance.
+
+    A dict lookup per value is cheaper than sorting an array of strings.
+
+    Returns:
+        (codes, labels) where labels[codes[i]] == values[i]
+    """
+    table: Dict[Any, int] = {}
+    codes = np.fromiter(
+        (table.setdefault(value, len(table)) for value in values), dtype=np.int64, count=len(values)
+    )
+    labels = np.empty(len(table), dtype=object)
+    labels[:] = list(table)
+    return codes, labels
+
+
+def _parse_clock(values: List[Any]) -> np.ndarray:
+    """Minutes since midnight per value, -1 where the time cannot be parsed."""
+    codes, clocks = _encode(values)
+    minutes = np.empty(len(clocks), dtype=np.int64)
+    for i, clock in enumerate(clocks):
+        try:
+            minutes[i] = to_minutes(clock)
+        except (AttributeError, ValueError):
+            minutes[i] = -1
+    return minutes[codes]
+
+
+class ColumnarSchedule:
+    """
+    Schedule entries converted once into integer-coded NumPy columns.
+
+    Resource IDs and days are coded in order of first appearance, so the
+    checks report in the same order as the per-entry Python checks in
+    ConstraintAgent and produce the same results.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        self.size = len(entries)
+
+        self.day, self.days = _encode([e.get("day") for e in entries])
+        self.start_time = [e.get("start_time") for e in entries]
+        self.end_time = [e.get("end_time") for e in entries]
+        self.start = _parse_clock(self.start_time)
+        self.end = _parse_clock(self.end_time)
+        self.timed = (self.start >= 0) & (self.end >= 0)
+
+        # Per kind: codes per entry (-1 where the entry has no such resource) and the IDs
+        self.codes: Dict[str, np.ndarray] = {}
+        self.ids: Dict[str, np.ndarray] = {}
+        for kind in RESOURCE_KINDS:
+            key = f"{kind}_id"
+            codes, ids = _encode([e.get(key) or e.get(kind, {}).get("id") or None for e in entries])
+            # None marks a missing resource; drop it from the code space
+            missing = [i for i, resource_id in enumerate(ids) if resource_id is None]
+            if missing:
+                gap = missing[0]
+                codes = np.where(codes == gap, -1, codes - (codes > gap))
+                ids = np.delete(ids, gap)
+            self.codes[kind] = codes
+            self.ids[kind] = ids
+
+        self.capacity = np.asarray(
+            [e.get("classroom", {}).get("capacity", 999) for e in entries], dtype=np.int64
+        )
+        self.section_size = np.asarray(
+            [e.get("section", {}).get("num_students", 0) for e in entries], dtype=np.int64
+        )
+
+    def _sweep_groups(self, kind: str, rows: np.ndarray, end: np.ndarray = None) -> tuple:
+        """
+        Sort rows by (resource, day, start) and track each group's running maximum end.
+
+        Offsetting each group past the latest end keeps earlier groups from
+        leaking into the running maximum.
+
+        Args:
+            rows: Entry indices to sweep
+            end: End minutes to use per entry instead of the parsed end times
+
+        Returns:
+            (rows, group, keys, running_end) with rows in sorted order, where
+            keys[group] == resource code * number of days + day code
+        """
+        end = self.end if end is None else end
+        group, keys = _factorize(self.codes[kind][rows] * len(self.days) + self.day[rows])
+        order = np.lexsort((end[rows], self.start[rows], group))
+        rows, group = rows[order], group[order]
+        end = end[rows]
+        span = int(end.max()) + 1
+        running_end = np.maximum.accumulate(group * span + end) - group * span
+        return rows, group, keys, running_end
+
+    def double_bookings(self, kind: str) -> List[tuple]:
+        """
+        Overlapping bookings per resource and day, found with a vectorized sweep.
+
+        After sorting by (resource, day, start), a running maximum of the end
+        time within each group marks where a new overlap group begins; group
+        sizes then come from bincount.
+
+        Returns:
+            (resource_id, slot_key, entry indices) per overlapping group
+        """
+        codes = self.codes[kind]
+        rows = np.flatnonzero((codes >= 0) & self.timed)
+        if len(rows) < 2:
+            return []
+
+        # (resource, day) groups numbered by first appearance
+        rows, group, _, running_end = self._sweep_groups(kind, rows)
+        start, end = self.start[rows], self.end[rows]
+        new_group = np.ones(len(rows), dtype=bool)
+        new_group[1:] = (group[1:] != group[:-1]) | (start[1:] >= running_end[:-1])
+        cluster = np.cumsum(new_group) - 1
+
+        counts = np.bincount(cluster)
+        first = np.flatnonzero(new_group)
+        last = np.append(first[1:], len(rows)) - 1
+        clashing = np.flatnonzero(counts > 1)
+        if not len(clashing):
+            return []
+
+        # The end label comes from the first entry in the cluster reaching its maximum end
+        reaches_max = end == running_end[last][cluster]
+        last_end = np.full(len(counts), len(rows))
+        np.minimum.at(last_end, cluster[reaches_max], np.flatnonzero(reaches_max))
+
+        # Entry indices in ascending order within each cluster, sliced per cluster below
+        members = rows[np.lexsort((rows, cluster))].tolist()
+
+        ids = self.ids[kind]
+        conflicts = []
+        for c in clashing:
+            head, tail = rows[first[c]], rows[last_end[c]]
+            slot_key = f"{self.days[self.day[head]]}_{self.start_time[head]}_{self.end_time[tail]}"
+            conflicts.append((ids[codes[head]], slot_key, members[first[c]:last[c] + 1]))
+        return conflicts
+
+    def capacity_violations(self) -> List[tuple]:
+        """(entry index, section_size, capacity) for every entry whose section outgrows its room."""
+        rows = np.flatnonzero(self.section_size > self.capacity)
+        return list(zip(
+            rows.tolist(), self.section_size[rows].tolist(), self.capacity[rows].tolist(),
+            strict=True
+        ))
+
+    def faculty_days(self) -> List[tuple]:
+        """
+        Teaching time per faculty member and day, from runs of back-to-back classes.
+
+        Classes that overlap or touch form one run, so overlapping bookings
+        are not counted twice; a class ending before it starts counts as empty.
+
+        Returns:
+            (faculty_id, day, minutes, longest run start, longest run end) per
+            faculty member and day, in order of first appearance
+        """
+        codes = self.codes["faculty"]
+        rows = np.flatnonzero((codes >= 0) & self.timed)
+        if not len(rows):
+            return []
+
+        rows, group, keys, running_end = self._sweep_groups(
+            "faculty", rows, np.maximum(self.start, self.end)
+        )
+        start = self.start[rows]
+        new_run = np.ones(len(rows), dtype=bool)
+        new_run[1:] = (group[1:] != group[:-1]) | (start[1:] > running_end[:-1])
+        first = np.flatnonzero(new_run)
+        last = np.append(first[1:], len(rows)) - 1
+        run_group, run_start, run_end = group[first], start[first], running_end[last]
+        run_length = run_end - run_start
+
+        minutes = np.bincount(run_group, weights=run_length).astype(np.int64)
+        # Longest run per group, the earliest one on ties
+        order = np.lexsort((-run_length, run_group))
+        longest = order[np.flatnonzero(np.diff(run_group[order], prepend=-1))]
+
+        n_days = len(self.days)
+        faculty_ids = self.ids["faculty"][keys // n_days].tolist()
+        days = self.days[keys % n_days].tolist()
+        return list(zip(
+            faculty_ids, days, minutes.tolist(),
+            run_start[longest].tolist(), run_end[longest].tolist(),
+            strict=True
+        ))
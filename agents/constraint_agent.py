@@ -1,8 +1,113 @@
 """Constraint validation agent."""
-from typing import Dict, Any, List
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, AsyncIterator, Callable, Iterable, Iterator, List, Optional
 from agents.base_agent import BaseAgent, AgentResult
+from agents.columnar import ColumnarSchedule, RESOURCE_KINDS
+from agents.problem import (
+    AvailabilityIndex, generate_time_slots, merge_runs, to_clock, to_dict, to_minutes
+)
+from agents.rules import Rule, RuleSet
+from agents.scoring import ScheduleScorer
+from config import settings
 from models import TimeSlot, Faculty, Subject, Classroom, Section, ScheduleEntry
 
+# Weekly teaching hours assumed for faculty without a max_hours_per_week
+MAX_RECOMMENDED_HOURS = 20
+
+# Record codes; "rule" records also carry the constraint_id of the broken rule
+VIOLATION_CODES = (
+    "faculty_conflict",
+    "classroom_conflict",
+    "section_conflict",
+    "faculty_unavailable",
+    "classroom_unavailable",
+    "capacity",
+    "rule",
+)
+WARNING_CODES = ("workload", "daily_load", "teaching_streak", "rule", "rule_error")
+
+
+class ViolationReport:
+    """
+    Counts of violation records by code, with the details of one page kept.
+    
+    Records are added one at a time and only those inside the page are
+    stored, so memory and response size stay bounded however many
+    violations a schedule has.
+    """
+    
+    def __init__(self, offset: int = 0, limit: Optional[int] = None, code: Optional[str] = None):
+        """
+        Args:
+            offset: Matching records to skip before the page starts
+            limit: Records kept; defaults to settings.violation_detail_limit
+            code: Only keep records with this code (all codes are still counted)
+        """
+        self.offset = max(offset, 0)
+        self.limit = settings.violation_detail_limit if limit is None else max(limit, 0)
+        self.code = code
+        self.counts: Counter = Counter()
+        self.records: List[Dict[str, Any]] = []
+        self.matched = 0
+        # Indices of every entry named by any record, kept or not
+        self.flagged_entries: set = set()
+    
+    @property
+    def total(self) -> int:
+        """Records added, over all codes."""
+        return sum(self.counts.values())
+    
+    @property
+    def truncated(self) -> bool:
+        """Whether matching records were left out of the page."""
+        return len(self.records) < self.matched
+    
+    def add(self, record: Dict[str, Any]) -> None:
+        self.counts[record["code"]] += 1
+        self.flagged_entries.update(record["entries"])
+        if self.code is not None and record["code"] != self.code:
+            return
+        if self.offset <= self.matched < self.offset + self.limit:
+            self.records.append(record)
+        self.matched += 1
+    
+    def extend(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.add(record)
+    
+    def part(self, before: Optional[int] = None) -> "ViolationReport":
+        """
+        Empty report for one check, storing at most limit of its records.
+        
+        Args:
+            before: Matching records of the checks merged ahead of this one.
+                If given, only the check's records that fall on this report's
+                page are kept; otherwise its first limit records are.
+        """
+        if before is None:
+            return ViolationReport(0, self.limit, self.code)
+        start = self.offset - before
+        if start < 0:
+            return ViolationReport(0, max(self.limit + start, 0), self.code)
+        return ViolationReport(start, self.limit, self.code)
+    
+    def covers(self, part: "ViolationReport") -> bool:
+        """Whether a part merged next holds every one of its records this page needs."""
+        first = max(self.offset - self.matched, 0)
+        last = min(self.offset + self.limit - self.matched, part.matched)
+        return first >= last or part.offset <= first and last <= part.offset + part.limit
+    
+    def merge(self, part: "ViolationReport") -> None:
+        """Add the records of a report from part(), as if they had been added here one by one."""
+        self.counts.update(part.counts)
+        self.flagged_entries |= part.flagged_entries
+        for position, record in enumerate(part.records, self.matched + part.offset):
+            if self.offset <= position < self.offset + self.limit:
+                self.records.append(record)
+        self.matched += part.matched
+
 
 class ConstraintAgent(BaseAgent):
     """Agent responsible for validating constraints."""
@@ -12,170 +117,932 @@ class ConstraintAgent(BaseAgent):
             name="ConstraintAgent",
             description="Validates hard and soft constraints in the timetable"
         )
+        self._executor: Optional[ThreadPoolExecutor] = None
     
     async def execute(self, input_data: Dict[str, Any]) -> AgentResult:
         """
         Validate all constraints in the proposed schedule.
         
         Args:
-            input_data: Contains schedule entries and constraint definitions
-            
+            input_data: Contains schedule entries and constraint definitions,
+                plus optional current faculty and classrooms for availability
+                checks (the records embedded in the entries are used otherwise)
+                and an optional columnar flag forcing the NumPy validator on
+                or off (by default it is used for large schedules). Optional
+                offset, limit and code select the page of detailed records
+                returned, and an optional concurrent flag runs the checks side
+                by side (by default it is used for large schedules)
+        
         Returns:
-            AgentResult with validation results
+            AgentResult with validation results: a page of violation and
+            warning records, counts per code of all of them, and the
+            soft-constraint score with its per-term breakdown
+        """
+        result = None
+        async for event in self.stream(input_data):
+            if event["event"] == "result":
+                result = event
+        return AgentResult(
+            success=result["success"], data=result["data"], message=result["message"]
+        )
+    
+    async def stream(self, input_data: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Validate a schedule, yielding each check's records as soon as it finishes.
+        
+        The shared indexes (booking groups or NumPy columns, compiled rules)
+        are built once, then every check reads them without changing them.
+        Index building and checks run in a thread pool, so a large validation
+        does not block the event loop; in concurrent mode the checks are all
+        submitted at once and finish in any order, otherwise they run one
+        after another, conflicts first. The final page and counts do not
+        depend on that order: each check keeps its own partial report, and
+        the parts are merged in a fixed order at the end. A part stores only
+        its check's first limit records, so for a deep offset the check the
+        page starts in is run again to keep the records of the page.
+        
+        Args:
+            input_data: As for execute
+        
+        Yields:
+            {"event": "check", "check", "violations", "warnings",
+            "violation_counts", "warning_counts"} per finished check, with up
+            to limit records of each kind, then {"event": "result",
+            "success", "message", "data"} with the data execute returns
         """
         schedule_entries = input_data.get("schedule_entries", [])
-        constraints = input_data.get("constraints", [])
         
-        violations = []
-        warnings = []
+        violations = ViolationReport(
+            input_data.get("offset", 0), input_data.get("limit"), input_data.get("code")
+        )
+        warnings = ViolationReport(violations.offset, violations.limit, violations.code)
         
-        # Run all validation checks
-        violations.extend(self._check_faculty_conflicts(schedule_entries))
-        violations.extend(self._check_classroom_conflicts(schedule_entries))
-        violations.extend(self._check_section_conflicts(schedule_entries))
-        violations.extend(self._check_faculty_availability(schedule_entries))
-        violations.extend(self._check_classroom_capacity(schedule_entries))
-        warnings.extend(self._check_workload_balance(schedule_entries))
-        warnings.extend(self._check_subject_distribution(schedule_entries))
+        checks = await self._off_loop(self._checks, input_data)
+        concurrent = input_data.get("concurrent")
+        if concurrent is None:
+            concurrent = len(schedule_entries) >= settings.concurrent_validation_threshold
         
-        success = len(violations) == 0
+        runs = (
+            self._off_loop(self._run_check, name, check, violations.part(), warnings.part())
+            for name, check in checks
+        )
+        parts = {}
+        extras = {}
+        for run in asyncio.as_completed(list(runs)) if concurrent else runs:
+            name, part_violations, part_warnings, extras[name] = await run
+            parts[name] = (part_violations, part_warnings)
+            yield self._check_event(name, part_violations, part_warnings, violations.limit)
         
-        return AgentResult(
-            success=success,
-            data={
-                "violations": violations,
-                "warnings": warnings,
+        for name, check in checks:
+            part_violations, part_warnings = parts[name]
+            if not (violations.covers(part_violations) and warnings.covers(part_warnings)):
+                _, part_violations, part_warnings, _ = await self._off_loop(
+                    self._run_check, name, check,
+                    violations.part(violations.matched), warnings.part(warnings.matched)
+                )
+            violations.merge(part_violations)
+            warnings.merge(part_warnings)
+        
+        yield {
+            "event": "result",
+            "success": violations.total == 0,
+            "message": f"Validated {len(schedule_entries)} schedule entries. "
+                       f"Found {violations.total} violations and {warnings.total} warnings.",
+            "data": {
+                "violations": violations.records,
+                "warnings": warnings.records,
+                "violation_counts": dict(violations.counts),
+                "warning_counts": dict(warnings.counts),
+                "violation_total": violations.total,
+                "warning_total": warnings.total,
+                "offset": violations.offset,
+                "limit": violations.limit,
+                "truncated": violations.truncated or warnings.truncated,
+                "workload": extras["workload"],
+                "score": extras["score"],
                 "total_entries": len(schedule_entries),
-                "valid_entries": len(schedule_entries) - len(violations)
-            },
-            message=f"Validated {len(schedule_entries)} schedule entries. "
-                   f"Found {len(violations)} violations and {len(warnings)} warnings."
-        )
+                "valid_entries": len(schedule_entries) - len(violations.flagged_entries)
+            }
+        }
     
-    def _check_faculty_conflicts(self, entries: List[Dict[str, Any]]) -> List[str]:
-        """Check for faculty double-booking."""
-        violations = []
-        faculty_schedule: Dict[str, List[Dict[str, Any]]] = {}
+    def _checks(self, input_data: Dict[str, Any]) -> List[tuple]:
+        """
+        Build the shared indexes once and list the checks that read them.
         
-        for entry in entries:
-            faculty_id = entry.get("faculty_id") or entry.get("faculty", {}).get("id")
-            if not faculty_id:
-                continue
-            
-            if faculty_id not in faculty_schedule:
-                faculty_schedule[faculty_id] = []
-            
-            slot_key = f"{entry.get('day')}_{entry.get('start_time')}_{entry.get('end_time')}"
-            
-            for existing in faculty_schedule[faculty_id]:
-                existing_key = f"{existing.get('day')}_{existing.get('start_time')}_{existing.get('end_time')}"
-                if slot_key == existing_key:
-                    violations.append(
-                        f"Faculty conflict: {faculty_id} assigned to multiple classes at {slot_key}"
-                    )
-            
-            faculty_schedule[faculty_id].append(entry)
+        Returns:
+            (name, check) in report order; each check fills a violations
+            and a warnings report and may return extra result data
+        """
+        entries = input_data.get("schedule_entries", [])
+        faculty = input_data.get("faculty")
+        classrooms = input_data.get("classrooms")
         
-        return violations
+        # Large schedules are converted once into NumPy columns and checked vectorized
+        columnar = input_data.get("columnar")
+        if columnar is None:
+            columnar = len(entries) >= settings.columnar_validation_threshold
+        columns = ColumnarSchedule(entries) if columnar else None
+        
+        # Double-booking and workload checks share one grouping pass
+        bookings = columns or self._collect_bookings(entries)
+        rules = RuleSet(input_data.get("constraints", []))
+        
+        return [
+            ("faculty_conflicts",
+             lambda v, w: v.extend(self._check_faculty_conflicts(entries, bookings))),
+            ("classroom_conflicts",
+             lambda v, w: v.extend(self._check_classroom_conflicts(entries, bookings))),
+            ("section_conflicts",
+             lambda v, w: v.extend(self._check_section_conflicts(entries, bookings))),
+            ("faculty_availability",
+             lambda v, w: v.extend(self._check_faculty_availability(entries, faculty))),
+            ("classroom_availability",
+             lambda v, w: v.extend(self._check_classroom_availability(entries, classrooms))),
+            ("capacity", lambda v, w: v.extend(self._check_classroom_capacity(entries, columns))),
+            ("workload", lambda v, w: self._check_workload(entries, bookings, faculty, w)),
+            # User-defined rules: hard ones are violations, soft ones warnings
+            ("custom_rules", lambda v, w: self._check_rules(entries, rules, v, w)),
+            # Soft-constraint quality, term by term
+            ("score", lambda v, w: ScheduleScorer(rules=rules).score(entries)),
+        ]
     
-    def _check_classroom_conflicts(self, entries: List[Dict[str, Any]]) -> List[str]:
-        """Check for classroom double-booking."""
-        violations = []
-        classroom_schedule: Dict[str, List[Dict[str, Any]]] = {}
+    def _run_check(
+        self,
+        name: str,
+        check: Callable,
+        part_violations: ViolationReport,
+        part_warnings: ViolationReport
+    ) -> tuple:
+        """Run one check into fresh partial reports; returns (name, violations, warnings, extra)."""
+        extra = check(part_violations, part_warnings)
+        return name, part_violations, part_warnings, extra
+    
+    async def _off_loop(self, func: Callable, *args: Any) -> Any:
+        """Run validation work in the check pool, or inline if validation_workers is 0."""
+        if settings.validation_workers <= 0:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Return the check pool, starting it on first use."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.validation_workers,
+                thread_name_prefix="constraint-check"
+            )
+        return self._executor
+    
+    def _check_event(
+        self,
+        name: str,
+        violations: ViolationReport,
+        warnings: ViolationReport,
+        limit: int
+    ) -> Dict[str, Any]:
+        """Stream event for a finished check, with its first limit records of each kind."""
+        return {
+            "event": "check",
+            "check": name,
+            "violations": violations.records[:limit],
+            "warnings": warnings.records[:limit],
+            "violation_counts": dict(violations.counts),
+            "warning_counts": dict(warnings.counts)
+        }
+    
+    def _record(
+        self,
+        code: str,
+        message: str,
+        resources: Optional[Dict[str, Any]] = None,
+        slot: Optional[str] = None,
+        entries: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """
+        One violation or warning.
         
-        for entry in entries:
-            classroom_id = entry.get("classroom_id") or entry.get("classroom", {}).get("id")
-            if not classroom_id:
+        Args:
+            code: One of VIOLATION_CODES or WARNING_CODES
+            message: Human-readable description
+            resources: Kind ("faculty", "classroom", ...) to ID of each resource involved
+            slot: "Day_HH:MM_HH:MM" slot key, if the record concerns a time
+            entries: Indices of the schedule entries involved
+        """
+        return {
+            "code": code,
+            "message": message,
+            "resources": resources or {},
+            "slot": slot,
+            "entries": entries or []
+        }
+    
+    def _slot_key(self, entry: Dict[str, Any]) -> str:
+        return f"{entry.get('day')}_{entry.get('start_time')}_{entry.get('end_time')}"
+    
+    def _collect_bookings(
+        self,
+        entries: List[Dict[str, Any]]
+    ) -> Dict[str, Dict[tuple, List[tuple]]]:
+        """
+        Group booked intervals per (resource, day) for faculty, classrooms and sections.
+        
+        Times are converted once to minutes since midnight. Entries without a
+        parseable start and end time occupy no interval and cannot clash.
+        
+        Returns:
+            {kind: {(resource_id, day): [(start, end, start_time, end_time, entry index)]}}
+        """
+        bookings = {"faculty": {}, "classroom": {}, "section": {}}
+        
+        for i, entry in enumerate(entries):
+            interval = self._interval(entry)
+            if interval is None:
                 continue
+            day = entry.get("day")
             
-            if classroom_id not in classroom_schedule:
-                classroom_schedule[classroom_id] = []
-            
-            slot_key = f"{entry.get('day')}_{entry.get('start_time')}_{entry.get('end_time')}"
-            
-            for existing in classroom_schedule[classroom_id]:
-                existing_key = f"{existing.get('day')}_{existing.get('start_time')}_{existing.get('end_time')}"
-                if slot_key == existing_key:
-                    violations.append(
-                        f"Classroom conflict: {classroom_id} double-booked at {slot_key}"
-                    )
-            
-            classroom_schedule[classroom_id].append(entry)
+            for kind, groups in bookings.items():
+                resource_id = self._resource_id(entry, kind)
+                if resource_id:
+                    groups.setdefault((resource_id, day), []).append((*interval, i))
         
-        return violations
+        return bookings
     
-    def _check_section_conflicts(self, entries: List[Dict[str, Any]]) -> List[str]:
-        """Check for section double-booking."""
-        violations = []
-        section_schedule: Dict[str, List[Dict[str, Any]]] = {}
+    def _resource_id(self, entry: Dict[str, Any], kind: str) -> Any:
+        """ID of an entry's faculty, classroom or section, flat or embedded."""
+        return entry.get(f"{kind}_id") or entry.get(kind, {}).get("id")
+    
+    def _interval(self, entry: Dict[str, Any]) -> Optional[tuple]:
+        """(start, end, start_time, end_time) in minutes since midnight, or None if unparseable."""
+        start_time = entry.get("start_time")
+        end_time = entry.get("end_time")
+        try:
+            return (to_minutes(start_time), to_minutes(end_time), start_time, end_time)
+        except (AttributeError, ValueError):
+            return None
+    
+    def _double_bookings(
+        self,
+        entries: List[Dict[str, Any]],
+        kind: str,
+        bookings: Optional[Any] = None
+    ) -> List[tuple]:
+        """
+        Find groups of overlapping bookings with a sweep over each resource's day.
         
-        for entry in entries:
-            section_id = entry.get("section_id") or entry.get("section", {}).get("id")
-            if not section_id:
-                continue
-            
-            if section_id not in section_schedule:
-                section_schedule[section_id] = []
-            
-            slot_key = f"{entry.get('day')}_{entry.get('start_time')}_{entry.get('end_time')}"
-            
-            for existing in section_schedule[section_id]:
-                existing_key = f"{existing.get('day')}_{existing.get('start_time')}_{existing.get('end_time')}"
-                if slot_key == existing_key:
-                    violations.append(
-                        f"Section conflict: {section_id} has multiple classes at {slot_key}"
-                    )
-            
-            section_schedule[section_id].append(entry)
+        Intervals are sorted by start; a booking that starts before the latest
+        end seen so far joins the current group. Touching intervals (one ends
+        when the next starts) do not overlap. Sorting dominates, so the check
+        is O(n log n) overall.
+        
+        bookings may also be a ColumnarSchedule, in which case its vectorized
+        sweep gives the same result.
+        
+        Returns:
+            (resource_id, slot_key, entry indices) per overlapping group, where
+            slot_key spans the group from its first start to its last end
+        """
+        if isinstance(bookings, ColumnarSchedule):
+            return bookings.double_bookings(kind)
+        if bookings is None:
+            bookings = self._collect_bookings(entries)
+        
+        conflicts = []
+        for (resource_id, day), intervals in bookings[kind].items():
+            if len(intervals) > 1:
+                conflicts.extend(self._sweep(resource_id, day, intervals))
         
-        return violations
+        return conflicts
+    
+    def _sweep(self, resource_id: Any, day: Any, intervals: List[tuple]) -> List[tuple]:
+        """Overlapping groups among one resource's intervals on one day."""
+        conflicts = []
+        intervals = sorted(intervals)
+        _, group_end, start_time, end_time, index = intervals[0]
+        group = [index]
+        for start, end, next_start_time, next_end_time, next_index in intervals[1:]:
+            if start < group_end:
+                group.append(next_index)
+                if end > group_end:
+                    group_end, end_time = end, next_end_time
+                continue
+            if len(group) > 1:
+                conflicts.append((resource_id, f"{day}_{start_time}_{end_time}", sorted(group)))
+            group_end, start_time, end_time = end, next_start_time, next_end_time
+            group = [next_index]
+        if len(group) > 1:
+            conflicts.append((resource_id, f"{day}_{start_time}_{end_time}", sorted(group)))
+        return conflicts
+    
+    def _conflict_message(self, kind: str, resource_id: Any, slot_key: str, count: int) -> str:
+        """Violation text for a group of overlapping bookings of one resource."""
+        if kind == "faculty":
+            return f"Faculty conflict: {resource_id} assigned to {count} classes at {slot_key}"
+        if kind == "classroom":
+            return (
+                f"Classroom conflict: {resource_id} double-booked at {slot_key} ({count} classes)"
+            )
+        return f"Section conflict: {resource_id} has {count} classes at {slot_key}"
+    
+    def _conflict_record(
+        self,
+        kind: str,
+        resource_id: Any,
+        slot_key: str,
+        entries: List[int]
+    ) -> Dict[str, Any]:
+        return self._record(
+            f"{kind}_conflict",
+            self._conflict_message(kind, resource_id, slot_key, len(entries)),
+            {kind: resource_id},
+            slot_key,
+            entries
+        )
     
-    def _check_faculty_availability(self, entries: List[Dict[str, Any]]) -> List[str]:
+    def _check_faculty_conflicts(
+        self,
+        entries: List[Dict[str, Any]],
+        bookings: Optional[Any] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Check for faculty double-booking."""
+        for faculty_id, slot_key, indices in self._double_bookings(entries, "faculty", bookings):
+            yield self._conflict_record("faculty", faculty_id, slot_key, indices)
+    
+    def _check_classroom_conflicts(
+        self,
+        entries: List[Dict[str, Any]],
+        bookings: Optional[Any] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Check for classroom double-booking."""
+        for classroom_id, slot_key, indices in self._double_bookings(
+            entries, "classroom", bookings
+        ):
+            yield self._conflict_record("classroom", classroom_id, slot_key, indices)
+    
+    def _check_section_conflicts(
+        self,
+        entries: List[Dict[str, Any]],
+        bookings: Optional[Any] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Check for section double-booking."""
+        for section_id, slot_key, indices in self._double_bookings(entries, "section", bookings):
+            yield self._conflict_record("section", section_id, slot_key, indices)
+    
+    def _check_faculty_availability(
+        self,
+        entries: List[Dict[str, Any]],
+        faculty: Optional[List[Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
         """Check if faculty are assigned during unavailable slots."""
-        violations = []
-        # This would check against faculty unavailable_slots
-        # Implementation depends on how unavailable slots are stored
-        return violations
+        return self._check_availability(entries, "faculty", faculty)
     
-    def _check_classroom_capacity(self, entries: List[Dict[str, Any]]) -> List[str]:
+    def _check_classroom_availability(
+        self,
+        entries: List[Dict[str, Any]],
+        classrooms: Optional[List[Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Check if classrooms are booked during unavailable slots."""
+        return self._check_availability(entries, "classroom", classrooms)
+    
+    def _check_availability(
+        self,
+        entries: List[Dict[str, Any]],
+        kind: str,
+        records: Optional[List[Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Check entries against compiled unavailability masks, one bit test per entry."""
+        index = self._availability_index(entries, kind, records)
+        if not index.intervals:
+            return
+        
+        for i, entry in enumerate(entries):
+            violation = self._availability_violation(index, entry, kind, i)
+            if violation:
+                yield violation
+    
+    def _availability_index(
+        self,
+        entries: List[Dict[str, Any]],
+        kind: str,
+        records: Optional[List[Any]] = None
+    ) -> AvailabilityIndex:
+        """
+        Compile unavailability for faculty or classrooms.
+        
+        Uses the records embedded in the entries if none are given.
+        """
+        if records is None:
+            embedded = {}
+            for entry in entries:
+                record = entry.get(kind) or {}
+                embedded.setdefault(record.get("id"), record)
+            records = list(embedded.values())
+        
+        return AvailabilityIndex([to_dict(r) for r in records], generate_time_slots())
+    
+    def _availability_violation(
+        self,
+        index: AvailabilityIndex,
+        entry: Dict[str, Any],
+        kind: str,
+        entry_index: int
+    ) -> Optional[Dict[str, Any]]:
+        """Violation record if the entry books its faculty or classroom while unavailable."""
+        resource_id = self._resource_id(entry, kind)
+        if not resource_id:
+            return None
+        
+        day, start_time, end_time = entry.get("day"), entry.get("start_time"), entry.get("end_time")
+        if index.is_blocked(resource_id, day, start_time, end_time):
+            slot_key = self._slot_key(entry)
+            return self._record(
+                f"{kind}_unavailable",
+                f"Availability violation: {kind.capitalize()} {resource_id} "
+                f"is unavailable at {slot_key}",
+                {kind: resource_id},
+                slot_key,
+                [entry_index]
+            )
+        return None
+    
+    def _check_classroom_capacity(
+        self,
+        entries: List[Dict[str, Any]],
+        columns: ColumnarSchedule = None
+    ) -> Iterator[Dict[str, Any]]:
         """Check if classroom capacity matches section size."""
-        violations = []
+        if columns is not None:
+            for i, section_size, classroom_capacity in columns.capacity_violations():
+                yield self._capacity_record(entries[i], i, section_size, classroom_capacity)
+            return
         
-        for entry in entries:
-            classroom_capacity = entry.get("classroom", {}).get("capacity", 999)
-            section_size = entry.get("section", {}).get("num_students", 0)
-            
-            if section_size > classroom_capacity:
-                violations.append(
-                    f"Capacity violation: Section with {section_size} students "
-                    f"assigned to classroom with capacity {classroom_capacity}"
+        for i, entry in enumerate(entries):
+            violation = self._capacity_violation(entry, i)
+            if violation:
+                yield violation
+    
+    def _capacity_violation(
+        self,
+        entry: Dict[str, Any],
+        entry_index: int
+    ) -> Optional[Dict[str, Any]]:
+        """Violation record if the entry's section does not fit its classroom."""
+        classroom_capacity = entry.get("classroom", {}).get("capacity", 999)
+        section_size = entry.get("section", {}).get("num_students", 0)
+        if section_size > classroom_capacity:
+            return self._capacity_record(entry, entry_index, section_size, classroom_capacity)
+        return None
+    
+    def _capacity_record(
+        self,
+        entry: Dict[str, Any],
+        entry_index: int,
+        section_size: int,
+        classroom_capacity: int
+    ) -> Dict[str, Any]:
+        return self._record(
+            "capacity",
+            f"Capacity violation: Section with {section_size} students "
+            f"assigned to classroom with capacity {classroom_capacity}",
+            {
+                "section": self._resource_id(entry, "section"),
+                "classroom": self._resource_id(entry, "classroom")
+            },
+            self._slot_key(entry),
+            [entry_index]
+        )
+    
+    def _faculty_limits(
+        self,
+        entries: List[Dict[str, Any]],
+        faculty: Optional[List[Any]] = None
+    ) -> Dict[Any, int]:
+        """
+        Weekly teaching limit in minutes per faculty member.
+        
+        Uses the records embedded in the entries if none are given.
+        """
+        if faculty is None:
+            faculty = [entry.get("faculty") or {} for entry in entries]
+        
+        limits = {}
+        for record in faculty:
+            record = to_dict(record)
+            hours = record.get("max_hours_per_week")
+            hours = MAX_RECOMMENDED_HOURS if hours is None else hours
+            limits.setdefault(record.get("id"), hours * 60)
+        return limits
+    
+    def _day_load(self, intervals: List[tuple]) -> tuple:
+        """
+        Teaching time of one faculty member on one day.
+        
+        Classes that overlap or touch form one run, so overlapping bookings
+        are not counted twice; a class ending before it starts counts as empty.
+        
+        Returns:
+            (minutes, longest run start, longest run end)
+        """
+        runs = merge_runs([(start, max(start, end), *rest) for start, end, *rest in intervals])
+        longest = max(runs, key=lambda run: run[1] - run[0])
+        return sum(end - start for start, end, _ in runs), longest[0], longest[1]
+    
+    def _faculty_workload(
+        self,
+        entries: List[Dict[str, Any]],
+        bookings: Any,
+        faculty: Optional[List[Any]] = None
+    ) -> Dict[Any, Dict[str, Any]]:
+        """
+        Teaching time per faculty member, aggregated in one pass over their booked days.
+        
+        Args:
+            entries: Schedule entries
+            bookings: Grouped bookings from _collect_bookings, or a ColumnarSchedule
+            faculty: Current faculty records for limits (embedded records otherwise)
+        
+        Returns:
+            {faculty_id: {"minutes", "limit",
+            "days": {day: (minutes, longest run start, longest run end)}}}
+        """
+        if isinstance(bookings, ColumnarSchedule):
+            faculty_days = bookings.faculty_days()
+        else:
+            faculty_days = [
+                (faculty_id, day, *self._day_load(intervals))
+                for (faculty_id, day), intervals in bookings["faculty"].items()
+            ]
+        
+        limits = self._faculty_limits(entries, faculty)
+        workload = {}
+        for faculty_id, day, minutes, run_start, run_end in faculty_days:
+            load = workload.get(faculty_id)
+            if load is None:
+                load = workload[faculty_id] = {
+                    "minutes": 0,
+                    "limit": limits.get(faculty_id, MAX_RECOMMENDED_HOURS * 60),
+                    "days": {}
+                }
+            load["minutes"] += minutes
+            load["days"][day] = (minutes, run_start, run_end)
+        return workload
+    
+    def _workload_summary(self, workload: Dict[Any, Dict[str, Any]]) -> Dict[Any, Dict[str, Any]]:
+        """Weekly hours, limit, daily peak and longest streak per faculty member."""
+        summary = {}
+        for faculty_id, load in workload.items():
+            peak_day, (peak, _, _) = max(load["days"].items(), key=lambda item: item[1][0])
+            summary[faculty_id] = {
+                "hours": self._hours(load["minutes"]),
+                "max_hours": self._hours(load["limit"]),
+                "peak_day": peak_day,
+                "peak_hours": self._hours(peak),
+                "longest_streak_hours": self._hours(
+                    max(end - start for _, start, end in load["days"].values())
                 )
+            }
+        return summary
+    
+    def _hours(self, minutes: float) -> float:
+        return round(minutes / 60, 2)
+    
+    def _check_workload(
+        self,
+        entries: List[Dict[str, Any]],
+        bookings: Any,
+        faculty: List[Any],
+        warnings: ViolationReport
+    ) -> Dict[Any, Dict[str, Any]]:
+        """Add workload warnings to a report and return the per-faculty summary."""
+        workload = self._faculty_workload(entries, bookings, faculty)
+        warnings.extend(self._check_workload_balance(workload))
+        return self._workload_summary(workload)
+    
+    def _check_workload_balance(
+        self,
+        workload: Dict[Any, Dict[str, Any]]
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Check weekly teaching time against each faculty member's limit, and
+        daily peaks and streaks (soft constraint).
+        """
+        for faculty_id, load in workload.items():
+            if load["minutes"] > load["limit"]:
+                yield self._workload_record(faculty_id, load["minutes"], load["limit"])
+            for day, (minutes, run_start, run_end) in load["days"].items():
+                yield from self._day_load_records(faculty_id, day, minutes, run_start, run_end)
+    
+    def _workload_record(self, faculty_id: Any, minutes: int, limit: int) -> Dict[str, Any]:
+        return self._record(
+            "workload",
+            f"Workload warning: Faculty {faculty_id} has {self._hours(minutes):g} teaching hours "
+            f"(max {self._hours(limit):g})",
+            {"faculty": faculty_id}
+        )
+    
+    def _day_load_records(
+        self,
+        faculty_id: Any,
+        day: Any,
+        minutes: int,
+        run_start: int,
+        run_end: int
+    ) -> List[Dict[str, Any]]:
+        """Warnings for a faculty member's day that is too long or has too long a streak."""
+        records = []
+        if minutes > settings.max_daily_teaching_hours * 60:
+            records.append(self._record(
+                "daily_load",
+                f"Workload warning: Faculty {faculty_id} teaches {self._hours(minutes):g} hours "
+                f"on {day} (max {settings.max_daily_teaching_hours:g} per day)",
+                {"faculty": faculty_id}
+            ))
+        if run_end - run_start > settings.max_teaching_streak_hours * 60:
+            records.append(self._record(
+                "teaching_streak",
+                f"Workload warning: Faculty {faculty_id} teaches "
+                f"{self._hours(run_end - run_start):g} consecutive hours on {day} "
+                f"(max {settings.max_teaching_streak_hours:g})",
+                {"faculty": faculty_id},
+                f"{day}_{to_clock(run_start)}_{to_clock(run_end)}"
+            ))
+        return records
+    
+    def _check_custom_rules(self, entries: List[Dict[str, Any]], rules: RuleSet) -> Iterator[tuple]:
+        """
+        Check entries against rules compiled from constraint parameters.
+        
+        Yields:
+            (hard, record): hard rules give violations, soft rules and
+            malformed constraints give warnings
+        """
+        for error in rules.errors:
+            yield False, self._record("rule_error", error)
+        if not rules:
+            return
         
-        return violations
+        for i, entry in enumerate(entries):
+            for rule, message, location in rules.entry_violations(entry):
+                yield rule.hard, self._rule_record(rule, message, location, [i])
+        for rule, message, location in rules.schedule_violations(entries):
+            yield rule.hard, self._rule_record(rule, message, location)
     
-    def _check_workload_balance(self, entries: List[Dict[str, Any]]) -> List[str]:
-        """Check for balanced workload distribution (soft constraint)."""
-        warnings = []
-        faculty_hours: Dict[str, int] = {}
+    def _check_rules(
+        self,
+        entries: List[Dict[str, Any]],
+        rules: RuleSet,
+        violations: ViolationReport,
+        warnings: ViolationReport
+    ) -> None:
+        for hard, record in self._check_custom_rules(entries, rules):
+            (violations if hard else warnings).add(record)
+    
+    def _rule_record(
+        self,
+        rule: Rule,
+        message: str,
+        location: Dict[str, Any],
+        entries: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """Record for a broken rule at a location given by RuleSet."""
+        if rule.hard:
+            message = f"Rule violation: {rule.name}: {message}"
+        else:
+            message = f"Rule warning: {rule.name}: {message} (penalty {rule.weight:g})"
+        record = self._record(
+            "rule",
+            message,
+            location["resources"],
+            location["slot"],
+            location.get("entries", entries)
+        )
+        record["constraint_id"] = rule.constraint_id
+        return record
+
+
+class IncrementalValidator:
+    """
+    Validation state for one timetable, updated per edit instead of rechecked.
+    
+    Seeded from a list of schedule entries, it keeps bookings per resource
+    and day, teaching minutes per faculty member and day, and the violations
+    each entry and each booking group contributes. An edit only revisits the edited entry's
+    faculty, classroom and section on that day, so its cost does not grow
+    with the size of the schedule. The checks and records are the ones
+    ConstraintAgent uses; record entry indices are the indices this
+    validator hands out.
+    """
+    
+    def __init__(
+        self,
+        entries: List[Dict[str, Any]],
+        faculty: Optional[List[Any]] = None,
+        classrooms: Optional[List[Any]] = None,
+        constraints: Optional[List[Any]] = None
+    ):
+        """
+        Args:
+            entries: Schedule entries to seed from
+            faculty: Current faculty records for availability checks
+            classrooms: Current classroom records for availability checks
+            constraints: Constraints whose rule parameters are checked
+        """
+        self.checker = ConstraintAgent()
+        self.rules = RuleSet(constraints)
+        self.entries: Dict[int, Dict[str, Any]] = {}
+        # Teaching minutes per faculty member, and per (faculty member, day)
+        self.faculty_minutes: Counter = Counter()
+        self._day_minutes: Dict[tuple, int] = {}
+        self._limits = self.checker._faculty_limits(entries, faculty)
+        self.violation_count = 0
+        self.warning_count = len(self.rules.errors)
+        self._next_index = 0
+        # kind -> (resource_id, day) -> {entry index: interval}
+        self._bookings: Dict[str, Dict[tuple, Dict[int, tuple]]] = {
+            kind: {} for kind in RESOURCE_KINDS
+        }
+        # (kind, resource_id, day) -> conflict records for that group
+        self._conflicts: Dict[tuple, List[Dict[str, Any]]] = {}
+        # Soft-rule warnings for the same groups
+        self._group_warnings: Dict[tuple, List[Dict[str, Any]]] = {}
+        # entry index -> availability, capacity and rule records for that entry
+        self._entry_violations: Dict[int, List[Dict[str, Any]]] = {}
+        self._entry_warnings: Dict[int, List[Dict[str, Any]]] = {}
+        self._availability = {
+            "faculty": self.checker._availability_index(entries, "faculty", faculty),
+            "classroom": self.checker._availability_index(entries, "classroom", classrooms)
+        }
         
+        # Seed without per-entry re-sweeps, then sweep every group once
         for entry in entries:
-            faculty_id = entry.get("faculty_id") or entry.get("faculty", {}).get("id")
-            if not faculty_id:
-                continue
-            
-            # Assuming 1-hour slots
-            faculty_hours[faculty_id] = faculty_hours.get(faculty_id, 0) + 1
+            self._insert(self._next_index, entry, recheck=False)
+            self._next_index += 1
+        for kind, groups in self._bookings.items():
+            for group in groups:
+                self._recheck_group(kind, group)
+    
+    @property
+    def is_valid(self) -> bool:
+        """Whether the current schedule has no hard-constraint violations."""
+        return self.violation_count == 0
+    
+    def add_entry(self, entry: Dict[str, Any]) -> int:
+        """
+        Add a schedule entry.
         
-        for faculty_id, hours in faculty_hours.items():
-            if hours > 20:
-                warnings.append(
-                    f"Workload warning: Faculty {faculty_id} has {hours} hours (max recommended: 20)"
-                )
+        Returns:
+            Index identifying the entry in later remove and move calls
+        """
+        index = self._next_index
+        self._next_index += 1
+        self._insert(index, entry)
+        return index
+    
+    def remove_entry(self, index: int) -> Dict[str, Any]:
+        """Remove an entry and return it."""
+        return self._delete(index)
+    
+    def move_entry(self, index: int, changes: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Change fields of an entry, e.g. day, start_time, end_time or classroom_id.
+        
+        Returns:
+            The updated entry, which keeps its index
+        """
+        entry = {**self._delete(index), **changes}
+        self._insert(index, entry)
+        return entry
+    
+    def violations(self) -> List[Dict[str, Any]]:
+        """All current violation records."""
+        return [
+            record
+            for records in (*self._conflicts.values(), *self._entry_violations.values())
+            for record in records
+        ]
+    
+    def warnings(self) -> List[Dict[str, Any]]:
+        """All current warning records."""
+        workload = [
+            self.checker._workload_record(faculty_id, minutes, self._limit(faculty_id))
+            for faculty_id, minutes in self.faculty_minutes.items()
+            if minutes > self._limit(faculty_id)
+        ]
+        errors = [self.checker._record("rule_error", error) for error in self.rules.errors]
+        return workload + errors + [
+            record
+            for records in (*self._group_warnings.values(), *self._entry_warnings.values())
+            for record in records
+        ]
+    
+    def _insert(self, index: int, entry: Dict[str, Any], recheck: bool = True) -> None:
+        self.entries[index] = entry
+        faculty_id = self.checker._resource_id(entry, "faculty")
+        if faculty_id and faculty_id not in self._limits:
+            self._limits.update(self.checker._faculty_limits([entry]))
+        for kind, availability in self._availability.items():
+            resource_id = self.checker._resource_id(entry, kind)
+            if resource_id and resource_id not in availability.known:
+                availability.add(to_dict(entry.get(kind) or {"id": resource_id}))
+        
+        interval = self.checker._interval(entry)
+        if interval is not None:
+            for kind in RESOURCE_KINDS:
+                resource_id = self.checker._resource_id(entry, kind)
+                if resource_id:
+                    group = (resource_id, entry.get("day"))
+                    self._bookings[kind].setdefault(group, {})[index] = (*interval, index)
+                    if recheck:
+                        self._recheck_group(kind, group)
+        
+        records = [
+            self.checker._availability_violation(self._availability[kind], entry, kind, index)
+            for kind in ("faculty", "classroom")
+        ]
+        records.append(self.checker._capacity_violation(entry, index))
+        records = [r for r in records if r]
+        soft = []
+        if self.rules:
+            for rule, message, location in self.rules.entry_violations(entry):
+                record = self.checker._rule_record(rule, message, location, [index])
+                (records if rule.hard else soft).append(record)
+        if records:
+            self._entry_violations[index] = records
+            self.violation_count += len(records)
+        if soft:
+            self._entry_warnings[index] = soft
+            self.warning_count += len(soft)
+    
+    def _delete(self, index: int) -> Dict[str, Any]:
+        entry = self.entries.pop(index)
+        
+        for kind in RESOURCE_KINDS:
+            resource_id = self.checker._resource_id(entry, kind)
+            group = (resource_id, entry.get("day"))
+            bookings = self._bookings[kind].get(group)
+            if bookings and bookings.pop(index, None) is not None:
+                if not bookings:
+                    del self._bookings[kind][group]
+                self._recheck_group(kind, group)
         
-        return warnings
+        self.violation_count -= len(self._entry_violations.pop(index, ()))
+        self.warning_count -= len(self._entry_warnings.pop(index, ()))
+        return entry
+    
+    def _recheck_group(self, kind: str, group: tuple) -> None:
+        """
+        Re-sweep one resource's bookings on one day, and re-check its
+        consecutive-hours rules and teaching load.
+        """
+        key = (kind, *group)
+        self.violation_count -= len(self._conflicts.pop(key, ()))
+        self.warning_count -= len(self._group_warnings.pop(key, ()))
+        
+        bookings = self._bookings[kind].get(group)
+        intervals = list(bookings.values()) if bookings else []
+        records = []
+        if len(intervals) > 1:
+            records = [
+                self.checker._conflict_record(kind, resource_id, slot_key, indices)
+                for resource_id, slot_key, indices in self.checker._sweep(*group, intervals)
+            ]
+        soft = []
+        if self.rules and kind in ("faculty", "section"):
+            for rule, message, location in self.rules.run_violations(kind, *group, intervals):
+                record = self.checker._rule_record(rule, message, location)
+                (records if rule.hard else soft).append(record)
+        if kind == "faculty":
+            soft.extend(self._recheck_load(*group, intervals))
+        if records:
+            self._conflicts[key] = records
+            self.violation_count += len(records)
+        if soft:
+            self._group_warnings[key] = soft
+            self.warning_count += len(soft)
+    
+    def _recheck_load(
+        self,
+        faculty_id: Any,
+        day: Any,
+        intervals: List[tuple]
+    ) -> List[Dict[str, Any]]:
+        """Update a faculty member's teaching time on one day and return its load warnings."""
+        old = self._day_minutes.pop((faculty_id, day), 0)
+        minutes = 0
+        records = []
+        if intervals:
+            minutes, run_start, run_end = self.checker._day_load(intervals)
+            self._day_minutes[(faculty_id, day)] = minutes
+            records = self.checker._day_load_records(faculty_id, day, minutes, run_start, run_end)
+        self._add_minutes(faculty_id, minutes - old)
+        return records
+    
+    def _limit(self, faculty_id: Any) -> int:
+        return self._limits.get(faculty_id, MAX_RECOMMENDED_HOURS * 60)
     
-    def _check_subject_distribution(self, entries: List[Dict[str, Any]]) -> List[str]:
-        """Check for good distribution of subjects across days (soft constraint)."""
-        warnings = []
-        # Could check for clustering of difficult subjects, etc.
-        return warnings
+    def _add_minutes(self, faculty_id: Any, minutes: int) -> None:
+        limit = self._limit(faculty_id)
+        was_over = self.faculty_minutes[faculty_id] > limit
+        self.faculty_minutes[faculty_id] += minutes
+        is_over = self.faculty_minutes[faculty_id] > limit
+        self.warning_count += is_over - was_over
+        if not self.faculty_minutes[faculty_id]:
+            del self.faculty_minutes[faculty_id]
@@ -0,0 +1,640 @@
+"""Exact timetable solver using forward checking and conflict-directed backjumping."""
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from agents.problem import SchedulingProblem, iter_bits
+
+
+class _Group:
+    """All weekly classes of one subject for one section."""
+
+    def __init__(
+        self,
+        section: Dict[str, Any],
+        subject: Dict[str, Any],
+        need: int,
+        faculty_ids: List[str],
+        room_type: Optional[str] = None,
+        room_families: Optional[List[Any]] = None
+    ):
+        self.section = section
+        self.section_id = section.get("id")
+        self.subject = subject
+        self.subject_id = subject.get("id")
+        self.need = need
+        self.faculty_ids = faculty_ids
+        self.size = section.get("num_students", 0)
+        # Room type the group is restricted to by a hard rule, None for any room
+        self.room_type = room_type
+        # Room buckets to branch over, each capacity-nested, in search order
+        self.room_families = room_families or [room_type]
+        self.domain = 0
+        # Pruned slot -> decision levels whose placements explain the removal
+        self.pruned: Dict[int, Set[int]] = {}
+        # (slot, faculty_id, classroom_id) for each class placed so far
+        self.placed: List[tuple] = []
+
+    @property
+    def remaining(self) -> int:
+        return self.need - len(self.placed)
+
+    def label(self) -> str:
+        return f"{self.subject_id} for section {self.section_id}"
+
+
+class _Frame:
+    """One decision level: placing the next class of a group."""
+
+    def __init__(self, group: _Group, values: List[tuple], conflict: Set[int]):
+        self.group = group
+        self.values = iter(values)
+        self.conflict = conflict
+        self.current: Optional[tuple] = None
+        self.trail: List[tuple] = []
+
+
+class _HoursFlow:
+    """
+    Transportation check between subject hours still needed and faculty hours left.
+
+    Flow runs subject -> faculty member. After each placement the flow is
+    patched locally and repaired with augmenting paths, so a check costs a
+    few small searches instead of a fresh max-flow.
+    """
+
+    def __init__(
+        self,
+        demand: Dict[str, int],
+        supply: Dict[str, float],
+        edges: Dict[str, List[str]]
+    ):
+        self.edges = edges
+        self.subjects_of: Dict[str, List[str]] = {}
+        for subject_id, faculty_ids in edges.items():
+            for faculty_id in faculty_ids:
+                self.subjects_of.setdefault(faculty_id, []).append(subject_id)
+        self.flow: Dict[tuple, int] = {}
+        # Demand not yet routed per subject; spare capacity per faculty member
+        # (negative = overloaded)
+        self.unmet = dict(demand)
+        self.spare = dict(supply)
+        self._augment()
+
+    @property
+    def feasible(self) -> bool:
+        return not any(self.unmet.values())
+
+    def take(self, subject_id: str, faculty_id: str) -> bool:
+        """Book one hour of a subject with a faculty member; False if the rest no longer fits."""
+        self.unmet[subject_id] -= 1
+        self.spare[faculty_id] -= 1
+        if self.flow.get((subject_id, faculty_id), 0) > 0:
+            self._push(subject_id, faculty_id, -1)
+        else:
+            if self.unmet[subject_id] < 0:
+                other = next(
+                    f for f in self.edges[subject_id] if self.flow.get((subject_id, f), 0) > 0
+                )
+                self._push(subject_id, other, -1)
+            if self.spare[faculty_id] < 0:
+                other = next(
+                    s for s in self.subjects_of[faculty_id] if self.flow.get((s, faculty_id), 0) > 0
+                )
+                self._push(other, faculty_id, -1)
+        return self._augment()
+
+    def give(self, subject_id: str, faculty_id: str) -> None:
+        """Undo a ``take``."""
+        self.unmet[subject_id] += 1
+        self.spare[faculty_id] += 1
+        self._augment()
+
+    def _push(self, subject_id: str, faculty_id: str, amount: int) -> None:
+        self.flow[(subject_id, faculty_id)] = self.flow.get((subject_id, faculty_id), 0) + amount
+        self.unmet[subject_id] -= amount
+        self.spare[faculty_id] -= amount
+
+    def _augment(self) -> bool:
+        """Route unmet demand along augmenting paths; True when everything is routed."""
+        for subject_id in self.unmet:
+            while self.unmet[subject_id] > 0:
+                path = self._path(subject_id)
+                if path is None:
+                    break
+                for i in range(0, len(path) - 1, 2):
+                    self.flow[(path[i], path[i + 1])] = self.flow.get((path[i], path[i + 1]), 0) + 1
+                    if i + 2 < len(path):
+                        self.flow[(path[i + 2], path[i + 1])] -= 1
+                self.unmet[subject_id] -= 1
+                self.spare[path[-1]] -= 1
+        return self.feasible
+
+    def _path(self, source: str) -> Optional[List[str]]:
+        """Alternating subject/faculty path from a subject to a member with spare hours."""
+        parent = {("s", source): None}
+        queue = [source]
+        for subject_id in queue:
+            for faculty_id in self.edges.get(subject_id, []):
+                if ("f", faculty_id) in parent:
+                    continue
+                parent[("f", faculty_id)] = subject_id
+                if self.spare[faculty_id] > 0:
+                    path = [faculty_id]
+                    node = subject_id
+                    while node is not None:
+                        path.append(node)
+                        prev_faculty = parent[("s", node)]
+                        if prev_faculty is None:
+                            break
+                        path.append(prev_faculty)
+                        node = parent[("f", prev_faculty)]
+                    return path[::-1]
+                for other in self.subjects_of.get(faculty_id, []):
+                    if ("s", other) not in parent and self.flow.get((other, faculty_id), 0) > 0:
+                        parent[("s", other)] = faculty_id
+                        queue.append(other)
+        return None
+
+
+class ExactSolver:
+    """
+    Complete solver for the slot/faculty/classroom assignment problem.
+
+    Each (section, subject) pair needs ``hours_per_week`` classes. The solver
+    keeps a slot-domain bitmask per pair, picks the most constrained pair
+    first (fewest spare slots, DSATUR-style), forward-checks every placement
+    against the pairs sharing its section, faculty member or room, and on a
+    dead end backjumps to the most recent decision in the conflict set.
+    Classes of one pair are placed in increasing slot order to break
+    symmetry, and rooms are assigned best-fit: the rooms that fit a section
+    form a capacity-nested family, so the smallest free one never loses a
+    solution. A hard lab-room rule splits the rooms into lab and non-lab
+    families that are not nested with each other, so classes that may use
+    either branch over the family and stay best-fit within it. Hard
+    max_consecutive limits are checked as candidate values are generated,
+    blaming the classes in the run that would grow too long. Exhausting
+    the search is therefore a proof of infeasibility.
+    """
+
+    MAX_HALL_GROUPS = 10
+
+    def __init__(self, problem: SchedulingProblem, time_limit: float = 60.0):
+        self.problem = problem
+        self.time_limit = time_limit
+        self.nodes = 0
+        self.backjumps = 0
+
+        self.groups = [
+            _Group(
+                section, subject, need,
+                [f["id"] for f in problem.qualified_faculty(subject["id"])],
+                problem.room_type(subject["id"]),
+                problem.room_families(subject["id"])
+            )
+            for section, subject, need in problem.lesson_groups()
+            if need > 0
+        ]
+        self.by_section: Dict[str, List[_Group]] = {}
+        self.by_faculty: Dict[str, List[_Group]] = {}
+        self.by_room: Dict[str, List[_Group]] = {}
+        for group in self.groups:
+            self.by_section.setdefault(group.section_id, []).append(group)
+            for faculty_id in group.faculty_ids:
+                self.by_faculty.setdefault(faculty_id, []).append(group)
+            for room in problem.rooms.fitting(group.size, group.room_type):
+                self.by_room.setdefault(room["id"], []).append(group)
+
+        # (kind, resource_id, slot) -> decision level that occupies it
+        self.occupant: Dict[tuple, int] = {}
+        self.load: Dict[str, int] = {}
+        self.caps = dict(problem.faculty_load.remaining)
+        # Weekly hour caps couple groups that share faculty; only tracked when some cap is finite
+        self.hours: Optional[_HoursFlow] = None
+        demand: Dict[str, int] = {}
+        edges: Dict[str, List[str]] = {}
+        for group in self.groups:
+            demand[group.subject_id] = demand.get(group.subject_id, 0) + group.need
+            edges[group.subject_id] = group.faculty_ids
+        supply = {f: self.caps.get(f, float("inf")) for ids in edges.values() for f in ids}
+        if any(cap != float("inf") for cap in supply.values()):
+            self.hours = _HoursFlow(demand, supply, edges)
+        # Capacity of the largest free room per slot, per required room type (None for
+        # any room); any smaller section fits a free room
+        self.room_types = {None} | {group.room_type for group in self.groups}
+        self.largest_free = {
+            room_type: [
+                self._largest_free_capacity(slot, room_type) for slot in range(problem.num_slots)
+            ]
+            for room_type in self.room_types
+        }
+        # Room pigeonhole per section size: free room-slots that fit it vs classes still needing one
+        self.sizes = sorted({group.size for group in self.groups})
+        self.room_supply = {
+            size: sum(
+                problem.classroom_busy.free_mask(room["id"]).bit_count()
+                for room in problem.rooms.fitting(size)
+            )
+            for size in self.sizes
+        }
+        self.room_demand = {
+            size: sum(group.need for group in self.groups if group.size >= size)
+            for size in self.sizes
+        }
+
+    def solve(self) -> Dict[str, Any]:
+        """
+        Run the search within the time limit.
+
+        Returns:
+            Dict with ``status`` ("feasible", "infeasible" or "timeout"),
+            ``placements`` as (section_id, subject_id, slot, faculty_id,
+            classroom_id) tuples, ``reasons`` and search statistics
+        """
+        started = time.monotonic()
+        deadline = started + self.time_limit
+
+        reasons = self._initial_domains()
+        if reasons:
+            return self._result("infeasible", started, reasons)
+
+        stack: List[_Frame] = []
+        while True:
+            group = self._select()
+            if group is None:
+                return self._result("feasible", started)
+
+            values, conflict = self._values(group)
+            stack.append(_Frame(group, values, conflict))
+
+            while not self._advance(stack):
+                if time.monotonic() > deadline:
+                    return self._timeout(started)
+                frame = stack.pop()
+                level = len(stack)
+                conflict = frame.conflict | self._group_conflict(frame.group)
+                conflict.discard(level)
+                if not conflict:
+                    return self._result("infeasible", started, [
+                        f"No placement exists for {frame.group.label()}: "
+                        f"exhausted every alternative for the classes it conflicts with"
+                    ])
+
+                target = max(conflict)
+                if target < level - 1:
+                    self.backjumps += 1
+                while len(stack) - 1 > target:
+                    self._undo(stack.pop())
+                stack[-1].conflict |= conflict - {target}
+
+            if time.monotonic() > deadline:
+                return self._timeout(started)
+
+    def precheck(self) -> List[str]:
+        """Run only the root-level feasibility checks; returns reasons if infeasible."""
+        return self._initial_domains()
+
+    def _initial_domains(self) -> List[str]:
+        """Compute starting slot domains and return reasons if trivially infeasible."""
+        problem = self.problem
+        reasons = []
+
+        for group in self.groups:
+            faculty_mask = 0
+            for faculty_id in group.faculty_ids:
+                faculty_mask |= problem.faculty_busy.free_mask(faculty_id)
+            room_mask = 0
+            for room in problem.rooms.fitting(group.size, group.room_type):
+                room_mask |= problem.classroom_busy.free_mask(room["id"])
+            open_slots = problem.open_slots(group.section_id, group.subject_id)
+            group.domain = open_slots & faculty_mask & room_mask
+
+            if not group.faculty_ids:
+                reasons.append(f"No faculty can teach {group.subject_id}")
+            elif not room_mask:
+                room_kind = f"{group.room_type} classroom" if group.room_type else "classroom"
+                reasons.append(
+                    f"No {room_kind} can hold section {group.section_id} ({group.size} students)"
+                )
+            elif group.domain.bit_count() < group.need:
+                reasons.append(
+                    f"{group.label()} needs {group.need} classes but only "
+                    f"{group.domain.bit_count()} slots are feasible"
+                )
+
+        if self.hours is not None and not self.hours.feasible:
+            short = {s: n for s, n in self.hours.unmet.items() if n > 0}
+            reasons.append(
+                f"Faculty weekly hour caps leave {sum(short.values())} hours uncovered "
+                f"({', '.join(sorted(short))})"
+            )
+
+        for section_id, groups in self.by_section.items():
+            usable = 0
+            for group in groups:
+                usable |= group.domain
+            need = sum(group.need for group in groups)
+            if usable.bit_count() < need:
+                reasons.append(
+                    f"Section {section_id} needs {need} classes but only "
+                    f"{usable.bit_count()} slots are usable"
+                )
+
+        for size in self.sizes:
+            if self.room_supply[size] < self.room_demand[size]:
+                reasons.append(
+                    f"Sections of {size}+ students need {self.room_demand[size]} classes but "
+                    f"rooms that fit them have only {self.room_supply[size]} free slots"
+                )
+
+        return list(dict.fromkeys(reasons))
+
+    def _select(self) -> Optional[_Group]:
+        """Most constrained unfinished group: fewest spare slots, then fewest faculty."""
+        best = None
+        best_key = None
+        for group in self.groups:
+            remaining = group.remaining
+            if not remaining:
+                continue
+            key = (group.domain.bit_count() - remaining, len(group.faculty_ids), -group.size)
+            if best_key is None or key < best_key:
+                best, best_key = group, key
+        return best
+
+    def _values(self, group: _Group) -> tuple:
+        """Candidate (slot, faculty_id, room family) values and the levels excluding the rest."""
+        problem = self.problem
+        busy = problem.faculty_busy
+        values = []
+        conflict: Set[int] = set()
+        later_needed = group.remaining - 1
+
+        # Faculty at their weekly cap are out; every class they teach shares the blame
+        available = []
+        for faculty_id in group.faculty_ids:
+            if self.load.get(faculty_id, 0) < self.caps.get(faculty_id, float("inf")):
+                available.append(faculty_id)
+            else:
+                for slot in iter_bits(busy.busy_mask(faculty_id)):
+                    conflict.add(self.occupant.get(("faculty", faculty_id, slot), -1))
+
+        for slot in iter_bits(group.domain):
+            # Later classes of this group must fit into later slots
+            if (group.domain >> (slot + 1)).bit_count() < later_needed:
+                break
+            # Hard max_consecutive rules: the classes in the run it would join are to blame
+            if not problem.run_ok("section", group.section_id, slot):
+                conflict.update(self._run_conflict("section", group.section_id, slot))
+                continue
+            free = []
+            for faculty_id in available:
+                if not busy.is_free(faculty_id, slot):
+                    conflict.add(self.occupant.get(("faculty", faculty_id, slot), -1))
+                elif not problem.run_ok("faculty", faculty_id, slot):
+                    conflict.update(self._run_conflict("faculty", faculty_id, slot))
+                else:
+                    free.append(faculty_id)
+            free.sort(key=lambda f: self.load.get(f, 0))
+            families = group.room_families
+            if len(families) > 1:
+                families = []
+                for family in group.room_families:
+                    if problem.rooms.find_free(group.size, problem.classroom_busy, slot, family):
+                        families.append(family)
+                    else:
+                        conflict.update(
+                            self.occupant.get(("room", room["id"], slot), -1)
+                            for room in problem.rooms.fitting(group.size, family)
+                        )
+            values.extend((slot, faculty_id, family) for faculty_id in free for family in families)
+
+        conflict.discard(-1)
+        return values, conflict
+
+    def _advance(self, stack: List[_Frame]) -> bool:
+        """Move the top frame to its next consistent value; False when exhausted."""
+        frame = stack[-1]
+        level = len(stack) - 1
+        if frame.current is not None:
+            self._undo(frame)
+
+        for slot, faculty_id, family in frame.values:
+            self.nodes += 1
+            conflict = self._assign(frame, level, slot, faculty_id, family)
+            if conflict is None:
+                return True
+            frame.conflict |= conflict - {level}
+            self._undo(frame)
+        return False
+
+    def _assign(
+        self,
+        frame: _Frame,
+        level: int,
+        slot: int,
+        faculty_id: str,
+        family: Any
+    ) -> Optional[Set[int]]:
+        """
+        Place a class in a room family and forward-check affected groups.
+
+        Returns:
+            Conflict set if some group's domain is wiped out, else None
+        """
+        problem = self.problem
+        group = frame.group
+        room = problem.rooms.find_free(group.size, problem.classroom_busy, slot, family)
+        room_id = room["id"]
+
+        problem.assign(group.section_id, faculty_id, room_id, slot)
+        self.occupant[("section", group.section_id, slot)] = level
+        self.occupant[("faculty", faculty_id, slot)] = level
+        self.occupant[("room", room_id, slot)] = level
+        self.load[faculty_id] = self.load.get(faculty_id, 0) + 1
+        group.placed.append((slot, faculty_id, room_id))
+        frame.current = (slot, faculty_id, room_id)
+        # Remaining hours must still be coverable by remaining faculty capacity
+        short = self.hours is not None and not self.hours.take(group.subject_id, faculty_id)
+
+        capacity = room.get("capacity", 0)
+        for size in self.sizes:
+            if size <= capacity:
+                self.room_supply[size] -= 1
+            if size <= group.size:
+                self.room_demand[size] -= 1
+            short = short or self.room_supply[size] < self.room_demand[size]
+        if short:
+            # Pigeonhole on rooms or faculty hours: every placement so far shares the blame
+            return set(range(level + 1))
+
+        touched = {group}
+        for earlier in iter_bits(group.domain & ((2 << slot) - 1)):
+            self._prune(frame, group, earlier, {level})
+
+        # Taking this room only hurts groups larger than every room still free at the slot
+        affected = [self.by_section.get(group.section_id, []), self.by_faculty.get(faculty_id, [])]
+        for room_type in dict.fromkeys((None, room.get("room_type"))):
+            largest_free = self.largest_free.get(room_type)
+            if largest_free is not None and capacity >= largest_free[slot]:
+                largest_free[slot] = self._largest_free_capacity(slot, room_type)
+                if largest_free[slot] < capacity:
+                    affected.append(self.by_room.get(room_id, []))
+
+        bit = 1 << slot
+        for others in affected:
+            for other in others:
+                if other.domain & bit and other.remaining and not self._slot_ok(other, slot):
+                    self._prune(frame, other, slot, self._explain(other, slot))
+                    touched.add(other)
+
+        for other in touched:
+            if other.remaining and other.domain.bit_count() < other.remaining:
+                return self._group_conflict(other)
+
+        for section_id in {other.section_id for other in touched}:
+            conflict = self._section_conflict(section_id)
+            if conflict is not None:
+                return conflict
+
+        return None
+
+    def _section_conflict(self, section_id: str) -> Optional[Set[int]]:
+        """
+        Hall check over a section's unfinished groups.
+
+        Every subset of groups must have at least as many usable slots as
+        classes left to place. Subsets are enumerated exhaustively for the
+        usual handful of subjects per section; larger sections fall back to
+        the union of all groups.
+        """
+        groups = [g for g in self.by_section[section_id] if g.remaining]
+        if len(groups) > self.MAX_HALL_GROUPS:
+            usable = 0
+            for group in groups:
+                usable |= group.domain
+            if usable.bit_count() < sum(group.remaining for group in groups):
+                return self._groups_conflict(groups)
+            return None
+
+        count = 1 << len(groups)
+        usable = [0] * count
+        need = [0] * count
+        for subset in range(1, count):
+            lowest = subset & -subset
+            index = lowest.bit_length() - 1
+            usable[subset] = usable[subset ^ lowest] | groups[index].domain
+            need[subset] = need[subset ^ lowest] + groups[index].remaining
+            if usable[subset].bit_count() < need[subset]:
+                return self._groups_conflict([g for i, g in enumerate(groups) if subset >> i & 1])
+        return None
+
+    def _undo(self, frame: _Frame) -> None:
+        """Revert the frame's current placement and the prunes it caused."""
+        for other, slot in reversed(frame.trail):
+            other.domain |= 1 << slot
+            del other.pruned[slot]
+        frame.trail = []
+
+        slot, faculty_id, room_id = frame.current
+        group = frame.group
+        self.problem.unassign(group.section_id, faculty_id, room_id, slot)
+        room = self.problem.classrooms_by_id[room_id]
+        capacity = room.get("capacity", 0)
+        for room_type in dict.fromkeys((None, room.get("room_type"))):
+            largest_free = self.largest_free.get(room_type)
+            if largest_free is not None:
+                largest_free[slot] = max(largest_free[slot], capacity)
+        for size in self.sizes:
+            if size <= capacity:
+                self.room_supply[size] += 1
+            if size <= group.size:
+                self.room_demand[size] += 1
+        del self.occupant[("section", group.section_id, slot)]
+        del self.occupant[("faculty", faculty_id, slot)]
+        del self.occupant[("room", room_id, slot)]
+        self.load[faculty_id] -= 1
+        if self.hours is not None:
+            self.hours.give(group.subject_id, faculty_id)
+        group.placed.pop()
+        frame.current = None
+
+    def _prune(self, frame: _Frame, group: _Group, slot: int, reasons: Set[int]) -> None:
+        group.domain &= ~(1 << slot)
+        group.pruned[slot] = reasons
+        frame.trail.append((group, slot))
+
+    def _largest_free_capacity(self, slot: int, room_type: Optional[str] = None) -> int:
+        problem = self.problem
+        _, rooms = problem.rooms.buckets.get(room_type, ([], []))
+        for room in reversed(rooms):
+            if problem.classroom_busy.is_free(room["id"], slot):
+                return room.get("capacity", 0)
+        return -1
+
+    def _slot_ok(self, group: _Group, slot: int) -> bool:
+        """Check whether a slot still has a free section, faculty member and room for the group."""
+        problem = self.problem
+        if not problem.section_busy.is_free(group.section_id, slot):
+            return False
+        if not any(problem.faculty_busy.is_free(f, slot) for f in group.faculty_ids):
+            return False
+        return group.size <= self.largest_free[group.room_type][slot]
+
+    def _explain(self, group: _Group, slot: int) -> Set[int]:
+        """Decision levels whose placements make a slot unusable for the group."""
+        problem = self.problem
+        if not problem.section_busy.is_free(group.section_id, slot):
+            keys = [("section", group.section_id, slot)]
+        elif not any(problem.faculty_busy.is_free(f, slot) for f in group.faculty_ids):
+            keys = [("faculty", f, slot) for f in group.faculty_ids]
+        else:
+            rooms = problem.rooms.fitting(group.size, group.room_type)
+            keys = [("room", r["id"], slot) for r in rooms]
+        return {self.occupant[key] for key in keys if key in self.occupant}
+
+    def _run_conflict(self, kind: str, resource_id: str, slot: int) -> Set[int]:
+        """Decision levels of the classes in the run a class at a slot would join."""
+        return {
+            self.occupant.get((kind, resource_id, other), -1)
+            for other in self.problem.run_slots(kind, resource_id, slot)
+            if other != slot
+        }
+
+    def _groups_conflict(self, groups: List[_Group]) -> Set[int]:
+        conflict: Set[int] = set()
+        for group in groups:
+            conflict |= self._group_conflict(group)
+        return conflict
+
+    def _group_conflict(self, group: _Group) -> Set[int]:
+        conflict: Set[int] = set()
+        for reasons in group.pruned.values():
+            conflict |= reasons
+        return conflict
+
+    def _timeout(self, started: float) -> Dict[str, Any]:
+        return self._result("timeout", started, [
+            f"Time limit of {self.time_limit}s reached before a complete assignment was found"
+        ])
+
+    def _result(
+        self,
+        status: str,
+        started: float,
+        reasons: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        placements = []
+        if status == "feasible":
+            placements = [
+                (group.section_id, group.subject_id, slot, faculty_id, room_id)
+                for group in self.groups
+                for slot, faculty_id, room_id in group.placed
+            ]
+        return {
+            "status": status,
+            "placements": placements,
+            "reasons": reasons or [],
+            "nodes": self.nodes,
+            "backjumps": self.backjumps,
+            "elapsed_seconds": round(time.monotonic() - started, 3)
+        }
@@ -0,0 +1,461 @@
+"""Timetable optimization agent using simulated annealing."""
+import math
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from agents.base_agent import BaseAgent, AgentResult
+from agents.problem import SchedulingProblem, generate_time_slots, to_dict
+from agents.rules import RuleSet
+from agents.scoring import (
+    DEFAULT_WEIGHTS, LATE_PERIODS, adjacent_periods, idle_periods, is_heavy_subject, penalty_score
+)
+from config import settings
+from services.solver_service import solver_service
+
+
+class ScheduleOptimizer:
+    """
+    Anytime simulated-annealing optimizer over a feasible placement set.
+
+    Moves relocate one class to another slot or swap the slots of two
+    classes of the same section, and only moves that keep every hard
+    constraint are considered. Each move is scored by a delta over the
+    faculty-days, section-days, section-subject-days and classes it
+    touches, never by a full re-score. The terms are those of
+    ScheduleScorer, kept as day bitmasks. The best schedule seen so far is
+    always available through ``best()``.
+    """
+
+    def __init__(
+        self,
+        problem: SchedulingProblem,
+        placements: List[tuple],
+        weights: Optional[Dict[str, float]] = None,
+        seed: Optional[int] = None
+    ):
+        self.problem = problem
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.rng = random.Random(seed)
+        self.iterations = 0
+
+        # Mutable [section_id, subject_id, slot, faculty_id, classroom_id] per class
+        self.lessons = [list(p) for p in placements]
+        self.by_section: Dict[str, List[int]] = {}
+        for i, (section_id, *_rest) in enumerate(self.lessons):
+            self.by_section.setdefault(section_id, []).append(i)
+
+        # Day masks of occupied periods per (faculty, day) and (section, day),
+        # and of periods holding heavy subjects per (section, day)
+        self.faculty_day: Dict[tuple, int] = {}
+        self.section_day: Dict[tuple, int] = {}
+        self.heavy_day: Dict[tuple, int] = {}
+        self.subject_day: Dict[tuple, int] = {}
+        self.heavy = {
+            subject_id: is_heavy_subject(s) for subject_id, s in problem.subjects_by_id.items()
+        }
+        # Classes per faculty member, checked against their weekly caps
+        self.caps = problem.faculty_load.remaining
+        self.hours: Dict[str, int] = {}
+        for i, (section_id, _, slot, faculty_id, classroom_id) in enumerate(self.lessons):
+            problem.assign(section_id, faculty_id, classroom_id, slot)
+            self.hours[faculty_id] = self.hours.get(faculty_id, 0) + 1
+            self._add(i)
+        self.terms = self._full_terms()
+        self.cost = self._weighted(self.terms)
+
+        self.best_cost = self.cost
+        self.best_terms = dict(self.terms)
+        self._best_snapshot: Optional[List[tuple]] = None
+
+    # Objective
+
+    def _lesson_terms(self, i: int) -> Dict[str, float]:
+        section_id, _, slot, _, classroom_id = self.lessons[i]
+        problem = self.problem
+        capacity = problem.classrooms_by_id[classroom_id].get("capacity", 0)
+        size = problem.sections_by_id[section_id].get("num_students", 0)
+        day = problem.slot_day[slot]
+        late = problem.slot_period[slot] >= problem.periods_per_day[day] - LATE_PERIODS
+        return {
+            "room_waste": (capacity - size) / capacity if capacity > 0 else 0.0,
+            "late_day": 1.0 if late else 0.0,
+            "custom_rules": problem.rule_penalty(tuple(self.lessons[i])),
+        }
+
+    def _full_terms(self) -> Dict[str, float]:
+        terms = {term: 0.0 for term in self.weights}
+        terms["faculty_gaps"] = float(sum(idle_periods(mask) for mask in self.faculty_day.values()))
+        terms["section_gaps"] = float(sum(idle_periods(mask) for mask in self.section_day.values()))
+        terms["heavy_back_to_back"] = float(
+            sum(adjacent_periods(mask) for mask in self.heavy_day.values())
+        )
+        terms["subject_clustering"] = float(sum(max(0, c - 1) for c in self.subject_day.values()))
+        for i in range(len(self.lessons)):
+            for term, value in self._lesson_terms(i).items():
+                terms[term] += value
+        return terms
+
+    def _weighted(self, terms: Dict[str, float]) -> float:
+        return sum(self.weights[term] * value for term, value in terms.items())
+
+    def _local_terms(
+        self,
+        indices: List[int],
+        faculty_keys: set,
+        section_keys: set,
+        subject_keys: set
+    ) -> Dict[str, float]:
+        """Objective contributions of the given day buckets and classes."""
+        terms = {
+            "faculty_gaps": float(
+                sum(idle_periods(self.faculty_day.get(k, 0)) for k in faculty_keys)
+            ),
+            "section_gaps": float(
+                sum(idle_periods(self.section_day.get(k, 0)) for k in section_keys)
+            ),
+            "heavy_back_to_back": float(
+                sum(adjacent_periods(self.heavy_day.get(k, 0)) for k in section_keys)
+            ),
+            "subject_clustering": float(
+                sum(max(0, self.subject_day.get(k, 0) - 1) for k in subject_keys)
+            ),
+            "room_waste": 0.0,
+            "late_day": 0.0,
+            "custom_rules": 0.0,
+        }
+        for i in indices:
+            for term, value in self._lesson_terms(i).items():
+                terms[term] += value
+        return terms
+
+    def _add(self, i: int) -> None:
+        section_id, subject_id, slot, faculty_id, _ = self.lessons[i]
+        day = self.problem.slot_day[slot]
+        bit = 1 << self.problem.slot_period[slot]
+        key = (faculty_id, day)
+        self.faculty_day[key] = self.faculty_day.get(key, 0) | bit
+        key = (section_id, day)
+        self.section_day[key] = self.section_day.get(key, 0) | bit
+        if self.heavy.get(subject_id):
+            self.heavy_day[key] = self.heavy_day.get(key, 0) | bit
+        key = (section_id, subject_id, day)
+        self.subject_day[key] = self.subject_day.get(key, 0) + 1
+
+    def _remove(self, i: int) -> None:
+        section_id, subject_id, slot, faculty_id, _ = self.lessons[i]
+        day = self.problem.slot_day[slot]
+        bit = 1 << self.problem.slot_period[slot]
+        key = (faculty_id, day)
+        self.faculty_day[key] &= ~bit
+        key = (section_id, day)
+        self.section_day[key] &= ~bit
+        if self.heavy.get(subject_id):
+            self.heavy_day[key] &= ~bit
+        key = (section_id, subject_id, day)
+        self.subject_day[key] -= 1
+
+    # Moves
+
+    def _move(self, changes: Dict[int, tuple]) -> Dict[str, float]:
+        """Apply new (slot, faculty_id, classroom_id) values and return the per-term delta."""
+        day = self.problem.slot_day
+        faculty_keys = set()
+        section_keys = set()
+        subject_keys = set()
+        for i, (slot, faculty_id, _) in changes.items():
+            section_id, subject_id, old_slot, old_faculty_id, _ = self.lessons[i]
+            faculty_keys.add((old_faculty_id, day[old_slot]))
+            faculty_keys.add((faculty_id, day[slot]))
+            section_keys.add((section_id, day[old_slot]))
+            section_keys.add((section_id, day[slot]))
+            subject_keys.add((section_id, subject_id, day[old_slot]))
+            subject_keys.add((section_id, subject_id, day[slot]))
+
+        indices = list(changes)
+        before = self._local_terms(indices, faculty_keys, section_keys, subject_keys)
+        for i in indices:
+            self._remove(i)
+        for i, values in changes.items():
+            if values[1] != self.lessons[i][3]:
+                self.hours[self.lessons[i][3]] -= 1
+                self.hours[values[1]] = self.hours.get(values[1], 0) + 1
+            self.lessons[i][2:] = values
+            self._add(i)
+        after = self._local_terms(indices, faculty_keys, section_keys, subject_keys)
+        return {term: after[term] - before[term] for term in before}
+
+    def _release(self, i: int) -> None:
+        section_id, _, slot, faculty_id, classroom_id = self.lessons[i]
+        self.problem.unassign(section_id, faculty_id, classroom_id, slot)
+
+    def _occupy(self, i: int) -> None:
+        section_id, _, slot, faculty_id, classroom_id = self.lessons[i]
+        self.problem.assign(section_id, faculty_id, classroom_id, slot)
+
+    def _place(self, i: int, slot: int, reserved: Optional[str] = None) -> Optional[tuple]:
+        """
+        Feasible (slot, faculty_id, classroom_id) for a released class at a new slot.
+
+        ``reserved`` is a faculty member who already has one more class
+        pending in the same move and so needs an extra hour of headroom.
+        """
+        problem = self.problem
+        section_id, subject_id, _, faculty_id, _ = self.lessons[i]
+        if not problem.open_slots(section_id, subject_id) >> slot & 1:
+            return None
+        if not problem.run_ok("section", section_id, slot):
+            return None
+        if not (
+            problem.faculty_busy.is_free(faculty_id, slot)
+            and problem.run_ok("faculty", faculty_id, slot)
+        ):
+            # A replacement must stay within their weekly cap
+            candidates = [
+                f["id"] for f in problem.qualified_faculty(subject_id)
+                if problem.faculty_busy.is_free(f["id"], slot)
+                and problem.run_ok("faculty", f["id"], slot)
+                and self.hours.get(f["id"], 0) + (2 if f["id"] == reserved else 1)
+                <= self.caps[f["id"]]
+            ]
+            if not candidates:
+                return None
+            faculty_id = self.rng.choice(candidates)
+        room = problem.free_room(section_id, subject_id, slot)
+        if room is None:
+            return None
+        return slot, faculty_id, room["id"]
+
+    def _propose(self) -> Optional[Dict[int, tuple]]:
+        """Release the classes of a random move and return their new values, or None."""
+        n = len(self.lessons)
+        i = self.rng.randrange(n)
+        section_id = self.lessons[i][0]
+        siblings = self.by_section[section_id]
+
+        if len(siblings) > 1 and self.rng.random() < 0.5:
+            j = self.rng.choice(siblings)
+            if j == i or self.lessons[j][1] == self.lessons[i][1]:
+                return None
+            slot_i, slot_j = self.lessons[i][2], self.lessons[j][2]
+            self._release(i)
+            self._release(j)
+            new_i = self._place(i, slot_j)
+            if new_i is not None:
+                self.problem.assign(section_id, new_i[1], new_i[2], slot_j)
+                reserved = new_i[1] if new_i[1] != self.lessons[i][3] else None
+                new_j = self._place(j, slot_i, reserved)
+                self.problem.unassign(section_id, new_i[1], new_i[2], slot_j)
+                if new_j is not None:
+                    return {i: new_i, j: new_j}
+            self._occupy(i)
+            self._occupy(j)
+            return None
+
+        slot = self.rng.randrange(self.problem.num_slots)
+        if slot == self.lessons[i][2]:
+            return None
+        self._release(i)
+        new_i = self._place(i, slot)
+        if new_i is None:
+            self._occupy(i)
+            return None
+        return {i: new_i}
+
+    # Search
+
+    def run(self, time_limit: float, max_iterations: Optional[int] = None) -> int:
+        """
+        Anneal for up to ``time_limit`` seconds; may be called repeatedly.
+
+        Returns:
+            Number of iterations performed in this call
+        """
+        if not self.lessons or time_limit <= 0:
+            return 0
+
+        started = time.monotonic()
+        deadline = started + time_limit
+        start_temperature, end_temperature = 2.0, 0.01
+        temperature = start_temperature
+        done = 0
+
+        while max_iterations is None or done < max_iterations:
+            if done % 256 == 0:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                progress = (now - started) / time_limit
+                temperature = start_temperature * (end_temperature / start_temperature) ** progress
+            done += 1
+
+            changes = self._propose()
+            if changes is None:
+                continue
+            old = {i: tuple(self.lessons[i][2:]) for i in changes}
+            delta_terms = self._move(changes)
+            delta = self._weighted(delta_terms)
+
+            if delta <= 0 or self.rng.random() < math.exp(-delta / temperature):
+                if delta > 0 and self.cost <= self.best_cost + 1e-9 and self._best_snapshot is None:
+                    # Leaving the best state: keep a copy before moving uphill
+                    self._best_snapshot = self._snapshot(old)
+                for i in changes:
+                    self._occupy(i)
+                self.cost += delta
+                for term, value in delta_terms.items():
+                    self.terms[term] += value
+                if self.cost < self.best_cost - 1e-9:
+                    self.best_cost = self.cost
+                    self.best_terms = dict(self.terms)
+                    self._best_snapshot = None
+                elif self._best_snapshot is None:
+                    # A sideways move from the best state: best() returns the current lessons
+                    self.best_terms = dict(self.terms)
+            else:
+                self._move(old)
+                for i in changes:
+                    self._occupy(i)
+
+        self.iterations += done
+        return done
+
+    def _snapshot(self, old: Dict[int, tuple]) -> List[tuple]:
+        """Placements as they were before the pending move."""
+        snapshot = []
+        for i, lesson in enumerate(self.lessons):
+            if i in old:
+                snapshot.append((lesson[0], lesson[1], *old[i]))
+            else:
+                snapshot.append(tuple(lesson))
+        return snapshot
+
+    def best(self) -> tuple:
+        """Best placements found so far and their penalty."""
+        if self._best_snapshot is not None:
+            return list(self._best_snapshot), self.best_cost
+        return [tuple(lesson) for lesson in self.lessons], self.best_cost
+
+    def score(self, cost: Optional[float] = None) -> float:
+        """Penalty mapped to a 0-100 score (100 = no soft-constraint penalty)."""
+        return penalty_score(self.best_cost if cost is None else cost, len(self.lessons))
+
+
+def optimize_schedule(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Anneal serialized placements; entry point for solver worker processes."""
+    problem = SchedulingProblem(
+        payload["sections"],
+        payload["subjects"],
+        payload["faculty"],
+        payload["classrooms"],
+        generate_time_slots(),
+        RuleSet(payload.get("constraints", []))
+    )
+    problem.block_entries(payload.get("fixed_entries", []))
+    placements = [tuple(p) for p in payload["placements"]]
+
+    optimizer = ScheduleOptimizer(problem, placements, seed=payload.get("seed"))
+    initial_score = optimizer.score(optimizer.cost)
+    iterations = optimizer.run(payload["time_limit"])
+    best_placements, best_cost = optimizer.best()
+
+    return {
+        "placements": best_placements,
+        "score": optimizer.score(best_cost),
+        "initial_score": initial_score,
+        "penalty": round(best_cost, 3),
+        "penalty_terms": {k: round(v, 3) for k, v in optimizer.best_terms.items()},
+        "iterations": iterations
+    }
+
+
+class OptimizerAgent(BaseAgent):
+    """Agent responsible for improving a feasible timetable against soft constraints."""
+
+    def __init__(self):
+        super().__init__(
+            name="OptimizerAgent",
+            description="Improves timetable quality with local search under a time budget"
+        )
+
+    async def execute(self, input_data: Dict[str, Any]) -> AgentResult:
+        """
+        Optimize a feasible schedule.
+
+        The annealing loop runs in the solver process pool; workers receive
+        placement tuples rather than full entries.
+
+        Args:
+            input_data: Contains schedule_entries, sections, subjects, faculty,
+                classrooms, optional constraints and an optional time_limit in seconds
+
+        Returns:
+            AgentResult with the best schedule found and its optimization score
+        """
+        try:
+            time_limit = input_data.get("time_limit")
+            if time_limit is None:
+                time_limit = settings.optimizer_time_limit
+            time_limit = min(time_limit, settings.agent_timeout)
+
+            constraints = [to_dict(c) for c in input_data.get("constraints", [])]
+            problem = SchedulingProblem(
+                input_data.get("sections", []),
+                input_data.get("subjects", []),
+                input_data.get("faculty", []),
+                input_data.get("classrooms", []),
+                generate_time_slots()
+            )
+
+            # Entries off the slot grid are kept as they are, and hold every grid slot they overlap
+            placements = []
+            fixed_entries = []
+            for entry in input_data.get("schedule_entries", []):
+                placement = problem.placement_for(entry)
+                if placement is None:
+                    fixed_entries.append(entry)
+                else:
+                    placements.append(placement)
+
+            outcome = await solver_service.run(optimize_schedule, {
+                "sections": problem.sections,
+                "subjects": problem.subjects,
+                "faculty": problem.faculty,
+                "classrooms": problem.classrooms,
+                "constraints": constraints,
+                "placements": placements,
+                "fixed_entries": [self._booking(entry) for entry in fixed_entries],
+                "time_limit": time_limit,
+                "seed": input_data.get("seed")
+            })
+
+            schedule_entries = [problem.entry_for(p) for p in outcome["placements"]] + fixed_entries
+            score = outcome["score"]
+            initial_score = outcome["initial_score"]
+            iterations = outcome["iterations"]
+
+            return AgentResult(
+                success=True,
+                data={
+                    "schedule_entries": schedule_entries,
+                    "optimization_score": score,
+                    "initial_score": initial_score,
+                    "penalty": outcome["penalty"],
+                    "penalty_terms": outcome["penalty_terms"],
+                    "iterations": iterations
+                },
+                message=f"Optimized {len(placements)} classes in {iterations} iterations: "
+                        f"score {initial_score} -> {score}"
+            )
+
+        except Exception as e:
+            return AgentResult(
+                success=False,
+                message=f"Failed to optimize timetable: {str(e)}",
+                errors=[str(e)]
+            )
+
+    def _booking(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Time and resource IDs of a fixed entry, all a worker needs to keep its slots busy."""
+        keys = ("day", "start_time", "end_time", "section_id", "faculty_id", "classroom_id")
+        return {key: entry.get(key) for key in keys}
@@ -0,0 +1,664 @@
+"""Compiled scheduling problem with integer slots and bitmask occupancy."""
+import heapq
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    from agents.rules import RuleSet
+
+# RoomIndex bucket of every room that is not a lab; a tuple, so no room_type value can clash with it
+NON_LAB_ROOMS = ("not", "lab")
+
+
+def generate_time_slots() -> List[Dict[str, Any]]:
+    """Generate the weekly grid of one-hour teaching slots."""
+    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+    time_slots = []
+
+    # Generate slots from 9 AM to 5 PM with 1-hour duration
+    hours = [
+        ("09:00", "10:00"),
+        ("10:00", "11:00"),
+        ("11:00", "12:00"),
+        # ("12:00", "13:00"),  # Lunch break
+        ("13:00", "14:00"),
+        ("14:00", "15:00"),
+        ("15:00", "16:00"),
+        ("16:00", "17:00"),
+    ]
+
+    for day in days:
+        for start_time, end_time in hours:
+            time_slots.append({
+                "day": day,
+                "start_time": start_time,
+                "end_time": end_time,
+                "slot_id": f"{day}_{start_time}_{end_time}"
+            })
+
+    return time_slots
+
+
+def to_dict(item: Any) -> Dict[str, Any]:
+    """Return a plain dict for a model instance or an existing dict."""
+    return item if isinstance(item, dict) else item.dict()
+
+
+def to_minutes(clock: str) -> int:
+    """Minutes since midnight for an "HH:MM" time."""
+    hours, minutes = clock.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def to_clock(minutes: int) -> str:
+    """"HH:MM" time for minutes since midnight."""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def merge_runs(intervals: List[tuple]) -> List[tuple]:
+    """
+    Merge intervals that overlap or touch into runs of back-to-back classes.
+
+    Args:
+        intervals: (start, end, ..., entry index) tuples in minutes
+
+    Returns:
+        (start, end, entry indices) per run, in time order
+    """
+    runs = []
+    for start, end, *rest in sorted(intervals):
+        if runs and start <= runs[-1][1]:
+            run = runs[-1]
+            run[1] = max(run[1], end)
+            run[2].append(rest[-1])
+        else:
+            runs.append([start, end, [rest[-1]]])
+    return [tuple(run) for run in runs]
+
+
+def is_lab_subject(subject: Dict[str, Any]) -> bool:
+    """Whether a subject's classes belong in a lab room."""
+    return bool(subject.get("requires_lab")) or subject.get("lecture_type") == "lab"
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """Yield the indices of the set bits in a mask, lowest first."""
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+def slot_mask(grid: List[Dict[str, Any]], time_slots: List[Any]) -> int:
+    """Mask of grid slots that overlap any of the given time slots."""
+    mask = 0
+    for time_slot in time_slots:
+        time_slot = to_dict(time_slot)
+        start = to_minutes(time_slot["start_time"])
+        end = to_minutes(time_slot["end_time"])
+        for slot, grid_slot in enumerate(grid):
+            if (
+                grid_slot["day"] == time_slot["day"]
+                and to_minutes(grid_slot["start_time"]) < end
+                and start < to_minutes(grid_slot["end_time"])
+            ):
+                mask |= 1 << slot
+    return mask
+
+
+class AvailabilityIndex:
+    """Blocked-slot masks per resource, compiled once from ``unavailable_slots``."""
+
+    def __init__(self, records: List[Dict[str, Any]], grid: List[Dict[str, Any]]):
+        self.grid = grid
+        self.slot_index = {
+            f"{s['day']}_{s['start_time']}_{s['end_time']}": i for i, s in enumerate(grid)
+        }
+        self.blocked: Dict[str, int] = {}
+        # Raw (day, start, end) minutes, for times that are not on the grid
+        self.intervals: Dict[str, List[tuple]] = {}
+        # Every resource compiled so far, available or not
+        self.known: set = set()
+        for record in records:
+            self.add(record)
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Compile one more resource record's unavailable slots."""
+        resource_id = record.get("id")
+        self.known.add(resource_id)
+        unavailable = [to_dict(t) for t in record.get("unavailable_slots") or []]
+        if not unavailable:
+            return
+        mask = slot_mask(self.grid, unavailable)
+        self.blocked[resource_id] = self.blocked.get(resource_id, 0) | mask
+        self.intervals.setdefault(resource_id, []).extend(
+            (t["day"], to_minutes(t["start_time"]), to_minutes(t["end_time"])) for t in unavailable
+        )
+
+    def is_blocked(self, resource_id: str, day: str, start_time: str, end_time: str) -> bool:
+        """Check whether a resource is unavailable for any part of a time range."""
+        if resource_id not in self.intervals:
+            return False
+        slot = self.slot_index.get(f"{day}_{start_time}_{end_time}")
+        if slot is not None:
+            return bool((self.blocked[resource_id] >> slot) & 1)
+        try:
+            start, end = to_minutes(start_time), to_minutes(end_time)
+        except (AttributeError, ValueError):
+            # A booking with no readable time range cannot overlap anything
+            return False
+        return any(d == day and s < end and start < e for d, s, e in self.intervals[resource_id])
+
+
+class OccupancyGrid:
+    """Slot occupancy for one kind of resource, stored as one bitmask per resource."""
+
+    def __init__(self, num_slots: int):
+        self.num_slots = num_slots
+        self.full_mask = (1 << num_slots) - 1
+        self.masks: Dict[str, int] = {}
+        # Slots a resource can never be used in; they stay occupied through release()
+        self.blocked: Dict[str, int] = {}
+
+    def block(self, resource_id: str, mask: int) -> None:
+        """Permanently occupy the slots in a mask."""
+        self.blocked[resource_id] = self.blocked.get(resource_id, 0) | mask
+        self.masks[resource_id] = self.masks.get(resource_id, 0) | mask
+
+    def busy_mask(self, resource_id: str) -> int:
+        """Mask of slots in which the resource is occupied."""
+        return self.masks.get(resource_id, 0)
+
+    def free_mask(self, resource_id: str) -> int:
+        """Mask of slots in which the resource is free."""
+        return ~self.masks.get(resource_id, 0) & self.full_mask
+
+    def is_free(self, resource_id: str, slot: int) -> bool:
+        """Check whether the resource is free at a slot index."""
+        return not (self.masks.get(resource_id, 0) >> slot) & 1
+
+    def occupy(self, resource_id: str, slot: int) -> None:
+        """Mark the resource as occupied at a slot index."""
+        self.masks[resource_id] = self.masks.get(resource_id, 0) | (1 << slot)
+
+    def release(self, resource_id: str, slot: int) -> None:
+        """Mark the resource as free at a slot index."""
+        self.masks[resource_id] = (
+            self.masks.get(resource_id, 0) & ~(1 << slot) | self.blocked.get(resource_id, 0)
+        )
+
+
+class RoomIndex:
+    """Classrooms bucketed by room type, each bucket sorted by capacity."""
+
+    def __init__(self, classrooms: List[Dict[str, Any]]):
+        by_type: Dict[Any, List[Dict[str, Any]]] = {
+            None: list(classrooms),
+            NON_LAB_ROOMS: [c for c in classrooms if c.get("room_type") != "lab"]
+        }
+        for classroom in classrooms:
+            by_type.setdefault(classroom.get("room_type"), []).append(classroom)
+
+        # room_type (None for all rooms, NON_LAB_ROOMS for all but labs) -> (ascending
+        # capacities, rooms in the same order)
+        self.buckets: Dict[Optional[str], tuple] = {}
+        for room_type, rooms in by_type.items():
+            rooms = sorted(rooms, key=lambda c: c.get("capacity", 0))
+            self.buckets[room_type] = ([c.get("capacity", 0) for c in rooms], rooms)
+
+    def fitting(self, min_capacity: int, room_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Rooms with at least the given capacity, smallest first."""
+        capacities, rooms = self.buckets.get(room_type, ([], []))
+        return rooms[bisect_left(capacities, min_capacity):]
+
+    def find_free(
+        self,
+        min_capacity: int,
+        classroom_busy: "OccupancyGrid",
+        slot: int,
+        room_type: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Smallest room that fits and is free at a slot index."""
+        capacities, rooms = self.buckets.get(room_type, ([], []))
+        for i in range(bisect_left(capacities, min_capacity), len(rooms)):
+            if classroom_busy.is_free(rooms[i].get("id"), slot):
+                return rooms[i]
+        return None
+
+
+class FacultyLoad:
+    """
+    Remaining weekly teaching hours per faculty member.
+
+    Each subject keeps a max-heap of its qualified faculty keyed on remaining
+    hours, so the least-loaded free member is found without a scan and a
+    charge costs O(log n) per subject the member teaches. Heap entries are
+    refreshed lazily: outdated ones are dropped when they reach the top.
+    """
+
+    def __init__(
+        self,
+        faculty: List[Dict[str, Any]],
+        faculty_by_subject: Dict[str, List[Dict[str, Any]]]
+    ):
+        # A missing max_hours_per_week means no cap
+        self.remaining: Dict[str, float] = {}
+        self.order: Dict[str, int] = {}
+        self.records: Dict[str, Dict[str, Any]] = {}
+        for i, faculty_dict in enumerate(faculty):
+            faculty_id = faculty_dict.get("id")
+            cap = faculty_dict.get("max_hours_per_week")
+            self.remaining[faculty_id] = float("inf") if cap is None else cap
+            self.order.setdefault(faculty_id, i)
+            self.records[faculty_id] = faculty_dict
+
+        self.subjects_of: Dict[str, List[str]] = {}
+        self.members: Dict[str, List[str]] = {}
+        self.heaps: Dict[str, List[tuple]] = {}
+        for subject_id, members in faculty_by_subject.items():
+            self.members[subject_id] = [f.get("id") for f in members]
+            for faculty_id in self.members[subject_id]:
+                self.subjects_of.setdefault(faculty_id, []).append(subject_id)
+            self._rebuild(subject_id)
+
+    def has_capacity(self, faculty_id: str, hours: float = 1) -> bool:
+        """Check whether the member can take on more hours."""
+        return self.remaining.get(faculty_id, 0) >= hours
+
+    def best_free(
+        self,
+        subject_id: str,
+        faculty_busy: "OccupancyGrid",
+        slot: int,
+        hours: float = 1,
+        usable: Optional[Callable[[str], bool]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Qualified member with the most hours left who is free at a slot and
+        passes ``usable``, if given.
+        """
+        heap = self.heaps.get(subject_id)
+        if not heap:
+            return None
+
+        skipped = []
+        found = None
+        while heap:
+            neg_remaining, _, faculty_id = heap[0]
+            if -neg_remaining != self.remaining[faculty_id]:
+                heapq.heappop(heap)
+                continue
+            if -neg_remaining < hours:
+                # Everyone further down has even fewer hours left
+                break
+            skipped.append(heapq.heappop(heap))
+            if faculty_busy.is_free(faculty_id, slot) and (usable is None or usable(faculty_id)):
+                found = self.records[faculty_id]
+                break
+
+        for item in skipped:
+            heapq.heappush(heap, item)
+        return found
+
+    def charge(self, faculty_id: str, hours: float = 1) -> None:
+        """Book hours against a member's cap."""
+        self._update(faculty_id, self.remaining[faculty_id] - hours)
+
+    def refund(self, faculty_id: str, hours: float = 1) -> None:
+        """Return hours booked with ``charge``."""
+        self._update(faculty_id, self.remaining[faculty_id] + hours)
+
+    def _update(self, faculty_id: str, remaining: float) -> None:
+        self.remaining[faculty_id] = remaining
+        entry = (-remaining, self.order[faculty_id], faculty_id)
+        for subject_id in self.subjects_of.get(faculty_id, []):
+            heap = self.heaps[subject_id]
+            if len(heap) > 4 * len(self.members[subject_id]) + 16:
+                # Too many outdated entries: start over from current values
+                self._rebuild(subject_id)
+            else:
+                heapq.heappush(heap, entry)
+
+    def _rebuild(self, subject_id: str) -> None:
+        heap = [(-self.remaining[f], self.order[f], f) for f in self.members[subject_id]]
+        heapq.heapify(heap)
+        self.heaps[subject_id] = heap
+
+
+class SchedulingProblem:
+    """
+    Solver-facing view of a timetable request.
+
+    Input records are converted to dicts once, time slots are addressed by
+    integer index, and faculty, classroom and section usage are tracked as
+    bitmasks so availability checks are single AND operations.
+    """
+
+    def __init__(
+        self,
+        sections: List[Any],
+        subjects: List[Any],
+        faculty: List[Any],
+        classrooms: List[Any],
+        time_slots: List[Dict[str, Any]],
+        rules: Optional["RuleSet"] = None
+    ):
+        self.time_slots = time_slots
+        self.num_slots = len(time_slots)
+        self.slot_index = {slot["slot_id"]: i for i, slot in enumerate(time_slots)}
+
+        # Day and within-day period of each slot, for day-level objectives
+        self.slot_day: List[str] = []
+        self.slot_period: List[int] = []
+        self.periods_per_day: Dict[str, int] = {}
+        for slot in time_slots:
+            day = slot["day"]
+            self.slot_day.append(day)
+            self.slot_period.append(self.periods_per_day.get(day, 0))
+            self.periods_per_day[day] = self.periods_per_day.get(day, 0) + 1
+
+        # Start and end minutes of each slot, and whether it runs straight into the next
+        # one, so classes in both count as back-to-back
+        self.slot_start = [to_minutes(slot["start_time"]) for slot in time_slots]
+        self.slot_end = [to_minutes(slot["end_time"]) for slot in time_slots]
+        self.joins_next = [
+            i + 1 < self.num_slots
+            and self.slot_day[i + 1] == self.slot_day[i]
+            and self.slot_start[i + 1] <= self.slot_end[i]
+            for i in range(self.num_slots)
+        ]
+
+        self.sections = [to_dict(s) for s in sections]
+        self.subjects = [to_dict(s) for s in subjects]
+        self.faculty = [to_dict(f) for f in faculty]
+        self.classrooms = [to_dict(c) for c in classrooms]
+        self.sections_by_id = {s.get("id"): s for s in self.sections}
+        self.subjects_by_id = {s.get("id"): s for s in self.subjects}
+        self.faculty_by_id = {f.get("id"): f for f in self.faculty}
+        self.classrooms_by_id = {c.get("id"): c for c in self.classrooms}
+
+        # Subject ID -> faculty who can teach it, in faculty-list order
+        self.faculty_by_subject: Dict[str, List[Dict[str, Any]]] = {}
+        for faculty_dict in self.faculty:
+            for subject_id in dict.fromkeys(faculty_dict.get("subjects_can_teach", [])):
+                self.faculty_by_subject.setdefault(subject_id, []).append(faculty_dict)
+
+        self.rooms = RoomIndex(self.classrooms)
+        # Weekly hour caps; charged by the callers that enforce them, not by assign()
+        self.faculty_load = FacultyLoad(self.faculty, self.faculty_by_subject)
+
+        self.faculty_busy = OccupancyGrid(self.num_slots)
+        self.classroom_busy = OccupancyGrid(self.num_slots)
+        self.section_busy = OccupancyGrid(self.num_slots)
+
+        # Unavailable slots are blocked up front, so every solver sees them as busy
+        self.faculty_unavailable = AvailabilityIndex(self.faculty, time_slots)
+        self.classroom_unavailable = AvailabilityIndex(self.classrooms, time_slots)
+        for resource_id, mask in self.faculty_unavailable.blocked.items():
+            self.faculty_busy.block(resource_id, mask)
+        for resource_id, mask in self.classroom_unavailable.blocked.items():
+            self.classroom_busy.block(resource_id, mask)
+
+        # Hard time-window rules are blocked the same way; subjects get their own masks
+        # and soft rules become per-slot penalties, by target kind and resource ID
+        self.rules = rules
+        self.subject_blocked: Dict[str, int] = {}
+        self.slot_penalties: Dict[str, Dict[str, List[float]]] = {}
+        # Hard max_consecutive limits in minutes, for faculty and sections
+        self.run_limits: Dict[str, Dict[str, int]] = {}
+        self.labs_required = bool(rules) and rules.labs_required
+        if rules:
+            records = {
+                "faculty": (self.faculty, self.faculty_busy),
+                "classroom": (self.classrooms, self.classroom_busy),
+                "section": (self.sections, self.section_busy),
+                "subject": (self.subjects, None)
+            }
+            for target, (items, grid) in records.items():
+                ids = [item.get("id") for item in items]
+                masks = rules.slot_masks(target, ids, time_slots)
+                if grid is None:
+                    self.subject_blocked = masks
+                else:
+                    for resource_id, mask in masks.items():
+                        grid.block(resource_id, mask)
+                penalties = rules.slot_penalties(target, ids, time_slots)
+                if penalties:
+                    self.slot_penalties[target] = penalties
+            for target in ("faculty", "section"):
+                limits = rules.run_limits(target, [item.get("id") for item in records[target][0]])
+                if limits:
+                    self.run_limits[target] = limits
+
+    def section_subjects(self, section: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Subjects taken by a section, in subject-list order."""
+        subject_ids = set(section.get("subjects", []))
+        return [s for s in self.subjects if s.get("id") in subject_ids]
+
+    def open_slots(self, section_id: str, subject_id: str) -> int:
+        """Mask of slots where the section is free and no hard rule forbids the subject."""
+        return self.section_busy.free_mask(section_id) & ~self.subject_blocked.get(subject_id, 0)
+
+    def room_type(self, subject_id: str) -> Optional[str]:
+        """Room type a subject's classes must use, or None for any room."""
+        if self.labs_required and is_lab_subject(self.subjects_by_id.get(subject_id, {})):
+            return "lab"
+        return None
+
+    def room_families(self, subject_id: str) -> List[Any]:
+        """
+        Room buckets a subject's classes may use, in the order to search them.
+
+        Under a hard lab-room rule every other subject tries non-lab rooms
+        before labs, so it only takes a lab when nothing else fits. Rooms
+        within one bucket are nested by capacity, so best-fit inside each
+        bucket loses no solution.
+        """
+        room_type = self.room_type(subject_id)
+        if room_type is not None or not self.labs_required:
+            return [room_type]
+        return [NON_LAB_ROOMS, "lab"]
+
+    def free_room(self, section_id: str, subject_id: str, slot: int) -> Optional[Dict[str, Any]]:
+        """Smallest free room at a slot for a section's class, from the first family with one."""
+        size = self.sections_by_id[section_id].get("num_students", 0)
+        for room_type in self.room_families(subject_id):
+            room = self.rooms.find_free(size, self.classroom_busy, slot, room_type)
+            if room is not None:
+                return room
+        return None
+
+    def run_slots(self, target: str, resource_id: str, slot: int) -> range:
+        """
+        Slots of the back-to-back run a class at a slot would join.
+
+        Only classes count: slots a resource is blocked in are not part of
+        its runs.
+        """
+        grid = self.faculty_busy if target == "faculty" else self.section_busy
+        classes = grid.busy_mask(resource_id) & ~grid.blocked.get(resource_id, 0) | 1 << slot
+        first = last = slot
+        while first > 0 and self.joins_next[first - 1] and classes >> (first - 1) & 1:
+            first -= 1
+        while self.joins_next[last] and classes >> (last + 1) & 1:
+            last += 1
+        return range(first, last + 1)
+
+    def run_ok(self, target: str, resource_id: str, slot: int) -> bool:
+        """
+        Whether a class at a slot keeps a faculty member's or section's run
+        within its hard max_consecutive limit.
+        """
+        limit = self.run_limits.get(target, {}).get(resource_id)
+        if limit is None:
+            return True
+        run = self.run_slots(target, resource_id, slot)
+        return self.slot_end[run[-1]] - self.slot_start[run[0]] <= limit
+
+    def runs_ok(self, section_id: str, faculty_id: str, slot: int) -> bool:
+        """Whether a class at a slot keeps its section's and faculty member's runs within limits."""
+        return not self.run_limits or (
+            self.run_ok("section", section_id, slot) and self.run_ok("faculty", faculty_id, slot)
+        )
+
+    def rule_penalty(self, placement: tuple) -> float:
+        """
+        Summed weight of the soft rules a placement breaks.
+
+        Args:
+            placement: (section_id, subject_id, slot, faculty_id, classroom_id)
+        """
+        if not self.rules:
+            return 0.0
+        section_id, subject_id, slot, faculty_id, classroom_id = placement
+        penalty = 0.0
+        for target, resource_id in (
+            ("section", section_id), ("subject", subject_id),
+            ("faculty", faculty_id), ("classroom", classroom_id)
+        ):
+            per_slot = self.slot_penalties.get(target, {}).get(resource_id)
+            if per_slot:
+                penalty += per_slot[slot]
+        if self.rules.lab_rules and is_lab_subject(self.subjects_by_id.get(subject_id, {})):
+            if self.classrooms_by_id[classroom_id].get("room_type") != "lab":
+                penalty += sum(rule.weight for rule in self.rules.lab_rules if not rule.hard)
+        return penalty
+
+    def qualified_faculty(self, subject_id: str) -> List[Dict[str, Any]]:
+        """Faculty who can teach a subject."""
+        return self.faculty_by_subject.get(subject_id, [])
+
+    def common_free_mask(self, section_id: str, faculty_id: str, classroom_id: str) -> int:
+        """Mask of slots in which the section, faculty member and classroom are all free."""
+        return ~(
+            self.section_busy.busy_mask(section_id)
+            | self.faculty_busy.busy_mask(faculty_id)
+            | self.classroom_busy.busy_mask(classroom_id)
+        ) & self.section_busy.full_mask
+
+    def assign(self, section_id: str, faculty_id: str, classroom_id: str, slot: int) -> None:
+        """Occupy the section, faculty member and classroom at a slot index."""
+        self.section_busy.occupy(section_id, slot)
+        self.faculty_busy.occupy(faculty_id, slot)
+        self.classroom_busy.occupy(classroom_id, slot)
+
+    def unassign(self, section_id: str, faculty_id: str, classroom_id: str, slot: int) -> None:
+        """Free the section, faculty member and classroom at a slot index."""
+        self.section_busy.release(section_id, slot)
+        self.faculty_busy.release(faculty_id, slot)
+        self.classroom_busy.release(classroom_id, slot)
+
+    def lesson_groups(self) -> List[tuple]:
+        """(section, subject, hours_per_week) for every subject every section takes."""
+        return [
+            (section, subject, subject.get("hours_per_week", 3))
+            for section in self.sections
+            for subject in self.section_subjects(section)
+        ]
+
+    def slot_mask(self, time_slots: List[Any]) -> int:
+        """Mask of grid slots that overlap any of the given time slots."""
+        return slot_mask(self.time_slots, time_slots)
+
+    def block_entries(self, entries: List[Dict[str, Any]]) -> None:
+        """
+        Permanently occupy the grid slots that fixed schedule entries overlap.
+
+        Entries off the slot grid are kept as they are; their section,
+        faculty member and classroom stay busy in every grid slot their
+        time touches. Entries without a readable time range are skipped.
+        """
+        for entry in entries:
+            try:
+                mask = self.slot_mask([entry])
+            except (KeyError, AttributeError, ValueError):
+                continue
+            if not mask:
+                continue
+            for grid, key in (
+                (self.section_busy, "section_id"),
+                (self.faculty_busy, "faculty_id"),
+                (self.classroom_busy, "classroom_id")
+            ):
+                resource_id = entry.get(key)
+                if resource_id is not None:
+                    grid.block(resource_id, mask)
+
+    def section_components(self) -> List[List[str]]:
+        """
+        Section IDs grouped into components that share no qualified faculty.
+
+        Components are listed in section-list order. Rooms are not used to
+        link sections: any room large enough can host any section, so room
+        edges would join nearly everything into one component.
+        """
+        parent: Dict[Any, Any] = {}
+
+        def find(node):
+            parent.setdefault(node, node)
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        for section in self.sections:
+            root = find(("section", section.get("id")))
+            for subject in self.section_subjects(section):
+                for faculty_dict in self.qualified_faculty(subject.get("id")):
+                    parent[find(("faculty", faculty_dict.get("id")))] = root
+                    root = find(root)
+
+        components: Dict[Any, List[str]] = {}
+        for section in self.sections:
+            section_id = section.get("id")
+            components.setdefault(find(("section", section_id)), []).append(section_id)
+        return list(components.values())
+
+    def placement_for(self, entry: Dict[str, Any]) -> Optional[tuple]:
+        """(section_id, subject_id, slot, faculty_id, classroom_id) for an entry on the grid."""
+        slot_key = f"{entry.get('day')}_{entry.get('start_time')}_{entry.get('end_time')}"
+        slot = self.slot_index.get(slot_key)
+        if slot is None:
+            return None
+        return (
+            entry.get("section_id"),
+            entry.get("subject_id"),
+            slot,
+            entry.get("faculty_id"),
+            entry.get("classroom_id")
+        )
+
+    def entry_for(self, placement: tuple) -> Dict[str, Any]:
+        """Build a schedule entry from a placement tuple."""
+        section_id, subject_id, slot, faculty_id, classroom_id = placement
+        return self.make_entry(
+            slot,
+            self.subjects_by_id[subject_id],
+            self.faculty_by_id[faculty_id],
+            self.classrooms_by_id[classroom_id],
+            self.sections_by_id[section_id]
+        )
+
+    def make_entry(
+        self,
+        slot: int,
+        subject: Dict[str, Any],
+        faculty: Dict[str, Any],
+        classroom: Dict[str, Any],
+        section: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Build a schedule entry dict for a placement."""
+        time_slot = self.time_slots[slot]
+        return {
+            "day": time_slot["day"],
+            "start_time": time_slot["start_time"],
+            "end_time": time_slot["end_time"],
+            "subject": subject,
+            "subject_id": subject["id"],
+            "faculty": faculty,
+            "faculty_id": faculty["id"],
+            "classroom": classroom,
+            "classroom_id": classroom["id"],
+            "section": section,
+            "section_id": section["id"]
+        }
@@ -0,0 +1,387 @@
+"""Timetable repair agent for incremental faculty and classroom changes."""
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from agents.base_agent import BaseAgent, AgentResult
+from agents.problem import SchedulingProblem, generate_time_slots, iter_bits, to_dict
+from agents.rules import RuleSet
+from config import settings
+from services.solver_service import solver_service
+
+
+class ScheduleRepairer:
+    """
+    Local repair of a stored schedule after resources change.
+
+    Placements that are still valid are kept exactly as they are. Each
+    invalid placement is re-placed as close to its old slot as possible,
+    preferring its old faculty member. When nothing fits directly, one
+    blocking class may be moved aside (an ejection chain of length one).
+    """
+
+    def __init__(
+        self,
+        problem: SchedulingProblem,
+        placements: List[tuple],
+        affected: Optional[Set[int]] = None
+    ):
+        """
+        Args:
+            problem: Compiled problem with the updated resources
+            placements: Current placements, in schedule order
+            affected: Indices of the placements whose resources changed.
+                Only these are checked in full; the others only have to be
+                free of the placements before them. None checks them all.
+        """
+        self.problem = problem
+        self.placements = list(placements)
+        # (kind, resource_id, slot) -> index of the placement occupying it
+        self.occupant: Dict[tuple, int] = {}
+        self.changed: Dict[int, Optional[tuple]] = {}
+        self.moved: List[int] = []
+        self.displaced: List[int] = []
+
+        for i, placement in enumerate(self.placements):
+            checked = affected is None or i in affected
+            if self._valid(placement) if checked else self._free(placement):
+                self._assign(i, placement)
+            else:
+                self.displaced.append(i)
+
+    def run(self, time_limit: float) -> List[int]:
+        """
+        Re-place every displaced class.
+
+        Returns:
+            Indices of the displaced placements that could not be re-placed
+        """
+        deadline = time.monotonic() + time_limit
+        unplaced = []
+        for i in self.displaced:
+            placement = (
+                self._direct(self.placements[i])
+                or (time.monotonic() < deadline and self._with_ejection(self.placements[i]))
+                or None
+            )
+            self.changed[i] = placement
+            if placement is None:
+                unplaced.append(i)
+            else:
+                self._assign(i, placement)
+        return unplaced
+
+    def _valid(self, placement: tuple) -> bool:
+        """Check that a placement's resources still exist, are free and satisfy the hard rules."""
+        section_id, subject_id, slot, faculty_id, classroom_id = placement
+        problem = self.problem
+        room_type = problem.room_type(subject_id)
+        return (
+            faculty_id in problem.faculty_by_id
+            and classroom_id in problem.classrooms_by_id
+            and problem.open_slots(section_id, subject_id) >> slot & 1
+            and self._free(placement)
+            and problem.runs_ok(section_id, faculty_id, slot)
+            and (
+                room_type is None
+                or problem.classrooms_by_id[classroom_id].get("room_type") == room_type
+            )
+        )
+
+    def _free(self, placement: tuple) -> bool:
+        """Check that no placement kept so far uses the same section, faculty or room slot."""
+        section_id, _, slot, faculty_id, classroom_id = placement
+        problem = self.problem
+        return (
+            problem.section_busy.is_free(section_id, slot)
+            and problem.faculty_busy.is_free(faculty_id, slot)
+            and problem.classroom_busy.is_free(classroom_id, slot)
+        )
+
+    def _assign(self, i: int, placement: tuple) -> None:
+        section_id, _, slot, faculty_id, classroom_id = placement
+        self.problem.assign(section_id, faculty_id, classroom_id, slot)
+        self.problem.faculty_load.charge(faculty_id)
+        self.occupant[("faculty", faculty_id, slot)] = i
+        self.occupant[("room", classroom_id, slot)] = i
+        self.placements[i] = placement
+
+    def _unassign(self, i: int) -> None:
+        section_id, _, slot, faculty_id, classroom_id = self.placements[i]
+        self.problem.unassign(section_id, faculty_id, classroom_id, slot)
+        self.problem.faculty_load.refund(faculty_id)
+        del self.occupant[("faculty", faculty_id, slot)]
+        del self.occupant[("room", classroom_id, slot)]
+
+    def _candidate_slots(self, placement: tuple) -> List[int]:
+        """Slots open to the section and subject, nearest to the old slot first."""
+        section_id, subject_id, old_slot, _, _ = placement
+        old_day = self.problem.slot_day[old_slot]
+        return sorted(
+            iter_bits(self.problem.open_slots(section_id, subject_id)),
+            key=lambda slot: (self.problem.slot_day[slot] != old_day, abs(slot - old_slot))
+        )
+
+    def _candidate_faculty(self, placement: tuple) -> List[str]:
+        """Qualified faculty under their weekly cap, the old faculty member first."""
+        _, subject_id, _, old_faculty_id, _ = placement
+        faculty_load = self.problem.faculty_load
+        faculty_ids = [
+            f["id"] for f in self.problem.qualified_faculty(subject_id)
+            if faculty_load.has_capacity(f["id"])
+        ]
+        if old_faculty_id in faculty_ids:
+            faculty_ids.remove(old_faculty_id)
+            faculty_ids.insert(0, old_faculty_id)
+        return faculty_ids
+
+    def _direct(self, placement: tuple, exclude_slot: Optional[int] = None) -> Optional[tuple]:
+        """Closest placement for the class that needs no other class to move."""
+        problem = self.problem
+        section_id, subject_id = placement[0], placement[1]
+        faculty_ids = self._candidate_faculty(placement)
+        for slot in self._candidate_slots(placement):
+            if slot == exclude_slot or not problem.run_ok("section", section_id, slot):
+                continue
+            room = problem.free_room(section_id, subject_id, slot)
+            if room is None:
+                continue
+            for faculty_id in faculty_ids:
+                if (
+                    problem.faculty_busy.is_free(faculty_id, slot)
+                    and problem.run_ok("faculty", faculty_id, slot)
+                ):
+                    return (section_id, subject_id, slot, faculty_id, room["id"])
+        return None
+
+    def _with_ejection(self, placement: tuple) -> Optional[tuple]:
+        """Place the class by moving blocking classes out of one slot."""
+        problem = self.problem
+        section_id, subject_id = placement[0], placement[1]
+        size = problem.sections_by_id[section_id].get("num_students", 0)
+        room_families = problem.room_families(subject_id)
+        for slot in self._candidate_slots(placement):
+            if not problem.run_ok("section", section_id, slot):
+                continue
+            ejected = []
+            room = problem.free_room(section_id, subject_id, slot)
+            if room is None:
+                # Free the smallest fitting room held by a class that can move
+                candidates = [
+                    c for room_type in room_families for c in problem.rooms.fitting(size, room_type)
+                ]
+                for candidate in candidates:
+                    blocker = self.occupant.get(("room", candidate["id"], slot))
+                    if blocker is not None and self._eject(blocker, slot, ejected):
+                        room = candidate
+                        break
+                if room is None:
+                    continue
+
+            # Moving a class out of the room may have used up someone's last hour
+            faculty_ids = self._candidate_faculty(placement)
+            faculty_id = next((
+                f for f in faculty_ids
+                if problem.faculty_busy.is_free(f, slot) and problem.run_ok("faculty", f, slot)
+            ), None)
+            if faculty_id is None:
+                for candidate in faculty_ids:
+                    blocker = self.occupant.get(("faculty", candidate, slot))
+                    if (
+                        blocker is not None
+                        and self._eject(blocker, slot, ejected)
+                        and problem.run_ok("faculty", candidate, slot)
+                    ):
+                        faculty_id = candidate
+                        break
+            if faculty_id is not None:
+                self.moved.extend(
+                    i for i, _, _ in ejected if i not in self.displaced and i not in self.moved
+                )
+                return (section_id, subject_id, slot, faculty_id, room["id"])
+
+            # Put back anything moved for this slot
+            for i, old, was_changed in reversed(ejected):
+                self._unassign(i)
+                self._assign(i, old)
+                if was_changed:
+                    self.changed[i] = old
+                else:
+                    del self.changed[i]
+        return None
+
+    def _eject(self, i: int, slot: int, ejected: List[tuple]) -> bool:
+        """Move placement i away from a slot if it has a direct alternative."""
+        old = self.placements[i]
+        self._unassign(i)
+        alternative = self._direct(old, exclude_slot=slot)
+        if alternative is None:
+            self._assign(i, old)
+            return False
+        self._assign(i, alternative)
+        ejected.append((i, old, i in self.changed))
+        self.changed[i] = alternative
+        return True
+
+
+def repair_schedule(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Repair a serialized schedule; entry point for solver worker processes.
+
+    Entries off the grid or for unknown sections and subjects are kept as
+    they are and hold every grid slot they overlap; the rest are checked
+    and repaired. If ``changed_faculty`` and ``changed_classrooms`` list the
+    resources that changed, only the entries using them are checked in
+    full.
+
+    Returns:
+        ``changed`` (entry index -> new schedule entry, or None if it could
+        not be re-placed), the numbers of ``displaced`` and ``moved``
+        entries, and the ``unscheduled`` (section_id, subject_id) pairs
+    """
+    problem = SchedulingProblem(
+        payload["sections"],
+        payload["subjects"],
+        payload["faculty"],
+        payload["classrooms"],
+        generate_time_slots(),
+        RuleSet(payload.get("constraints", []))
+    )
+
+    indices = []
+    placements = []
+    fixed_entries = []
+    for i, entry in enumerate(payload["entries"]):
+        placement = problem.placement_for(entry)
+        if (
+            placement is not None
+            and placement[0] in problem.sections_by_id
+            and placement[1] in problem.subjects_by_id
+        ):
+            indices.append(i)
+            placements.append(placement)
+        else:
+            fixed_entries.append(entry)
+    problem.block_entries(fixed_entries)
+
+    affected = None
+    if "changed_faculty" in payload or "changed_classrooms" in payload:
+        faculty_ids = set(payload.get("changed_faculty", []))
+        classroom_ids = set(payload.get("changed_classrooms", []))
+        affected = {
+            k for k, placement in enumerate(placements)
+            if placement[3] in faculty_ids or placement[4] in classroom_ids
+        }
+
+    repairer = ScheduleRepairer(problem, placements, affected)
+    unplaced = repairer.run(payload["time_limit"])
+    return {
+        "changed": {
+            indices[k]: placement and problem.entry_for(placement)
+            for k, placement in repairer.changed.items()
+        },
+        "displaced": len(repairer.displaced),
+        "moved": len(repairer.moved),
+        "unscheduled": [
+            {"section_id": placements[k][0], "subject_id": placements[k][1]}
+            for k in unplaced
+        ]
+    }
+
+
+class RepairAgent(BaseAgent):
+    """Agent responsible for patching a timetable after faculty or classroom changes."""
+
+    def __init__(self):
+        super().__init__(
+            name="RepairAgent",
+            description="Re-places only the classes affected by a change"
+        )
+
+    async def execute(self, input_data: Dict[str, Any]) -> AgentResult:
+        """
+        Repair a stored schedule against updated resources.
+
+        Compiling, checking and repairing all run in the solver process
+        pool; only each entry's time and IDs go to the worker, and only the
+        changed entries come back.
+
+        Args:
+            input_data: Contains schedule_entries and the current sections,
+                subjects, faculty (with unavailable_slots), classrooms and
+                constraints, plus an optional time_limit in seconds and
+                optional changed_faculty and changed_classrooms ID lists
+                limiting the full check to the entries that use them
+
+        Returns:
+            AgentResult with the repaired schedule and a list of changes
+        """
+        try:
+            time_limit = input_data.get("time_limit")
+            if time_limit is None:
+                time_limit = settings.optimizer_time_limit
+            time_limit = min(time_limit, settings.agent_timeout)
+
+            entries = input_data.get("schedule_entries", [])
+            outcome = await solver_service.run(repair_schedule, {
+                "sections": [to_dict(s) for s in input_data.get("sections", [])],
+                "subjects": [to_dict(s) for s in input_data.get("subjects", [])],
+                "faculty": [to_dict(f) for f in input_data.get("faculty", [])],
+                "classrooms": [to_dict(c) for c in input_data.get("classrooms", [])],
+                "constraints": [to_dict(c) for c in input_data.get("constraints", [])],
+                "entries": [self._summary(entry) for entry in entries],
+                "time_limit": time_limit,
+                **{
+                    key: list(input_data[key])
+                    for key in ("changed_faculty", "changed_classrooms") if key in input_data
+                }
+            })
+
+            replaced = outcome["changed"]
+            schedule_entries = []
+            changes = []
+            for i, entry in enumerate(entries):
+                if i not in replaced:
+                    schedule_entries.append(entry)
+                    continue
+                new_entry = replaced[i]
+                if new_entry:
+                    schedule_entries.append(new_entry)
+                changes.append({
+                    "before": self._summary(entry),
+                    "after": self._summary(new_entry) if new_entry else None
+                })
+
+            unscheduled = outcome["unscheduled"]
+            message = (
+                f"Repaired {outcome['displaced']} affected entries "
+                f"({outcome['moved']} other entries moved to make room)"
+            )
+            if unscheduled:
+                message += f"; {len(unscheduled)} could not be re-placed"
+
+            return AgentResult(
+                success=True,
+                data={
+                    "schedule_entries": schedule_entries,
+                    "changes": changes,
+                    "affected": outcome["displaced"],
+                    "moved": outcome["moved"],
+                    "unscheduled": unscheduled
+                },
+                message=message
+            )
+
+        except Exception as e:
+            return AgentResult(
+                success=False,
+                message=f"Failed to repair timetable: {str(e)}",
+                errors=[str(e)]
+            )
+
+    def _summary(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Identifying fields of a schedule entry."""
+        keys = (
+            "day", "start_time", "end_time",
+            "section_id", "subject_id", "faculty_id", "classroom_id"
+        )
+        return {key: entry.get(key) for key in keys}
@@ -0,0 +1,293 @@
+"""Declarative scheduling rules compiled from user-defined constraints."""
+from typing import Any, Dict, List, Optional
+
+from agents.problem import is_lab_subject, merge_runs, to_clock, to_dict, to_minutes
+
+RULE_TARGETS = ("faculty", "section", "subject", "classroom")
+
+# Wildcard ID: the rule applies to every resource of its target kind
+ALL = "*"
+
+DAY_MINUTES = 24 * 60
+
+
+class Rule:
+    """
+    One constraint's ``parameters`` compiled into a checkable rule.
+
+    Supported forms, each naming exactly one of faculty, section, subject
+    or classroom (an ID, a list of IDs, or "*" for all) unless noted::
+
+        {"rule": "not_before", "faculty": "F1", "time": "10:00"}
+        {"rule": "not_after", "section": ["S1", "S2"], "time": "15:00"}
+        {"rule": "not_on", "subject": "MATH101", "days": ["Friday"]}
+        {"rule": "max_consecutive", "section": "S1", "hours": 2}
+        {"rule": "lab_rooms"}  # lab subjects only in lab rooms; no target
+
+    The first three are time windows and compile to slot masks.
+    """
+
+    def __init__(self, constraint: Dict[str, Any]):
+        params = constraint.get("parameters") or {}
+        self.constraint_id = constraint.get("id")
+        self.name = constraint.get("name") or self.constraint_id
+        self.hard = constraint.get("constraint_type", "hard") == "hard"
+        self.weight = float(constraint.get("priority", 1))
+        self.kind = params.get("rule")
+
+        self.target: Optional[str] = None
+        self.ids: List[str] = []
+        # Forbidden (day or None for every day, start, end) windows in minutes since midnight
+        self.windows: List[tuple] = []
+        self.limit = 0
+        self._grid: Optional[List[Dict[str, Any]]] = None
+        self._mask = 0
+
+        if self.kind == "lab_rooms":
+            return
+        if self.kind not in ("not_before", "not_after", "not_on", "max_consecutive"):
+            raise ValueError(f"unknown rule '{self.kind}'")
+
+        targets = [t for t in RULE_TARGETS if t in params]
+        if len(targets) != 1:
+            raise ValueError(f"'{self.kind}' needs exactly one of {', '.join(RULE_TARGETS)}")
+        self.target = targets[0]
+        ids = params[self.target]
+        self.ids = [ids] if isinstance(ids, str) else list(ids)
+
+        if self.kind == "not_before":
+            self.windows = [(None, 0, to_minutes(params["time"]))]
+        elif self.kind == "not_after":
+            self.windows = [(None, to_minutes(params["time"]), DAY_MINUTES)]
+        elif self.kind == "not_on":
+            days = params["days"]
+            days = [days] if isinstance(days, str) else days
+            self.windows = [(day, 0, DAY_MINUTES) for day in days]
+        else:
+            if self.target not in ("faculty", "section"):
+                raise ValueError("'max_consecutive' applies to faculty or a section")
+            self.limit = round(float(params["hours"]) * 60)
+
+    def forbids(self, day: Any, start: int, end: int) -> bool:
+        """Whether a time range overlaps one of the rule's forbidden windows."""
+        return any(
+            (window_day is None or window_day == day) and window_start < end and start < window_end
+            for window_day, window_start, window_end in self.windows
+        )
+
+    def slot_mask(self, time_slots: List[Dict[str, Any]]) -> int:
+        """Mask of grid slots the rule forbids, computed once per grid."""
+        if self._grid is not time_slots:
+            self._mask = 0
+            for i, time_slot in enumerate(time_slots):
+                start, end = to_minutes(time_slot["start_time"]), to_minutes(time_slot["end_time"])
+                if self.forbids(time_slot["day"], start, end):
+                    self._mask |= 1 << i
+            self._grid = time_slots
+        return self._mask
+
+
+class RuleSet:
+    """
+    All rules from a list of constraints, indexed for constant-time lookup.
+
+    Constraints without a ``rule`` parameter are descriptive and ignored;
+    malformed ones are skipped and listed in ``errors``. Window rules are
+    grouped by (target, ID), so checking an entry costs one lookup per
+    resource it uses no matter how many rules exist.
+    """
+
+    def __init__(self, constraints: List[Any]):
+        self.rules: List[Rule] = []
+        self.errors: List[str] = []
+        for constraint in constraints or []:
+            constraint = to_dict(constraint)
+            if not (constraint.get("parameters") or {}).get("rule"):
+                continue
+            try:
+                self.rules.append(Rule(constraint))
+            except (KeyError, TypeError, ValueError) as e:
+                name = constraint.get("name") or constraint.get("id")
+                self.errors.append(f"Rule error: {name}: {e}")
+
+        # target -> ID (or ALL) -> rules
+        self.windows: Dict[str, Dict[str, List[Rule]]] = {target: {} for target in RULE_TARGETS}
+        self.consecutive: Dict[str, Dict[str, List[Rule]]] = {target: {} for target in RULE_TARGETS}
+        self.lab_rules = [rule for rule in self.rules if rule.kind == "lab_rooms"]
+        for rule in self.rules:
+            index = self.consecutive if rule.kind == "max_consecutive" else self.windows
+            for resource_id in rule.ids:
+                index[rule.target].setdefault(resource_id, []).append(rule)
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    @property
+    def labs_required(self) -> bool:
+        """Whether a hard rule keeps lab subjects in lab rooms."""
+        return any(rule.hard for rule in self.lab_rules)
+
+    def window_rules(self, target: str, resource_id: Any) -> List[Rule]:
+        """Window rules for one resource, including wildcard rules."""
+        by_id = self.windows[target]
+        if not by_id:
+            return []
+        return by_id.get(resource_id, []) + by_id.get(ALL, [])
+
+    def slot_masks(
+        self,
+        target: str,
+        resource_ids: List[str],
+        time_slots: List[Dict[str, Any]]
+    ) -> Dict[str, int]:
+        """Grid slots forbidden by hard window rules, per resource that has any."""
+        masks = {}
+        for resource_id in resource_ids:
+            mask = 0
+            for rule in self.window_rules(target, resource_id):
+                if rule.hard:
+                    mask |= rule.slot_mask(time_slots)
+            if mask:
+                masks[resource_id] = mask
+        return masks
+
+    def run_limits(self, target: str, resource_ids: List[str]) -> Dict[str, int]:
+        """Tightest hard max_consecutive limit in minutes, per resource that has one."""
+        by_id = self.consecutive[target]
+        limits = {}
+        if not by_id:
+            return limits
+        for resource_id in resource_ids:
+            rules = by_id.get(resource_id, []) + by_id.get(ALL, [])
+            hard = [rule.limit for rule in rules if rule.hard]
+            if hard:
+                limits[resource_id] = min(hard)
+        return limits
+
+    def slot_penalties(
+        self,
+        target: str,
+        resource_ids: List[str],
+        time_slots: List[Dict[str, Any]]
+    ) -> Dict[str, List[float]]:
+        """Summed soft-rule weight per grid slot, per resource that has any."""
+        penalties = {}
+        for resource_id in resource_ids:
+            rules = [rule for rule in self.window_rules(target, resource_id) if not rule.hard]
+            if not rules:
+                continue
+            per_slot = [0.0] * len(time_slots)
+            for rule in rules:
+                mask = rule.slot_mask(time_slots)
+                for i in range(len(time_slots)):
+                    if mask >> i & 1:
+                        per_slot[i] += rule.weight
+            penalties[resource_id] = per_slot
+        return penalties
+
+    def entry_violations(self, entry: Dict[str, Any]) -> List[tuple]:
+        """
+        Every window or room rule a schedule entry breaks.
+
+        Returns:
+            (rule, message, location) per broken rule, where location holds
+            the resources involved and the slot key
+        """
+        broken = []
+        day = entry.get("day")
+        try:
+            start, end = to_minutes(entry.get("start_time")), to_minutes(entry.get("end_time"))
+        except (AttributeError, ValueError):
+            start = end = None
+
+        if start is not None:
+            slot_key = f"{day}_{entry.get('start_time')}_{entry.get('end_time')}"
+            for target in RULE_TARGETS:
+                resource_id = entry.get(f"{target}_id") or entry.get(target, {}).get("id")
+                for rule in self.window_rules(target, resource_id):
+                    if rule.forbids(day, start, end):
+                        broken.append((
+                            rule,
+                            f"{target.capitalize()} {resource_id} is scheduled at {slot_key}",
+                            {"resources": {target: resource_id}, "slot": slot_key}
+                        ))
+
+        if self.lab_rules and is_lab_subject(entry.get("subject", {})):
+            classroom = entry.get("classroom", {})
+            if classroom.get("room_type") != "lab":
+                subject_id = entry.get("subject_id") or entry.get("subject", {}).get("id")
+                classroom_id = entry.get("classroom_id") or classroom.get("id")
+                location = {
+                    "resources": {"subject": subject_id, "classroom": classroom_id},
+                    "slot": None
+                }
+                message = f"Lab subject {subject_id} is in non-lab classroom {classroom_id}"
+                for rule in self.lab_rules:
+                    broken.append((rule, message, location))
+
+        return broken
+
+    def schedule_violations(self, entries: List[Dict[str, Any]]) -> List[tuple]:
+        """(rule, message, location) for every back-to-back run over a max_consecutive limit."""
+        broken = []
+        for target in ("faculty", "section"):
+            if not self.consecutive[target]:
+                continue
+
+            # (resource, day) -> [(start, end, entry index)]
+            days: Dict[tuple, List[tuple]] = {}
+            for i, entry in enumerate(entries):
+                resource_id = entry.get(f"{target}_id") or entry.get(target, {}).get("id")
+                if not resource_id:
+                    continue
+                try:
+                    start = to_minutes(entry.get("start_time"))
+                    interval = (start, to_minutes(entry.get("end_time")), i)
+                except (AttributeError, ValueError):
+                    continue
+                days.setdefault((resource_id, entry.get("day")), []).append(interval)
+
+            for (resource_id, day), intervals in days.items():
+                broken.extend(self.run_violations(target, resource_id, day, intervals))
+        return broken
+
+    def run_violations(
+        self,
+        target: str,
+        resource_id: Any,
+        day: Any,
+        intervals: List[tuple]
+    ) -> List[tuple]:
+        """
+        One resource's over-long runs of classes on one day.
+
+        Args:
+            intervals: (start, end, ..., entry index) per class, in minutes
+
+        Returns:
+            (rule, message, location) per over-long run, where location holds
+            the resource, the run's slot key and the indices of its entries
+        """
+        by_id = self.consecutive[target]
+        rules = by_id.get(resource_id, []) + by_id.get(ALL, []) if by_id else []
+        if not rules or not intervals:
+            return []
+
+        # Classes that touch or overlap form one run
+        runs = merge_runs(intervals)
+
+        broken = []
+        for rule in rules:
+            for run_start, run_end, members in runs:
+                if run_end - run_start > rule.limit:
+                    broken.append((
+                        rule,
+                        f"{target.capitalize()} {resource_id} has {(run_end - run_start) / 60:g} "
+                        f"consecutive hours on {day} (max {rule.limit / 60:g})",
+                        {
+                            "resources": {target: resource_id},
+                            "slot": f"{day}_{to_clock(run_start)}_{to_clock(run_end)}",
+                            "entries": sorted(members)
+                        }
+                    ))
+        return broken
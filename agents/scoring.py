@@ -0,0 +1,186 @@
+"""Soft-constraint scoring of schedules with a per-term breakdown."""
+from collections import Counter
+from itertools import pairwise
+from typing import Any, Dict, List, Optional
+
+from agents.problem import generate_time_slots, to_minutes
+from agents.rules import RuleSet
+
+# Penalty weights for the soft objectives
+DEFAULT_WEIGHTS = {
+    "faculty_gaps": 1.0,         # idle periods between a faculty member's classes on a day
+    "section_gaps": 1.0,         # idle periods between a section's classes on a day
+    "subject_clustering": 2.0,   # extra classes of the same subject for a section on one day
+    "heavy_back_to_back": 1.0,   # pairs of heavy subjects taught back to back to a section
+    "room_waste": 0.5,           # unused fraction of the room's capacity
+    "late_day": 0.5,             # classes in the last periods of the day
+    "custom_rules": 1.0,         # priority-weighted soft rules from user-defined constraints
+}
+
+# Number of periods at the end of each day that count as late
+LATE_PERIODS = 2
+
+# Credits from which a subject counts as heavy; lab sessions always do
+HEAVY_CREDITS = 4
+
+
+def is_heavy_subject(subject: Dict[str, Any]) -> bool:
+    """Whether a subject is demanding enough that two in a row should be avoided."""
+    return subject.get("lecture_type") == "lab" or (subject.get("credits") or 0) >= HEAVY_CREDITS
+
+
+def idle_periods(mask: int) -> int:
+    """Idle periods between the first and last set bit of a day mask."""
+    if not mask:
+        return 0
+    first = (mask & -mask).bit_length()
+    return mask.bit_length() - first + 1 - mask.bit_count()
+
+
+def adjacent_periods(mask: int) -> int:
+    """Pairs of neighbouring set bits in a day mask."""
+    return (mask & (mask >> 1)).bit_count()
+
+
+def penalty_score(penalty: float, classes: int) -> float:
+    """Penalty mapped to a 0-100 score (100 = no soft-constraint penalty)."""
+    return round(100.0 / (1.0 + penalty / max(classes, 1)), 2)
+
+
+class ScheduleScorer:
+    """
+    Weighted soft-constraint terms for a list of schedule entries.
+
+    One pass over the entries fills per (faculty, day), (section, day) and
+    (section, subject, day) histograms, and the day-level terms are read off
+    those. Time is measured in one-hour grid periods: idle time inside a
+    break of the slot grid (such as lunch) is not a gap, and two classes
+    either side of a break are back to back. This matches the bitmask
+    objective of ScheduleOptimizer, so both give the same score for a
+    schedule on the grid; entries off the grid are scored by their times.
+    Soft max_consecutive rules are left to validation warnings, as in the
+    optimizer.
+    """
+
+    def __init__(
+        self,
+        time_slots: Optional[List[Dict[str, Any]]] = None,
+        weights: Optional[Dict[str, float]] = None,
+        rules: Optional[RuleSet] = None
+    ):
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.rules = rules
+
+        by_day: Dict[Any, List[tuple]] = {}
+        for time_slot in time_slots or generate_time_slots():
+            by_day.setdefault(time_slot["day"], []).append(
+                (to_minutes(time_slot["start_time"]), to_minutes(time_slot["end_time"]))
+            )
+        # day -> [(start, end)] of the breaks between consecutive grid slots
+        self.breaks: Dict[Any, List[tuple]] = {}
+        # day -> minute from which a class counts as late
+        self.late_from: Dict[Any, int] = {}
+        for day, slots in by_day.items():
+            slots.sort()
+            self.breaks[day] = [
+                (end, next_start)
+                for (_, end), (next_start, _) in pairwise(slots)
+                if next_start > end
+            ]
+            self.late_from[day] = slots[max(len(slots) - LATE_PERIODS, 0)][0]
+
+    def score(self, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Score a schedule.
+
+        Returns:
+            score (0-100, higher is better), total weighted penalty, and the
+            raw and weighted value of every term
+        """
+        terms = self.terms(entries)
+        weighted = {term: self.weights[term] * value for term, value in terms.items()}
+        penalty = sum(weighted.values())
+        return {
+            "score": penalty_score(penalty, len(entries)),
+            "penalty": round(penalty, 3),
+            "terms": {term: round(value, 3) for term, value in terms.items()},
+            "weighted": {term: round(value, 3) for term, value in weighted.items()}
+        }
+
+    def terms(self, entries: List[Dict[str, Any]]) -> Dict[str, float]:
+        """Unweighted value of every term."""
+        terms = {term: 0.0 for term in self.weights}
+        # (faculty, day) -> [(start, end)] and (section, day) -> [(start, end, heavy)]
+        faculty_days: Dict[tuple, List[tuple]] = {}
+        section_days: Dict[tuple, List[tuple]] = {}
+        subject_days: Counter = Counter()
+
+        for entry in entries:
+            section = entry.get("section") or {}
+            classroom = entry.get("classroom") or {}
+            subject = entry.get("subject") or {}
+            capacity = classroom.get("capacity", 0)
+            if capacity > 0:
+                terms["room_waste"] += (capacity - section.get("num_students", 0)) / capacity
+            if self.rules:
+                terms["custom_rules"] += sum(
+                    rule.weight
+                    for rule, _, _ in self.rules.entry_violations(entry)
+                    if not rule.hard
+                )
+
+            try:
+                start, end = to_minutes(entry.get("start_time")), to_minutes(entry.get("end_time"))
+            except (AttributeError, ValueError):
+                continue
+            day = entry.get("day")
+            if start >= self.late_from.get(day, float("inf")):
+                terms["late_day"] += 1
+
+            section_id = entry.get("section_id") or section.get("id")
+            faculty_id = entry.get("faculty_id") or (entry.get("faculty") or {}).get("id")
+            subject_id = entry.get("subject_id") or subject.get("id")
+            if faculty_id:
+                faculty_days.setdefault((faculty_id, day), []).append((start, end, False))
+            if section_id:
+                heavy = is_heavy_subject(subject)
+                section_days.setdefault((section_id, day), []).append((start, end, heavy))
+                subject_days[(section_id, subject_id, day)] += 1
+
+        for (_, day), intervals in faculty_days.items():
+            terms["faculty_gaps"] += self._day_terms(day, intervals)[0]
+        for (_, day), intervals in section_days.items():
+            gaps, heavy_pairs = self._day_terms(day, intervals)
+            terms["section_gaps"] += gaps
+            terms["heavy_back_to_back"] += heavy_pairs
+        terms["subject_clustering"] = float(
+            sum(max(0, count - 1) for count in subject_days.values())
+        )
+        return terms
+
+    def _day_terms(self, day: Any, intervals: List[tuple]) -> tuple:
+        """
+        (idle hours, back-to-back heavy pairs) for one resource's classes on one day.
+
+        Args:
+            intervals: (start, end, heavy) per class, in minutes
+        """
+        intervals.sort()
+        gaps = 0.0
+        heavy_pairs = 0
+        _, run_end, was_heavy = intervals[0]
+        for start, end, heavy in intervals[1:]:
+            idle = max(0, start - run_end) - self._break_overlap(day, run_end, start)
+            gaps += idle / 60
+            if idle <= 0 and heavy and was_heavy:
+                heavy_pairs += 1
+            run_end = max(run_end, end)
+            was_heavy = heavy
+        return gaps, heavy_pairs
+
+    def _break_overlap(self, day: Any, start: int, end: int) -> int:
+        """Minutes of grid breaks between start and end."""
+        return sum(
+            max(0, min(end, break_end) - max(start, break_start))
+            for break_start, break_end in self.breaks.get(day, ())
+        )
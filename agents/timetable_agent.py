@@ -1,13 +1,52 @@
 """Timetable generation agent using Gemini AI."""
-from typing import Dict, Any, List, Set, Tuple
+import asyncio
+import time
+from typing import Callable, Dict, Any, List, Optional
 from agents.base_agent import BaseAgent, AgentResult
+from agents.exact_solver import ExactSolver
+from agents.problem import (
+    SchedulingProblem, FacultyLoad, OccupancyGrid, RoomIndex,
+    generate_time_slots, iter_bits, to_dict
+)
+from agents.rules import RuleSet
+from config import settings
 from services.gemini_service import gemini_service
+from services.solver_service import solver_service
 from models import Section, Subject, Faculty, Classroom
 
 
+_worker_agent = None
+
+
+def _agent() -> "TimetableAgent":
+    """Per-process agent used by the worker entry points."""
+    global _worker_agent
+    if _worker_agent is None:
+        _worker_agent = TimetableAgent()
+    return _worker_agent
+
+
+def solve_timetable(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Solve a serialized timetable problem; entry point for solver worker processes."""
+    return _agent().solve(payload)
+
+
+def plan_timetable(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Compile, partition and, unless it splits, solve a serialized problem; worker entry point."""
+    return _agent().plan(payload)
+
+
+def merge_timetable(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge the outcomes of a split problem's components; worker entry point."""
+    return _agent().merge(payload)
+
+
 class TimetableAgent(BaseAgent):
     """Agent responsible for generating timetable using AI with constraint validation."""
     
+    # Share of the time limit held back for a joint search when components clash over rooms
+    JOINT_SEARCH_SHARE = 0.25
+    
     def __init__(self):
         super().__init__(
             name="TimetableAgent",
@@ -19,6 +58,12 @@ class TimetableAgent(BaseAgent):
         """
         Generate timetable with constraint checking.
         
+        All compiling, searching and merging runs in the solver process
+        pool so the event loop stays responsive; only the serialized
+        request goes to a worker and only finished outcomes come back.
+        Independent groups of sections are solved concurrently and merged,
+        all within one deadline.
+        
         Args:
             input_data: Contains sections, subjects, faculty, classrooms, constraints
             
@@ -26,107 +71,28 @@ class TimetableAgent(BaseAgent):
             AgentResult with generated schedule
         """
         try:
-            sections = input_data.get("sections", [])
-            subjects = input_data.get("subjects", [])
-            faculty = input_data.get("faculty", [])
-            classrooms = input_data.get("classrooms", [])
-            constraints = input_data.get("constraints", [])
-            
-            # Generate time slots
-            time_slots = self._generate_time_slots()
-            
-            # Track resource usage to avoid conflicts
-            faculty_schedule: Dict[str, Set[str]] = {}  # faculty_id -> set of slot_ids
-            classroom_schedule: Dict[str, Set[str]] = {}  # classroom_id -> set of slot_ids
-            section_schedule: Dict[str, Set[str]] = {}  # section_id -> set of slot_ids
-            
-            # Generate schedule for each section with constraint checking
-            all_schedule_entries = []
-            
-            for section in sections:
-                section_dict = section if isinstance(section, dict) else section.dict()
-                section_id = section_dict.get("id")
-                section_schedule[section_id] = set()
-                
-                # Get subjects for this section
-                section_subject_ids = section_dict.get("subjects", [])
-                section_subjects = [
-                    s for s in subjects
-                    if (s.get("id") if isinstance(s, dict) else s.id) in section_subject_ids
-                ]
-                
-                # Schedule each subject for this section
-                for subject in section_subjects:
-                    subject_dict = subject if isinstance(subject, dict) else subject.dict()
-                    hours_per_week = subject_dict.get("hours_per_week", 3)
-                    
-                    # Try to schedule the required hours
-                    classes_scheduled = 0
-                    for slot in time_slots:
-                        if classes_scheduled >= hours_per_week:
-                            break
-                        
-                        slot_id = slot["slot_id"]
-                        
-                        # Check if section is already busy
-                        if slot_id in section_schedule[section_id]:
-                            continue
-                        
-                        # Find suitable faculty
-                        suitable_faculty = self._find_available_faculty(
-                            subject_dict, faculty, faculty_schedule, slot_id
-                        )
-                        
-                        if not suitable_faculty:
-                            continue
-                        
-                        # Find suitable classroom
-                        suitable_classroom = self._find_available_classroom(
-                            section_dict, classrooms, classroom_schedule, slot_id
-                        )
-                        
-                        if not suitable_classroom:
-                            continue
-                        
-                        # Create schedule entry
-                        entry = {
-                            "day": slot["day"],
-                            "start_time": slot["start_time"],
-                            "end_time": slot["end_time"],
-                            "subject": subject_dict,
-                            "subject_id": subject_dict["id"],
-                            "faculty": suitable_faculty,
-                            "faculty_id": suitable_faculty["id"],
-                            "classroom": suitable_classroom,
-                            "classroom_id": suitable_classroom["id"],
-                            "section": section_dict,
-                            "section_id": section_id
-                        }
-                        
-                        # Mark resources as used
-                        if suitable_faculty["id"] not in faculty_schedule:
-                            faculty_schedule[suitable_faculty["id"]] = set()
-                        faculty_schedule[suitable_faculty["id"]].add(slot_id)
-                        
-                        if suitable_classroom["id"] not in classroom_schedule:
-                            classroom_schedule[suitable_classroom["id"]] = set()
-                        classroom_schedule[suitable_classroom["id"]].add(slot_id)
-                        
-                        section_schedule[section_id].add(slot_id)
-                        
-                        all_schedule_entries.append(entry)
-                        classes_scheduled += 1
-            
-            return AgentResult(
-                success=True,
-                data={
-                    "schedule_entries": all_schedule_entries,
-                    "total_entries": len(all_schedule_entries),
-                    "sections_scheduled": len(sections)
-                },
-                message=f"Generated {len(all_schedule_entries)} conflict-free schedule entries for {len(sections)} sections"
-            )
+            started = time.monotonic()
+            solver = input_data.get("solver") or settings.default_solver
+            time_limit = input_data.get("time_limit")
+            if not time_limit and solver == "exact":
+                time_limit = settings.exact_solver_time_limit
+            payload = {
+                "sections": [to_dict(s) for s in input_data.get("sections", [])],
+                "subjects": [to_dict(s) for s in input_data.get("subjects", [])],
+                "faculty": [to_dict(f) for f in input_data.get("faculty", [])],
+                "classrooms": [to_dict(c) for c in input_data.get("classrooms", [])],
+                "constraints": [to_dict(c) for c in input_data.get("constraints", [])],
+                "solver": solver,
+                "time_limit": time_limit
+            }
             
+            outcome = await solver_service.run(plan_timetable, payload)
+            if outcome["status"] == "split":
+                # Sections that share no faculty are solved independently, in parallel
+                deadline = started + time_limit if time_limit else None
+                outcome = await self._solve_partitioned(payload, outcome["components"], deadline)
+            return self._build_result(outcome)
+        
         except Exception as e:
             return AgentResult(
                 success=False,
@@ -134,92 +100,458 @@ class TimetableAgent(BaseAgent):
                 errors=[str(e)]
             )
     
-    def _find_available_faculty(
-        self,
-        subject: Dict[str, Any],
-        faculty_list: List[Any],
-        faculty_schedule: Dict[str, Set[str]],
-        slot_id: str
-    ) -> Dict[str, Any]:
-        """Find faculty who can teach this subject and is available."""
-        subject_id = subject.get("id")
+    def solve(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Solve a serialized problem synchronously.
         
-        for faculty in faculty_list:
-            faculty_dict = faculty if isinstance(faculty, dict) else faculty.dict()
-            faculty_id = faculty_dict.get("id")
-            
-            # Check if faculty can teach this subject
-            can_teach = faculty_dict.get("subjects_can_teach", [])
-            if subject_id not in can_teach:
-                continue
+        Args:
+            payload: Plain-dict sections, subjects, faculty, classrooms plus solver options
             
-            # Check if faculty is available
-            if faculty_id in faculty_schedule:
-                if slot_id in faculty_schedule[faculty_id]:
-                    continue
+        Returns:
+            Compact outcome with (section_id, subject_id, slot, faculty_id,
+            classroom_id) placements and solver statistics
+        """
+        return self._solve(self._compile(payload), payload)
+    
+    def plan(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Decide how to solve a serialized problem, and solve it if it does not split.
+        
+        Sections that share no faculty form independent components. A
+        problem with one component (or with ``partition`` set to False) is
+        solved here; otherwise the exact solver's root checks run on the
+        whole problem, since shared-room shortages only show up there.
+        
+        Returns:
+            Either a finished outcome with ``schedule_entries``, or status
+            "split" with one serialized subproblem per component
+        """
+        problem = self._compile(payload)
+        components = problem.section_components() if payload.get("partition", True) else []
+        if len(components) <= 1:
+            return self._expand(problem, self._solve(problem, payload))
+        
+        if payload["solver"] == "exact":
+            reasons = ExactSolver(problem).precheck()
+            if reasons:
+                return self._expand(problem, {
+                    "solver": "exact",
+                    "status": "infeasible",
+                    "placements": [],
+                    "unscheduled": [],
+                    "reasons": reasons,
+                    "components": len(components),
+                    "nodes": 0,
+                    "backjumps": 0
+                })
+        
+        return {
+            "solver": payload["solver"],
+            "status": "split",
+            "components": [
+                self._component_payload(payload, problem, section_ids) for section_ids in components
+            ]
+        }
+    
+    def merge(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Merge component outcomes into one finished outcome.
+        
+        Components share no faculty but all draw on the same rooms, so the
+        merged placements go through a reconciliation pass that resolves
+        room clashes.
+        
+        Args:
+            payload: Serialized full problem plus the component ``outcomes``
             
-            return faculty_dict
+        Returns:
+            Finished outcome with ``schedule_entries``, or status
+            "contended" when exact components clash over rooms and need a
+            joint search
+        """
+        solver = payload["solver"]
+        outcomes = payload["outcomes"]
+        merged = {
+            "solver": solver,
+            "components": len(outcomes),
+            "unscheduled": [item for outcome in outcomes for item in outcome["unscheduled"]]
+        }
+        if solver == "exact":
+            merged["nodes"] = sum(outcome["nodes"] for outcome in outcomes)
+            merged["backjumps"] = sum(outcome["backjumps"] for outcome in outcomes)
         
-        return None
+        # A component that cannot be solved with every room to itself cannot be solved at all
+        for status in ("infeasible", "timeout"):
+            failed = [outcome for outcome in outcomes if outcome["status"] == status]
+            if failed:
+                merged.update({
+                    "status": status,
+                    "schedule_entries": [],
+                    "reasons": [reason for outcome in failed for reason in outcome["reasons"]]
+                })
+                return merged
+        
+        problem = self._compile(payload)
+        placements, unplaced = self._reconcile(
+            problem, [outcome["placements"] for outcome in outcomes]
+        )
+        
+        if unplaced and solver == "exact":
+            # Room contention between components needs a joint search
+            return {**merged, "status": "contended"}
+        
+        for section_id, subject_id in unplaced:
+            self._record_unscheduled(problem, merged["unscheduled"], section_id, subject_id)
+        
+        merged.update({
+            "status": "partial" if merged["unscheduled"] else "feasible",
+            "placements": placements,
+            "reasons": []
+        })
+        return self._expand(problem, merged)
     
-    def _find_available_classroom(
+    def _compile(self, payload: Dict[str, Any]) -> SchedulingProblem:
+        """Compile a serialized problem once: integer slots and bitmask occupancy."""
+        return SchedulingProblem(
+            payload["sections"],
+            payload["subjects"],
+            payload["faculty"],
+            payload["classrooms"],
+            self._generate_time_slots(),
+            RuleSet(payload.get("constraints", []))
+        )
+    
+    def _solve(self, problem: SchedulingProblem, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the requested solver on a compiled problem."""
+        solver = payload.get("solver", "greedy")
+        
+        if solver == "exact":
+            time_limit = payload.get("time_limit", 60.0)
+            if "deadline" in payload:
+                # Components may wait in the pool's queue; their time counts from submission
+                time_limit = min(time_limit, max(payload["deadline"] - time.time(), 0.0))
+            outcome = ExactSolver(problem, time_limit=time_limit).solve()
+            # Order entries like the greedy pass: by section, then by slot
+            section_order = {s.get("id"): i for i, s in enumerate(problem.sections)}
+            outcome["placements"].sort(key=lambda p: (section_order[p[0]], p[2]))
+            return {"solver": "exact", "unscheduled": [], **outcome}
+        if solver != "greedy":
+            raise ValueError(f"Unknown solver '{solver}' (expected 'greedy' or 'exact')")
+        
+        placements, unscheduled = self._solve_greedy(problem)
+        return {
+            "solver": "greedy",
+            "status": "partial" if unscheduled else "feasible",
+            "placements": placements,
+            "unscheduled": unscheduled
+        }
+    
+    def _expand(self, problem: SchedulingProblem, outcome: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace an outcome's placements with schedule entries, ready to leave a worker."""
+        expanded = {k: v for k, v in outcome.items() if k != "placements"}
+        expanded["schedule_entries"] = [problem.entry_for(p) for p in outcome["placements"]]
+        expanded["sections_scheduled"] = len(problem.sections)
+        return expanded
+    
+    def _build_result(self, outcome: Dict[str, Any]) -> AgentResult:
+        """Wrap a finished solver outcome in an agent result."""
+        stats = {
+            k: v for k, v in outcome.items()
+            if k not in ("schedule_entries", "sections_scheduled", "reasons")
+        }
+        
+        if outcome["status"] in ("infeasible", "timeout"):
+            return AgentResult(
+                success=False,
+                data={**stats, "reasons": outcome["reasons"]},
+                message=(
+                    f"{outcome['solver'].capitalize()} solver finished "
+                    f"with status '{outcome['status']}'"
+                ),
+                errors=outcome["reasons"]
+            )
+        
+        all_schedule_entries = outcome["schedule_entries"]
+        sections_count = outcome["sections_scheduled"]
+        
+        if outcome["solver"] == "exact":
+            message = (
+                f"Exact solver placed all {len(all_schedule_entries)} classes "
+                f"for {sections_count} sections"
+            )
+        else:
+            message = (
+                f"Generated {len(all_schedule_entries)} conflict-free schedule entries "
+                f"for {sections_count} sections"
+            )
+        if outcome["unscheduled"]:
+            message += f"; {len(outcome['unscheduled'])} subjects could not be fully scheduled"
+        
+        return AgentResult(
+            success=True,
+            data={
+                "schedule_entries": all_schedule_entries,
+                "total_entries": len(all_schedule_entries),
+                "sections_scheduled": sections_count,
+                **stats
+            },
+            message=message
+        )
+    
+    async def _solve_partitioned(
         self,
-        section: Dict[str, Any],
-        classroom_list: List[Any],
-        classroom_schedule: Dict[str, Set[str]],
-        slot_id: str
+        payload: Dict[str, Any],
+        component_payloads: List[Dict[str, Any]],
+        deadline: Optional[float]
     ) -> Dict[str, Any]:
-        """Find classroom with sufficient capacity that is available."""
-        section_size = section.get("num_students", 0)
+        """
+        Solve each section component in its own worker, then merge in one more.
         
-        # Sort classrooms by capacity (prefer smaller rooms that fit)
-        sorted_classrooms = sorted(
-            classroom_list,
-            key=lambda c: c.get("capacity") if isinstance(c, dict) else c.capacity
-        )
+        Components and the joint fallback share one deadline: components
+        get what is left of it minus JOINT_SEARCH_SHARE, and a joint search
+        over the whole problem gets whatever remains after the merge.
         
-        for classroom in sorted_classrooms:
-            classroom_dict = classroom if isinstance(classroom, dict) else classroom.dict()
-            classroom_id = classroom_dict.get("id")
-            capacity = classroom_dict.get("capacity", 0)
-            
-            # Check capacity
-            if capacity < section_size:
-                continue
+        Args:
+            payload: Serialized full problem
+            component_payloads: Serialized subproblem per component
+            deadline: time.monotonic() value by which everything must finish,
+                or None for greedy solves, which need no budget
             
-            # Check availability
-            if classroom_id in classroom_schedule:
-                if slot_id in classroom_schedule[classroom_id]:
+        Returns:
+            Finished solver outcome
+        """
+        limits = {}
+        if deadline is not None:
+            budget = max((deadline - time.monotonic()) * (1 - self.JOINT_SEARCH_SHARE), 0.0)
+            # Wall-clock time, so it means the same in every worker process
+            limits = {"time_limit": budget, "deadline": time.time() + budget}
+        outcomes = await asyncio.gather(*(
+            solver_service.run(solve_timetable, {**component, **limits})
+            for component in component_payloads
+        ))
+        
+        merged = await solver_service.run(merge_timetable, {**payload, "outcomes": outcomes})
+        if merged["status"] != "contended":
+            return merged
+        
+        # Only exact solves contend, and they always have a deadline
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return {
+                **merged,
+                "status": "timeout",
+                "schedule_entries": [],
+                "reasons": ["Time limit reached while reconciling shared classrooms"]
+            }
+        outcome = await solver_service.run(
+            plan_timetable, {**payload, "time_limit": remaining, "partition": False}
+        )
+        return {**outcome, "components": len(component_payloads)}
+    
+    def _component_payload(
+        self,
+        payload: Dict[str, Any],
+        problem: SchedulingProblem,
+        section_ids: List[str]
+    ) -> Dict[str, Any]:
+        """Serialized subproblem for one component; every classroom stays available."""
+        sections = [problem.sections_by_id[section_id] for section_id in section_ids]
+        subject_ids = {subject_id for s in sections for subject_id in s.get("subjects", [])}
+        faculty_ids = {
+            f.get("id")
+            for subject_id in subject_ids
+            for f in problem.qualified_faculty(subject_id)
+        }
+        return {
+            **payload,
+            "sections": sections,
+            "subjects": [s for s in payload["subjects"] if s.get("id") in subject_ids],
+            "faculty": [f for f in payload["faculty"] if f.get("id") in faculty_ids]
+        }
+    
+    def _reconcile(
+        self,
+        problem: SchedulingProblem,
+        component_placements: List[List[tuple]]
+    ) -> tuple:
+        """
+        Merge component placements into one conflict-free schedule.
+        
+        A class whose room is already taken moves to another free room at the
+        same slot; failing that, it is re-placed at any slot where the
+        section, a qualified faculty member and a room are all free.
+        
+        Returns:
+            (placements in section order, (section_id, subject_id) of classes
+            that could not be placed)
+        """
+        placements = []
+        displaced = []
+        for component in component_placements:
+            for section_id, subject_id, slot, faculty_id, classroom_id in component:
+                if not problem.classroom_busy.is_free(classroom_id, slot):
+                    room = self._find_available_classroom(
+                        problem.sections_by_id[section_id], problem.rooms, problem.classroom_busy,
+                        slot, problem.room_families(subject_id)
+                    )
+                    if room is None:
+                        displaced.append((section_id, subject_id))
+                        continue
+                    classroom_id = room["id"]
+                problem.assign(section_id, faculty_id, classroom_id, slot)
+                problem.faculty_load.charge(faculty_id)
+                placements.append((section_id, subject_id, slot, faculty_id, classroom_id))
+        
+        unplaced = []
+        for section_id, subject_id in displaced:
+            section_dict = problem.sections_by_id[section_id]
+            for slot in iter_bits(problem.open_slots(section_id, subject_id)):
+                if not problem.run_ok("section", section_id, slot):
                     continue
+                faculty_dict = self._find_available_faculty(
+                    problem.subjects_by_id[subject_id], problem.faculty_load, problem.faculty_busy,
+                    slot, self._faculty_runs_ok(problem, slot)
+                )
+                classroom_dict = faculty_dict and self._find_available_classroom(
+                    section_dict, problem.rooms, problem.classroom_busy, slot,
+                    problem.room_families(subject_id)
+                )
+                if classroom_dict:
+                    faculty_id, classroom_id = faculty_dict["id"], classroom_dict["id"]
+                    problem.assign(section_id, faculty_id, classroom_id, slot)
+                    problem.faculty_load.charge(faculty_id)
+                    placements.append((section_id, subject_id, slot, faculty_id, classroom_id))
+                    break
+            else:
+                unplaced.append((section_id, subject_id))
+        
+        # Stable sort keeps each section's classes in the order they were produced
+        section_order = {s.get("id"): i for i, s in enumerate(problem.sections)}
+        placements.sort(key=lambda p: section_order[p[0]])
+        return placements, unplaced
+    
+    def _record_unscheduled(
+        self,
+        problem: SchedulingProblem,
+        unscheduled: List[Dict[str, Any]],
+        section_id: str,
+        subject_id: str
+    ) -> None:
+        """Count one more missing class for a section's subject."""
+        for item in unscheduled:
+            if item["section_id"] == section_id and item["subject_id"] == subject_id:
+                item["scheduled"] -= 1
+                return
+        unscheduled.append({
+            "section_id": section_id,
+            "subject_id": subject_id,
+            "required": problem.subjects_by_id[subject_id].get("hours_per_week", 3),
+            "scheduled": problem.subjects_by_id[subject_id].get("hours_per_week", 3) - 1
+        })
+    
+    def _solve_greedy(self, problem: SchedulingProblem) -> tuple:
+        """First-fit pass over sections and subjects; returns placements and short subjects."""
+        placements = []
+        unscheduled = []
+        
+        for section_dict in problem.sections:
+            section_id = section_dict.get("id")
             
-            return classroom_dict
+            # Schedule each subject for this section
+            for subject_dict in problem.section_subjects(section_dict):
+                hours_per_week = subject_dict.get("hours_per_week", 3)
+                room_types = problem.room_families(subject_dict["id"])
+                
+                # Try to schedule the required hours in slots where the section is free
+                classes_scheduled = 0
+                for slot in iter_bits(problem.open_slots(section_id, subject_dict["id"])):
+                    if classes_scheduled >= hours_per_week:
+                        break
+                    
+                    # Hard max_consecutive rules cap back-to-back runs
+                    if not problem.run_ok("section", section_id, slot):
+                        continue
+                    
+                    # Find suitable faculty
+                    suitable_faculty = self._find_available_faculty(
+                        subject_dict, problem.faculty_load, problem.faculty_busy, slot,
+                        self._faculty_runs_ok(problem, slot)
+                    )
+                    
+                    if not suitable_faculty:
+                        continue
+                    
+                    # Find suitable classroom
+                    suitable_classroom = self._find_available_classroom(
+                        section_dict, problem.rooms, problem.classroom_busy, slot, room_types
+                    )
+                    
+                    if not suitable_classroom:
+                        continue
+                    
+                    # Mark resources as used
+                    problem.assign(
+                        section_id, suitable_faculty["id"], suitable_classroom["id"], slot
+                    )
+                    problem.faculty_load.charge(suitable_faculty["id"])
+                    
+                    placements.append((
+                        section_id, subject_dict["id"], slot,
+                        suitable_faculty["id"], suitable_classroom["id"]
+                    ))
+                    classes_scheduled += 1
+                
+                if classes_scheduled < hours_per_week:
+                    unscheduled.append({
+                        "section_id": section_id,
+                        "subject_id": subject_dict.get("id"),
+                        "required": hours_per_week,
+                        "scheduled": classes_scheduled
+                    })
         
+        return placements, unscheduled
+    
+    def _faculty_runs_ok(
+        self,
+        problem: SchedulingProblem,
+        slot: int
+    ) -> Optional[Callable[[str], bool]]:
+        """Filter keeping faculty within their max_consecutive rules at a slot, if there are any."""
+        if not problem.run_limits:
+            return None
+        return lambda faculty_id: problem.run_ok("faculty", faculty_id, slot)
+    
+    def _find_available_faculty(
+        self,
+        subject: Dict[str, Any],
+        faculty_load: FacultyLoad,
+        faculty_busy: OccupancyGrid,
+        slot: int,
+        usable: Optional[Callable[[str], bool]] = None
+    ) -> Dict[str, Any]:
+        """
+        Find faculty who can teach this subject, is available, is under their
+        weekly cap and passes ``usable``.
+        """
+        # Prefer whoever has the most hours left, so the first-listed member is not overloaded
+        return faculty_load.best_free(subject.get("id"), faculty_busy, slot, usable=usable)
+    
+    def _find_available_classroom(
+        self,
+        section: Dict[str, Any],
+        rooms: RoomIndex,
+        classroom_busy: OccupancyGrid,
+        slot: int,
+        room_types: List[Any] = (None,)
+    ) -> Dict[str, Any]:
+        """Find an available classroom that fits, trying the given room types in order."""
+        # Rooms are pre-sorted by capacity, so this prefers smaller rooms that fit
+        for room_type in room_types:
+            room = rooms.find_free(section.get("num_students", 0), classroom_busy, slot, room_type)
+            if room is not None:
+                return room
         return None
     
     def _generate_time_slots(self) -> List[Dict[str, Any]]:
         """Generate available time slots."""
-        days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
-        time_slots = []
-        
-        # Generate slots from 9 AM to 5 PM with 1-hour duration
-        hours = [
-            ("09:00", "10:00"),
-            ("10:00", "11:00"),
-            ("11:00", "12:00"),
-            # ("12:00", "13:00"),  # Lunch break
-            ("13:00", "14:00"),
-            ("14:00", "15:00"),
-            ("15:00", "16:00"),
-            ("16:00", "17:00"),
-        ]
-        
-        for day in days:
-            for start_time, end_time in hours:
-                time_slots.append({
-                    "day": day,
-                    "start_time": start_time,
-                    "end_time": end_time,
-                    "slot_id": f"{day}_{start_time}_{end_time}"
-                })
-        
-        return time_slots
+        return generate_time_slots()
@@ -28,6 +28,28 @@ class Settings(BaseSettings):
     # Agent Configuration
     max_agent_iterations: int = 10
     agent_timeout: int = 300
+    llm_max_concurrency: int = 8  # Gemini requests in flight at once across all users
+    llm_cache_size: int = 512  # Cached deterministic-prompt responses (0 disables it)
+    llm_cache_ttl: float = 3600.0  # Seconds a cached LLM response stays valid (0 never expires)
+    llm_cache_dir: str = ""  # Directory for the on-disk LLM cache tier (empty disables it)
+    llm_cache_disk_size: int = 4096  # Files kept on disk, oldest deleted first
+    
+    # Solver Configuration
+    default_solver: str = "greedy"  # greedy, exact
+    exact_solver_time_limit: float = 60.0
+    optimizer_time_limit: float = 5.0
+    solver_workers: int = 2  # 0 runs solvers in the API process
+    result_cache_size: int = 128  # 0 disables the generation result cache
+    result_cache_dir: str = ""  # Directory for the on-disk cache tier (empty disables it)
+    result_cache_ttl: float = 86400.0  # Seconds a cached result stays valid (0 never expires)
+    result_cache_disk_size: int = 1024  # Files kept in the on-disk cache tier, oldest deleted first
+    columnar_validation_threshold: int = 50000  # Entries from which to validate in NumPy columns
+    violation_detail_limit: int = 200  # Records returned in full; the rest are only counted
+    violation_max_offset: int = 1000000  # Deepest record a page of violations may start at
+    max_daily_teaching_hours: float = 6.0  # Daily teaching hours that trigger a warning
+    max_teaching_streak_hours: float = 3.0  # Back-to-back hours that trigger a warning
+    concurrent_validation_threshold: int = 20000  # Entries from which checks run side by side
+    validation_workers: int = 4  # Threads for validation work (0 runs it on the event loop)
     
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -1,10 +1,11 @@
 """Main FastAPI application for timetable planner."""
+import copy
 import json
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import pandas as pd
@@ -12,10 +13,15 @@ import pandas as pd
 from config import settings
 from models import (
     Faculty, Subject, Classroom, Section, Constraint,
-    TimetableRequest, Timetable, ScheduleEntry
+    TimetableRequest, Timetable, ScheduleEntry, TimeSlot
 )
-from agents import TimetableAgent, ConstraintAgent
+from agents import TimetableAgent, ConstraintAgent, OptimizerAgent, RepairAgent
+from agents.constraint_agent import VIOLATION_CODES, WARNING_CODES
+from agents.rules import RuleSet
 from services.gemini_service import gemini_service
+from services.chat_parser import parse_chat_request
+from services.solver_service import solver_service
+from services.result_cache import result_cache, content_hash
 from services.firebase_auth import initialize_firebase, auth_required, get_current_user
 
 # Initialize Firebase Admin SDK
@@ -92,6 +98,20 @@ data_store = {
 # Initialize agents
 timetable_agent = TimetableAgent()
 constraint_agent = ConstraintAgent()
+optimizer_agent = OptimizerAgent()
+repair_agent = RepairAgent()
+
+
+@app.on_event("startup")
+async def start_solver_pool():
+    """Pre-warm the solver worker processes."""
+    await solver_service.start()
+
+
+@app.on_event("shutdown")
+def stop_solver_pool():
+    """Stop the solver worker processes."""
+    solver_service.shutdown()
 
 
 # Pydantic models for API
@@ -110,6 +130,17 @@ class GenerateTimetableRequest(BaseModel):
     academic_year: str
     semester: int
     section_ids: Optional[List[str]] = None  # If None, use all sections
+    solver: Optional[str] = None  # greedy, exact (defaults to settings.default_solver)
+    time_limit_seconds: Optional[float] = None  # Exact solver budget
+    optimize: bool = False  # Run the local-search optimizer after construction
+    optimize_seconds: Optional[float] = None  # Optimizer budget (defaults to settings)
+
+
+class RepairTimetableRequest(BaseModel):
+    faculty_unavailable: Dict[str, List[TimeSlot]] = {}  # Faculty ID -> new unavailable slots
+    classroom_unavailable: Dict[str, List[TimeSlot]] = {}  # Classroom ID -> new unavailable slots
+    removed_classrooms: List[str] = []
+    time_limit_seconds: Optional[float] = None  # Repair search budget (defaults to settings)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -130,8 +161,18 @@ async def health_check():
     return {"status": "healthy", "version": "0.1.0"}
 
 
-async def generate_timetable_from_chat(user_request: str, previous_timetable: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    """Helper function to generate timetable from natural language."""
+async def generate_timetable_from_chat(
+    user_request: str,
+    previous_timetable: Optional[Dict[str, Any]] = None,
+    params: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Helper function to generate timetable from natural language.
+
+    params are timetable parameters already extracted from the request
+    (see GeminiService.analyze_chat_message). Without them the template
+    parser is tried, and the model only asked if it is not confident.
+    """
     
     # Check if this is a modification request
     is_modification = previous_timetable is not None and any(word in user_request.lower() for word in ['change', 'modify', 'update', 'adjust', 'let', 'make', 'set', 'from'])
@@ -159,17 +200,24 @@ async def generate_timetable_from_chat(user_request: str, previous_timetable: Op
     """
     
     try:
-        extraction_response = await gemini_service.generate_text(extraction_prompt, temperature=0.1, max_tokens=500)
-        
-        # Parse extraction
-        if "```json" in extraction_response:
-            json_str = extraction_response.split("```json")[1].split("```")[0].strip()
-        elif "```" in extraction_response:
-            json_str = extraction_response.split("```")[1].split("```")[0].strip()
-        else:
-            json_str = extraction_response.strip()
-        
-        params = json.loads(json_str)
+        if params is None:
+            fast = parse_chat_request(user_request, previous_timetable)
+            if fast["confidence"] == "high":
+                params = fast["timetable"]
+        if params is None:
+            extraction_response = await gemini_service.generate_text(
+                extraction_prompt, temperature=0.1, max_tokens=500, cache=True
+            )
+            
+            # Parse extraction
+            if "```json" in extraction_response:
+                json_str = extraction_response.split("```json")[1].split("```")[0].strip()
+            elif "```" in extraction_response:
+                json_str = extraction_response.split("```")[1].split("```")[0].strip()
+            else:
+                json_str = extraction_response.strip()
+            
+            params = json.loads(json_str)
         
         # Now generate schedule with explicit constraints
         subjects = params.get("subjects", [])
@@ -343,21 +391,7 @@ async def chat(request: Request, message: ChatMessage) -> ChatResponse:
                 intent={"intent": "rate_limited"}
             )
         
-        # Apply context guardrails
-        validation = await gemini_service.validate_chat_context(message.message)
-        
-        if not validation.get("is_valid", True):
-            return ChatResponse(
-                response=f"⚠️ {validation.get('reason', 'Please ask questions related to timetable scheduling.')}\n\n"
-                        f"I'm here to help with:\n"
-                        f"• Creating and managing timetables\n"
-                        f"• Scheduling classes and faculty\n"
-                        f"• Managing rooms and sections\n"
-                        f"• Answering scheduling-related questions",
-                intent={"intent": "out_of_context", "validation": validation}
-            )
-        
-        # Check if it's a greeting
+        # Greetings get a fixed reply without a model call
         message_lower = message.message.lower().strip()
         greeting_patterns = ['hello', 'hi', 'hey', 'greetings', 'good morning', 'good afternoon', 'good evening']
         
@@ -378,12 +412,25 @@ async def chat(request: Request, message: ChatMessage) -> ChatResponse:
                 intent={"intent": "greeting"}
             )
         
-        # Parse user intent
-        parsed = await gemini_service.parse_natural_language_request(
+        # Guardrail, intent and timetable parameters in one model call
+        parsed = await gemini_service.analyze_chat_message(
             message.message,
-            context={"data_store": {k: len(v) for k, v in data_store.items()}}
+            context={"data_store": {k: len(v) for k, v in data_store.items()}},
+            previous_timetable=message.last_timetable
         )
         
+        if not parsed["is_valid"]:
+            validation = {key: parsed[key] for key in ("is_valid", "reason", "confidence")}
+            return ChatResponse(
+                response=f"⚠️ {validation.get('reason', 'Please ask questions related to timetable scheduling.')}\n\n"
+                        f"I'm here to help with:\n"
+                        f"• Creating and managing timetables\n"
+                        f"• Scheduling classes and faculty\n"
+                        f"• Managing rooms and sections\n"
+                        f"• Answering scheduling-related questions",
+                intent={"intent": "out_of_context", "validation": validation}
+            )
+        
         # Handle different intents
         intent = parsed.get("intent", "")
         response_msg = parsed.get("response_message", "")
@@ -400,7 +447,8 @@ async def chat(request: Request, message: ChatMessage) -> ChatResponse:
             try:
                 timetable_data = await generate_timetable_from_chat(
                     message.message,
-                    previous_timetable=message.last_timetable
+                    previous_timetable=message.last_timetable,
+                    params=parsed["timetable"]
                 )
                 
                 if timetable_data and "error" not in timetable_data:
@@ -626,6 +674,74 @@ async def upload_sections(request: Request, file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/upload/constraints")
+@auth_required
+async def upload_constraints(request: Request, file: UploadFile = File(...)):
+    """
+    Upload constraints from a JSON file.
+    Each constraint's parameters may hold a rule, e.g.
+    {"rule": "not_before", "faculty": "F1", "time": "10:00"}; see agents/rules.py.
+    Requires authentication.
+    """
+    try:
+        content = await file.read()
+        
+        if not file.filename.endswith('.json'):
+            raise HTTPException(status_code=400, detail="File must be JSON")
+        
+        data = json.loads(content)
+        constraints_list = [Constraint(**item) for item in data]
+        
+        # Reject malformed rules up front rather than skipping them at generation time
+        rules = RuleSet(constraints_list)
+        if rules.errors:
+            raise HTTPException(
+                status_code=400,
+                detail={"message": "Invalid rules", "errors": rules.errors}
+            )
+        
+        data_store["constraints"] = constraints_list
+        
+        return {
+            "success": True,
+            "message": f"Uploaded {len(constraints_list)} constraints ({len(rules.rules)} rules)",
+            "count": len(constraints_list)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+def _store_timetable(
+    request_data: GenerateTimetableRequest,
+    result: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Create a timetable record from a generation result and add it to the store.
+
+    The record gets its own copy of the result, which may also be held by
+    the result cache, so later edits and repairs do not change the cache.
+    """
+    result = copy.deepcopy(result)
+    timetable_id = (
+        f"tt_{request_data.academic_year}_{request_data.semester}_{len(data_store['timetables'])}"
+    )
+    timetable = {
+        "id": timetable_id,
+        "name": f"Timetable {request_data.academic_year} Semester {request_data.semester}",
+        "academic_year": request_data.academic_year,
+        "semester": request_data.semester,
+        "schedule": result["schedule"],
+        "constraints_satisfied": result["constraints_satisfied"],
+        "optimization_score": result["optimization_score"],
+        "validation_results": result["validation"]
+    }
+    
+    data_store["timetables"].append(timetable)
+    return timetable
+
+
 @app.post("/api/generate-timetable")
 async def generate_timetable(request_data: GenerateTimetableRequest, request: Request):
     """
@@ -659,15 +775,57 @@ async def generate_timetable(request_data: GenerateTimetableRequest, request: Re
         if request_data.section_ids:
             sections = [s for s in sections if s.id in request_data.section_ids]
         
+        # Identical inputs and options give the stored result back without solving
+        solver = request_data.solver or settings.default_solver
+        cache_key = content_hash({
+            "sections": [s.dict() for s in sections],
+            "subjects": [s.dict() for s in data_store["subjects"]],
+            "faculty": [f.dict() for f in data_store["faculty"]],
+            "classrooms": [c.dict() for c in data_store["classrooms"]],
+            "constraints": [c.dict() for c in data_store["constraints"]],
+            "solver": solver,
+            "time_limit": (
+                request_data.time_limit_seconds or settings.exact_solver_time_limit
+            ) if solver == "exact" else None,
+            "optimize": request_data.optimize,
+            "optimize_seconds": request_data.optimize_seconds if request_data.optimize else None
+        })
+        cached = await result_cache.aget(cache_key)
+        if cached is not None:
+            timetable = _store_timetable(request_data, cached)
+            return {
+                "success": True,
+                "timetable_id": timetable["id"],
+                "message": f"Generated timetable with {len(cached['schedule'])} entries (cached)",
+                "schedule": cached["schedule"],
+                "unscheduled": cached["unscheduled"],
+                "validation": cached["validation"],
+                "constraints_satisfied": cached["constraints_satisfied"],
+                "optimization_score": cached["optimization_score"],
+                "cached": True
+            }
+        
         # Step 1: Generate initial timetable using TimetableAgent
         timetable_result = await timetable_agent.run({
             "sections": sections,
             "subjects": data_store["subjects"],
             "faculty": data_store["faculty"],
             "classrooms": data_store["classrooms"],
-            "constraints": data_store["constraints"]
+            "constraints": data_store["constraints"],
+            "solver": solver,
+            "time_limit": request_data.time_limit_seconds
         })
         
+        status = (timetable_result.data or {}).get("status")
+        if not timetable_result.success and status == "infeasible":
+            raise HTTPException(
+                status_code=422,
+                detail={
+                    "message": "No timetable satisfies the hard constraints",
+                    "reasons": timetable_result.errors
+                }
+            )
+        
         if not timetable_result.success:
             raise HTTPException(
                 status_code=500,
@@ -676,33 +834,50 @@ async def generate_timetable(request_data: GenerateTimetableRequest, request: Re
         
         schedule_entries = timetable_result.data.get("schedule_entries", [])
         
-        # Step 2: Validate constraints using ConstraintAgent
+        # Step 2: Improve soft constraints using OptimizerAgent
+        if request_data.optimize:
+            optimizer_result = await optimizer_agent.run({
+                "schedule_entries": schedule_entries,
+                "sections": sections,
+                "subjects": data_store["subjects"],
+                "faculty": data_store["faculty"],
+                "classrooms": data_store["classrooms"],
+                "constraints": data_store["constraints"],
+                "time_limit": request_data.optimize_seconds
+            })
+            
+            if optimizer_result.success:
+                schedule_entries = optimizer_result.data["schedule_entries"]
+        
+        # Step 3: Validate and score constraints using ConstraintAgent
         constraint_result = await constraint_agent.run({
             "schedule_entries": schedule_entries,
-            "constraints": data_store["constraints"]
+            "constraints": data_store["constraints"],
+            "faculty": data_store["faculty"],
+            "classrooms": data_store["classrooms"]
         })
+        optimization_score = constraint_result.data["score"]["score"]
         
-        # Create timetable object
-        timetable_id = f"tt_{request_data.academic_year}_{request_data.semester}_{len(data_store['timetables'])}"
-        timetable = {
-            "id": timetable_id,
-            "name": f"Timetable {request_data.academic_year} Semester {request_data.semester}",
-            "academic_year": request_data.academic_year,
-            "semester": request_data.semester,
+        result = {
             "schedule": schedule_entries,
+            "unscheduled": timetable_result.data.get("unscheduled", []),
+            "validation": constraint_result.data,
             "constraints_satisfied": constraint_result.success,
-            "validation_results": constraint_result.data
+            "optimization_score": optimization_score
         }
-        
-        data_store["timetables"].append(timetable)
+        await result_cache.aput(cache_key, result)
+        timetable = _store_timetable(request_data, result)
         
         return {
             "success": True,
-            "timetable_id": timetable_id,
+            "timetable_id": timetable["id"],
             "message": f"Generated timetable with {len(schedule_entries)} entries",
             "schedule": schedule_entries,
+            "unscheduled": timetable_result.data.get("unscheduled", []),
             "validation": constraint_result.data,
-            "constraints_satisfied": constraint_result.success
+            "constraints_satisfied": constraint_result.success,
+            "optimization_score": optimization_score,
+            "cached": False
         }
         
     except HTTPException:
@@ -720,6 +895,186 @@ async def get_timetable(timetable_id: str):
     raise HTTPException(status_code=404, detail="Timetable not found")
 
 
+@app.get("/api/timetable/{timetable_id}/violations")
+async def get_timetable_violations(
+    timetable_id: str,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    code: Optional[str] = None
+):
+    """
+    Page through a timetable's violation and warning records.
+
+    Only a capped page of records is stored with a timetable, so the
+    schedule is re-validated against the current data and the requested
+    page returned, optionally for one record code.
+    """
+    timetable = next((tt for tt in data_store["timetables"] if tt["id"] == timetable_id), None)
+    if timetable is None:
+        raise HTTPException(status_code=404, detail="Timetable not found")
+    if code is not None and code not in VIOLATION_CODES + WARNING_CODES:
+        raise HTTPException(status_code=400, detail=f"Unknown violation code: {code}")
+
+    max_limit = settings.violation_detail_limit
+    constraint_result = await constraint_agent.run({
+        "schedule_entries": timetable["schedule"],
+        "constraints": data_store["constraints"],
+        "faculty": data_store["faculty"],
+        "classrooms": data_store["classrooms"],
+        "offset": min(max(offset, 0), settings.violation_max_offset),
+        "limit": max_limit if limit is None else min(limit, max_limit),
+        "code": code
+    })
+    if constraint_result.data is None:
+        raise HTTPException(status_code=500, detail=constraint_result.message)
+
+    return {"timetable_id": timetable_id, **constraint_result.data}
+
+
+@app.get("/api/timetable/{timetable_id}/violations/stream")
+async def stream_timetable_violations(
+    timetable_id: str,
+    limit: Optional[int] = None,
+    code: Optional[str] = None
+):
+    """
+    Re-validate a timetable, streaming each check's records as it finishes.
+
+    The response is newline-delimited JSON: one "check" event per check,
+    in the order they finish, then a "result" event with the same data as
+    the violations endpoint. Checks run concurrently off the event loop, so
+    the first hard conflicts arrive before the slower checks are done.
+    """
+    timetable = next((tt for tt in data_store["timetables"] if tt["id"] == timetable_id), None)
+    if timetable is None:
+        raise HTTPException(status_code=404, detail="Timetable not found")
+    if code is not None and code not in VIOLATION_CODES + WARNING_CODES:
+        raise HTTPException(status_code=400, detail=f"Unknown violation code: {code}")
+
+    max_limit = settings.violation_detail_limit
+    events = constraint_agent.stream({
+        "schedule_entries": timetable["schedule"],
+        "constraints": data_store["constraints"],
+        "faculty": data_store["faculty"],
+        "classrooms": data_store["classrooms"],
+        "limit": max_limit if limit is None else min(limit, max_limit),
+        "code": code,
+        "concurrent": True
+    })
+
+    async def ndjson():
+        try:
+            async for event in events:
+                yield json.dumps({"timetable_id": timetable_id, **event}, default=str) + "\n"
+        except Exception as e:
+            # The status line is already sent, so failures are reported in the stream
+            error = {"timetable_id": timetable_id, "event": "error", "detail": str(e)}
+            yield json.dumps(error) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@app.post("/api/timetable/{timetable_id}/repair")
+async def repair_timetable(
+    timetable_id: str,
+    request_data: RepairTimetableRequest,
+    request: Request
+):
+    """
+    Apply faculty or classroom changes and re-place only the affected entries.
+    Requires authentication.
+    """
+    # Check authentication
+    user = get_current_user(request)
+    if not user:
+        raise HTTPException(
+            status_code=401,
+            detail="Authentication required. Please log in."
+        )
+    
+    timetable = next((tt for tt in data_store["timetables"] if tt["id"] == timetable_id), None)
+    if timetable is None:
+        raise HTTPException(status_code=404, detail="Timetable not found")
+    
+    faculty_by_id = {f.id: f for f in data_store["faculty"]}
+    classrooms_by_id = {c.id: c for c in data_store["classrooms"]}
+    unknown = (
+        [fid for fid in request_data.faculty_unavailable if fid not in faculty_by_id]
+        + [cid for cid in request_data.classroom_unavailable if cid not in classrooms_by_id]
+        + [cid for cid in request_data.removed_classrooms if cid not in classrooms_by_id]
+    )
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown faculty or classroom IDs: {', '.join(unknown)}"
+        )
+    
+    # Work on updated copies; the stored data only changes once the repair succeeds
+    faculty = [
+        f.model_copy(update={"unavailable_slots": request_data.faculty_unavailable[f.id]})
+        if f.id in request_data.faculty_unavailable else f
+        for f in data_store["faculty"]
+    ]
+    classrooms = [
+        c.model_copy(update={"unavailable_slots": request_data.classroom_unavailable[c.id]})
+        if c.id in request_data.classroom_unavailable else c
+        for c in data_store["classrooms"]
+        if c.id not in request_data.removed_classrooms
+    ]
+    
+    try:
+        repair_result = await repair_agent.run({
+            "schedule_entries": timetable["schedule"],
+            "sections": data_store["sections"],
+            "subjects": data_store["subjects"],
+            "faculty": faculty,
+            "classrooms": classrooms,
+            "constraints": data_store["constraints"],
+            "time_limit": request_data.time_limit_seconds,
+            "changed_faculty": list(request_data.faculty_unavailable),
+            "changed_classrooms": [
+                *request_data.classroom_unavailable, *request_data.removed_classrooms
+            ]
+        })
+        
+        if not repair_result.success:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to repair timetable: {repair_result.message}"
+            )
+        
+        schedule_entries = repair_result.data["schedule_entries"]
+        constraint_result = await constraint_agent.run({
+            "schedule_entries": schedule_entries,
+            "constraints": data_store["constraints"],
+            "faculty": faculty,
+            "classrooms": classrooms
+        })
+        
+        data_store["faculty"] = faculty
+        data_store["classrooms"] = classrooms
+        timetable["schedule"] = schedule_entries
+        timetable["constraints_satisfied"] = constraint_result.success
+        timetable["optimization_score"] = constraint_result.data["score"]["score"]
+        timetable["validation_results"] = constraint_result.data
+        
+        return {
+            "success": True,
+            "timetable_id": timetable_id,
+            "message": repair_result.message,
+            "changes": repair_result.data["changes"],
+            "unscheduled": repair_result.data["unscheduled"],
+            "validation": constraint_result.data,
+            "constraints_satisfied": constraint_result.success,
+            "optimization_score": timetable["optimization_score"]
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
 @app.get("/api/timetables")
 async def list_timetables():
     """List all generated timetables."""
@@ -731,7 +1086,8 @@ async def list_timetables():
                 "academic_year": tt["academic_year"],
                 "semester": tt["semester"],
                 "entries_count": len(tt["schedule"]),
-                "constraints_satisfied": tt.get("constraints_satisfied", False)
+                "constraints_satisfied": tt.get("constraints_satisfied", False),
+                "optimization_score": tt.get("optimization_score", 0.0)
             }
             for tt in data_store["timetables"]
         ]
@@ -747,7 +1103,9 @@ async def get_data_summary():
         "classrooms_count": len(data_store["classrooms"]),
         "sections_count": len(data_store["sections"]),
         "constraints_count": len(data_store["constraints"]),
-        "timetables_count": len(data_store["timetables"])
+        "timetables_count": len(data_store["timetables"]),
+        "result_cache": result_cache.stats(),
+        "llm_cache": gemini_service.stats()
     }
 
 
@@ -1,7 +1,7 @@
 """Data models for the timetable planner."""
 from datetime import time
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field, model_validator
 
 
 class TimeSlot(BaseModel):
@@ -113,3 +113,53 @@ class TimetableRequest(BaseModel):
     classrooms: List[Classroom]
     constraints: List[Constraint] = Field(default_factory=list)
     preferences: Optional[dict] = None
+
+
+def _drop_nulls(data: Any) -> Any:
+    """Treat null fields in model output as missing, so their defaults apply."""
+    if isinstance(data, dict):
+        return {key: value for key, value in data.items() if value is not None}
+    return data
+
+
+class ChatTimetableParams(BaseModel):
+    """Timetable parameters extracted from a chat message."""
+    university: str = "Unknown"
+    semester: str = "3"
+    subjects: List[str] = Field(default_factory=list)
+    classes_per_subject_per_week: int = 3
+    days: List[str] = Field(
+        default_factory=lambda: ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+    )
+    start_time: str = "07:50"
+    end_time: Optional[str] = None
+    class_duration_minutes: int = 50
+
+    @model_validator(mode="before")
+    @classmethod
+    def _normalize(cls, data: Any) -> Any:
+        data = _drop_nulls(data)
+        if isinstance(data, dict):
+            # Models often answer with numbers here
+            for key in ("university", "semester", "start_time", "end_time"):
+                if isinstance(data.get(key), (int, float)):
+                    data[key] = str(data[key])
+        return data
+
+
+class ChatAnalysis(BaseModel):
+    """Guardrail verdict, intent and timetable parameters for one chat message."""
+    is_valid: bool = True
+    reason: str = ""
+    confidence: str = "low"  # high, medium, low
+    intent: str = "unclear"  # upload_data, generate_timetable, modify_constraint, ...
+    parameters: Dict[str, Any] = Field(default_factory=dict)
+    entities: List[Any] = Field(default_factory=list)
+    requirements: List[Any] = Field(default_factory=list)
+    response_message: str = ""
+    timetable: Optional[ChatTimetableParams] = None  # Only for timetable generation or changes
+
+    @model_validator(mode="before")
+    @classmethod
+    def _normalize(cls, data: Any) -> Any:
+        return _drop_nulls(data)
@@ -1,4 +1,7 @@
 """Services package."""
 from services.gemini_service import gemini_service, GeminiService
+from services.solver_service import solver_service, SolverService
+from services.result_cache import result_cache, ResultCache
 
-__all__ = ["gemini_service", "GeminiService"]
+__all__ = ["gemini_service", "GeminiService", "solver_service", "SolverService",
+           "result_cache", "ResultCache"]
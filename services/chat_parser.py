@@ -0,0 +1,335 @@
+"""Rule-based parser for chat messages that follow the common timetable request templates."""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+DEFAULT_PARAMS = {
+    "university": "Unknown",
+    "semester": "3",
+    "subjects": [],
+    "classes_per_subject_per_week": 3,
+    "days": DAYS[:5],
+    "start_time": "07:50",
+    "end_time": None,
+    "class_duration_minutes": 50,
+}
+
+# Words left over after the templates matched that still count as understood
+FILLER_WORDS = {
+    "a", "an", "the", "for", "with", "and", "of", "in", "on", "to", "at", "each", "every", "per",
+    "please", "me", "my", "us", "our", "i", "we", "want", "need", "would", "like", "can", "you",
+    "could", "create", "generate", "make", "build", "plan", "prepare", "give", "new", "weekly",
+    "week", "timetable", "schedule", "class", "classes", "lecture", "lectures", "that", "it", "is",
+    "be", "has", "have", "change", "modify", "update", "adjust", "set", "let", "instead", "now",
+    "only", "all",
+}
+
+# Words that turn what follows into an exclusion; left unparsed they keep the model in the loop
+NEGATION_WORDS = {
+    "no", "not", "never", "except", "excluding", "exclude", "avoid", "avoiding", "without",
+    "skip", "skipping", "off", "free", "don't", "dont", "nothing", "none",
+}
+
+# Words that are never part of a subject name: "Physics needs a lab" states a condition
+NON_SUBJECT_WORDS = FILLER_WORDS | NEGATION_WORDS | {
+    "but", "needs", "requires", "must", "should", "also",
+}
+
+_NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+_NUMBER = r"(\d+|" + "|".join(_NUMBER_WORDS) + r")"
+_DAY = (
+    r"(" + "|".join(day.lower() for day in DAYS)
+    + r"|mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun)"
+)
+_NEGATION = r"(?:no|not|never|except|excluding|exclude|avoid(?:ing)?|without|skip(?:ping)?)"
+_CLOCK = r"(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm)?"
+_UNIT = r"(?:classes|class|lectures|lecture|sessions|session|periods|period|slots|slot)"
+
+_GENERATE = re.compile(
+    r"\b(generate|create|make|build|plan|prepare)\b|\b(timetable|schedule)\b", re.IGNORECASE
+)
+_MODIFY = re.compile(r"\b(change|modify|update|adjust|set|let|make it|instead)\b", re.IGNORECASE)
+_CLASSES_PER_WEEK = re.compile(
+    rf"\b{_NUMBER}\s+{_UNIT}\s*(?:(?:per|each|a|for each)\s+subject\s*)?(?:per|a|each|/)\s*week"
+    rf"(?:\s+(?:per|for each|each|for every)\s+subject)?",
+    re.IGNORECASE
+)
+_SUBJECT = rf"(?!{_NEGATION}\b)[a-z][\w&+#.\- ]*?"
+_SUBJECTS = re.compile(
+    r"\bsubjects?\b\s*(?::|are|include|including|like)?\s*"
+    rf"(?P<list>{_SUBJECT}(?:\s*(?:,|\band\b|&)\s*{_SUBJECT})*)"
+    r"(?=,?\s*(?:[.;]|$|\d|\b(?:from|with|starting|start|at|on|between|having|each|every|for"
+    rf"|but|except|avoid|without|no|not|where|which|who|so|then|{_DAY}s?)\b))",
+    re.IGNORECASE
+)
+_TIME_RANGE = re.compile(
+    r"\b(?:from|between|starting(?:\s+at)?|start(?:ing)?\s+at|begin(?:ning)?\s+at"
+    r"|start\s+time\s+(?:of|to|at)?)"
+    rf"\s*{_CLOCK}(?:\s*(?:to|until|till|and|-)\s*{_CLOCK})?",
+    re.IGNORECASE
+)
+# "9am to 1pm", "09:00-13:00": an am/pm or minutes on one side tells it from a count
+_BARE_TIME_RANGE = re.compile(rf"\b{_CLOCK}\s*(?:to|until|till|-)\s*{_CLOCK}\b", re.IGNORECASE)
+_DURATION = re.compile(
+    rf"\b{_NUMBER}[\s-]*(minutes?|mins?|hours?|hrs?)(?:\s+long)?(?:\s+{_UNIT})?", re.IGNORECASE
+)
+_DAY_RANGE = re.compile(
+    rf"\b{_DAY}s?\s*(?:to|through|thru|till|until|-)\s*{_DAY}s?\b", re.IGNORECASE
+)
+_DAY_COUNT = re.compile(
+    rf"\b{_NUMBER}\s+(?:working\s+)?days\b(?:\s+(?:a|per)\s+week)?", re.IGNORECASE
+)
+_DAY_NAMES = re.compile(rf"\b{_DAY}s?\b", re.IGNORECASE)
+_DAY_ITEM = rf"{_DAY}s?(?:\s*(?:to|through|thru|till|until|-)\s*{_DAY}s?)?"
+# "no classes on Friday", "except Monday and Tuesday", "avoid Mondays", "but not on Wednesday"
+_EXCLUDED_DAYS = re.compile(
+    rf"\b{_NEGATION}\s+(?:[a-z']+\s+){{0,3}}?"
+    rf"(?P<days>{_DAY_ITEM}(?:\s*(?:,|\band\b|\bor\b|&|/)\s*{_DAY_ITEM})*)\b",
+    re.IGNORECASE
+)
+_SEMESTER = re.compile(
+    r"\b(?:semester|sem)\s*(\d+)\b|\b(\d+)(?:st|nd|rd|th)\s+(?:semester|sem)\b", re.IGNORECASE
+)
+# Names are told apart by their capitalisation: "MIT University", "University of Mumbai"
+_UNIVERSITY = re.compile(
+    r"\b((?:[A-Z][\w&.\-]*\s+)+University|University\s+of(?:\s+[A-Z][\w&.\-]*)+)"
+)
+
+
+def _number(text: str) -> int:
+    return int(text) if text.isdigit() else _NUMBER_WORDS[text.lower()]
+
+
+def _clock(hours: str, minutes: Optional[str], meridiem: Optional[str]) -> Optional[str]:
+    """HH:MM from the parts of a clock time, or None if out of range."""
+    hour, minute = int(hours), int(minutes or 0)
+    meridiem = (meridiem or "").lower()
+    if meridiem == "pm" and hour < 12:
+        hour += 12
+    elif meridiem == "am" and hour == 12:
+        hour = 0
+    if hour > 23 or minute > 59:
+        return None
+    return f"{hour:02d}:{minute:02d}"
+
+
+def _day(text: str) -> str:
+    return next(day for day in DAYS if day.lower().startswith(text[:3].lower()))
+
+
+def _day_list(text: str) -> List[str]:
+    """Days named in a list that may contain ranges, in week order."""
+    days = set()
+    for match in _DAY_RANGE.finditer(text):
+        first, last = DAYS.index(_day(match.group(1))), DAYS.index(_day(match.group(2)))
+        days.update(DAYS[first:last + 1])
+    days.update(_day(match.group(1)) for match in _DAY_NAMES.finditer(_DAY_RANGE.sub(" ", text)))
+    return [day for day in DAYS if day in days]
+
+
+def _split_subjects(text: str) -> List[str]:
+    """Subject names as written, title-cased if written all in lower case."""
+    parts = re.split(r"\s*(?:,|\band\b|&)\s*", text, flags=re.IGNORECASE)
+    names = [name.strip(" .") for name in parts]
+    return [name.title() if name.islower() else name for name in names if name]
+
+
+def _is_subject_name(name: str) -> bool:
+    return not any(
+        word in NON_SUBJECT_WORDS for word in re.findall(r"[a-z0-9']+", name.lower())
+    )
+
+
+def _words_outside(text: str, spans: List[Tuple[int, int]]) -> List[str]:
+    """Lower-cased words of a text, leaving out the given character spans."""
+    chars = list(text)
+    for start, end in spans:
+        chars[start:end] = " " * (end - start)
+    return re.findall(r"[a-z0-9']+", "".join(chars).lower())
+
+
+def params_from_timetable(timetable: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Request parameters that would reproduce a timetable generated from chat.
+
+    Used as the defaults for messages that change the previous timetable.
+    """
+    params = {**DEFAULT_PARAMS}
+    params["university"] = timetable.get("university") or params["university"]
+    params["semester"] = str(timetable.get("semester") or params["semester"])
+    schedule = timetable.get("schedule") or []
+    if not schedule:
+        return params
+
+    subjects = list(dict.fromkeys(
+        entry.get("subject") for entry in schedule if entry.get("subject")
+    ))
+    params["subjects"] = subjects
+    scheduled_days = {entry.get("day") for entry in schedule}
+    params["days"] = [day for day in DAYS if day in scheduled_days] or params["days"]
+    params["start_time"] = min(entry.get("start_time", "99:99") for entry in schedule)
+    if subjects:
+        params["classes_per_subject_per_week"] = max(1, round(len(schedule) / len(subjects)))
+    first = schedule[0]
+    try:
+        start_hours, start_minutes = map(int, first["start_time"].split(":"))
+        end_hours, end_minutes = map(int, first["end_time"].split(":"))
+        params["class_duration_minutes"] = (
+            (end_hours - start_hours) * 60 + end_minutes - start_minutes
+        )
+    except (KeyError, ValueError, AttributeError):
+        pass
+    return params
+
+
+def parse_chat_request(
+    message: str,
+    previous_timetable: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Parse a timetable request with regular-expression templates.
+
+    Recognises "N classes per week", "subjects A, B and C", "from 08:00
+    (to 12:00)" or "9am to 1pm", "50 minute classes", "Monday to Friday" or "5 days",
+    "semester 3" and "for X University". Each template consumes the part
+    of the message it matched. Days after a negation ("no classes on
+    Friday", "except Monday", "avoid Mondays") are taken out of the days.
+    What is left decides the confidence:
+
+    - high: a timetable request with its subjects and days known (from the
+      message, or from the previous timetable for a change) and every word
+      left over in FILLER_WORDS, safe to answer without the model
+    - medium: a timetable request with some parameters recognised
+    - low: anything else
+
+    Args:
+        message: User's chat message
+        previous_timetable: Last generated timetable, whose parameters are
+            the defaults when the message asks for a change
+
+    Returns:
+        {"intent": "generate_timetable" or None, "confidence",
+        "timetable": parameters in the extraction prompt's format,
+        "matched": names of the parameters found in the message}
+    """
+    text = " ".join(message.split())
+    modifying = previous_timetable is not None and bool(_MODIFY.search(text))
+    if modifying:
+        params = params_from_timetable(previous_timetable)
+    else:
+        params = {**DEFAULT_PARAMS, "days": list(DAYS[:5])}
+    matched = []
+    spans: List[Tuple[int, int]] = []
+
+    def take(pattern: "re.Pattern") -> Optional["re.Match"]:
+        match = pattern.search(text)
+        if match:
+            spans.append(match.span())
+        return match
+
+    match = take(_CLASSES_PER_WEEK)
+    if match:
+        params["classes_per_subject_per_week"] = _number(match.group(1))
+        matched.append("classes_per_subject_per_week")
+
+    match = take(_SUBJECTS)
+    if match:
+        subjects = _split_subjects(match.group("list"))
+        if not all(map(_is_subject_name, subjects)):
+            # Leave the list unconsumed so its words keep the model in the loop
+            spans[-1] = (match.start(), match.start("list"))
+            subjects = list(filter(_is_subject_name, subjects))
+        if subjects:
+            params["subjects"] = subjects
+            matched.append("subjects")
+
+    match = take(_TIME_RANGE)
+    if not match:
+        match = next((
+            m for m in _BARE_TIME_RANGE.finditer(text)
+            if any(m.group(i) for i in (2, 3, 5, 6))
+        ), None)
+        if match:
+            spans.append(match.span())
+    if match:
+        start = _clock(*match.group(1, 2, 3))
+        if start:
+            params["start_time"] = start
+            matched.append("start_time")
+        if match.group(4):
+            end = _clock(*match.group(4, 5, 6))
+            if end:
+                params["end_time"] = end
+                matched.append("end_time")
+
+    match = take(_DURATION)
+    if match:
+        amount = _number(match.group(1))
+        params["class_duration_minutes"] = amount * 60 if match.group(2).startswith("h") else amount
+        matched.append("class_duration_minutes")
+
+    excluded: List[str] = []
+    excluded_spans = []
+    for match in _EXCLUDED_DAYS.finditer(text):
+        excluded_spans.append(match.span())
+        excluded.extend(day for day in _day_list(match.group("days")) if day not in excluded)
+    spans.extend(excluded_spans)
+
+    def outside_exclusions(match: "re.Match") -> bool:
+        return all(match.end() <= start or match.start() >= end for start, end in excluded_spans)
+
+    match = next(filter(outside_exclusions, _DAY_RANGE.finditer(text)), None)
+    if match:
+        spans.append(match.span())
+        first, last = DAYS.index(_day(match.group(1))), DAYS.index(_day(match.group(2)))
+        if first <= last:
+            params["days"] = DAYS[first:last + 1]
+            matched.append("days")
+    else:
+        match = take(_DAY_COUNT)
+        if match and 1 <= _number(match.group(1)) <= len(DAYS):
+            params["days"] = DAYS[:_number(match.group(1))]
+            matched.append("days")
+        else:
+            named = list(filter(outside_exclusions, _DAY_NAMES.finditer(text)))
+            if named:
+                spans.extend(m.span() for m in named)
+                params["days"] = [day for day in DAYS if day in {_day(m.group(1)) for m in named}]
+                matched.append("days")
+    if excluded:
+        params["days"] = [day for day in params["days"] if day not in excluded]
+        if "days" not in matched:
+            matched.append("days")
+
+    match = take(_SEMESTER)
+    if match:
+        params["semester"] = match.group(1) or match.group(2)
+        matched.append("semester")
+
+    match = take(_UNIVERSITY)
+    if match:
+        params["university"] = match.group(1)
+        matched.append("university")
+
+    requested = bool(_GENERATE.search(text)) or modifying
+    intent = "generate_timetable" if requested and (matched or modifying) else None
+
+    understood = all(word in FILLER_WORDS for word in _words_outside(text, spans))
+    if intent and params["subjects"] and params["days"] and understood:
+        confidence = "high"
+    elif intent:
+        confidence = "medium"
+    else:
+        confidence = "low"
+
+    return {
+        "intent": intent,
+        "confidence": confidence,
+        "timetable": params if intent else None,
+        "matched": matched
+    }
+
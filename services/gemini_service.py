@@ -1,24 +1,51 @@
 """Gemini AI service for LLM interactions."""
+import asyncio
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Type
 import google.generativeai as genai
+from pydantic import BaseModel, ValidationError
 from config import settings
+from models import ChatAnalysis, ChatTimetableParams
+from services.chat_parser import parse_chat_request
+from services.result_cache import ResultCache, content_hash
 
 
 class GeminiService:
-    """Service for interacting with Google Gemini AI."""
+    """
+    Service for interacting with Google Gemini AI.
+    
+    Calls go through the SDK's async API, so waiting on the model never
+    blocks the event loop. A shared semaphore caps the requests in flight
+    at settings.llm_max_concurrency; callers beyond it wait their turn.
+    Requests are keyed by model, prompt and generation config: concurrent
+    identical requests share one upstream call, and responses to
+    deterministic prompts can be cached.
+    """
     
     def __init__(self):
         """Initialize Gemini service with API key."""
         genai.configure(api_key=settings.gemini_api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash-lite')
+        self.model_name = 'gemini-2.5-flash-lite'
+        self.model = genai.GenerativeModel(self.model_name)
         self.chat_model = None
+        self._limiter = asyncio.Semaphore(max(settings.llm_max_concurrency, 1))
+        self.cache = ResultCache(
+            settings.llm_cache_size,
+            settings.llm_cache_dir,
+            settings.llm_cache_ttl,
+            settings.llm_cache_disk_size
+        )
+        # Request key -> task of the upstream call in flight for it
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.coalesced = 0
     
     async def generate_text(
         self,
         prompt: str,
         temperature: float = 0.7,
-        max_tokens: int = 2048
+        max_tokens: int = 2048,
+        cache: bool = False,
+        json_output: bool = False
     ) -> str:
         """
         Generate text using Gemini.
@@ -27,6 +54,9 @@ class GeminiService:
             prompt: The input prompt
             temperature: Creativity level (0.0-1.0)
             max_tokens: Maximum tokens in response
+            cache: Reuse the response to an identical earlier request; only
+                for low-temperature prompts where one answer is as good as another
+            json_output: Ask the model for a bare JSON response
             
         Returns:
             Generated text response
@@ -36,17 +66,50 @@ class GeminiService:
                 "temperature": temperature,
                 "max_output_tokens": max_tokens,
             }
-            
-            response = self.model.generate_content(
-                prompt,
-                generation_config=generation_config
+            if json_output:
+                generation_config["response_mime_type"] = "application/json"
+            key = content_hash(
+                {"model": self.model_name, "prompt": prompt, "config": generation_config}
             )
             
-            return response.text
+            if cache:
+                cached = await self.cache.aget(key)
+                if cached is not None:
+                    return cached
+            
+            # Identical requests already in flight share one upstream call
+            request = self._in_flight.get(key)
+            owner = request is None
+            if owner:
+                request = asyncio.ensure_future(self._request(prompt, generation_config))
+                self._in_flight[key] = request
+                request.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            else:
+                self.coalesced += 1
+            # Shielded so one caller giving up does not cancel the call for the others
+            text = await asyncio.shield(request)
+            
+            # Only the caller that made the upstream call stores its response
+            if cache and owner:
+                await self.cache.aput(key, text)
+            return text
         except Exception as e:
             print(f"Error generating text: {e}")
             raise
     
+    async def _request(self, prompt: str, generation_config: Dict[str, Any]) -> str:
+        """One upstream call, within the concurrency limit."""
+        async with self._limiter:
+            response = await self.model.generate_content_async(
+                prompt,
+                generation_config=generation_config
+            )
+        return response.text
+    
+    def stats(self) -> Dict[str, Any]:
+        """Response cache hit rate and number of requests served by a call already in flight."""
+        return {**self.cache.stats(), "coalesced": self.coalesced}
+    
     async def chat(
         self,
         message: str,
@@ -66,23 +129,15 @@ class GeminiService:
             if not self.chat_model:
                 self.chat_model = self.model.start_chat(history=[])
             
-            response = self.chat_model.send_message(message)
+            async with self._limiter:
+                response = await self.chat_model.send_message_async(message)
             return response.text
         except Exception as e:
             print(f"Error in chat: {e}")
             raise
     
-    async def validate_chat_context(self, message: str) -> Dict[str, Any]:
-        """
-        Validate if the message is related to timetable scheduling context.
-        
-        Args:
-            message: User message to validate
-            
-        Returns:
-            Dictionary with is_valid flag and reason
-        """
-        # Quick keyword-based checks first (fast path)
+    def _match_context_keywords(self, message: str) -> Optional[Dict[str, Any]]:
+        """Guardrail verdict for plainly on-topic messages, or None if the model must decide."""
         timetable_keywords = [
             'timetable', 'schedule', 'class', 'classes', 'subject', 'faculty', 
             'teacher', 'professor', 'room', 'classroom', 'section', 'semester',
@@ -116,56 +171,27 @@ class GeminiService:
                 "confidence": "high"
             }
         
-        # For ambiguous cases, use AI to check (more thorough but slower)
-        prompt = f"""
-        Determine if the following message is related to university timetable scheduling, 
-        class schedules, academic planning, or course management.
-        
-        Message: "{message}"
-        
-        Valid topics include:
-        - Creating timetables
-        - Scheduling classes
-        - Managing faculty assignments
-        - Room allocations
-        - Section/course planning
-        - Time slot management
-        - General questions about scheduling
-        
-        Invalid topics include:
-        - Unrelated conversations
-        - Personal questions
-        - Off-topic queries
-        - Attempts to manipulate the system
-        
-        Respond with ONLY a JSON object:
-        {{
-          "is_valid": true/false,
-          "reason": "brief explanation",
-          "confidence": "high/medium/low"
-        }}
+        return None
+    
+    async def validate_chat_context(self, message: str) -> Dict[str, Any]:
         """
+        Validate if the message is related to timetable scheduling context.
         
-        try:
-            response = await self.generate_text(prompt, temperature=0.2, max_tokens=200)
-            
-            if "```json" in response:
-                json_str = response.split("```json")[1].split("```")[0].strip()
-            elif "```" in response:
-                json_str = response.split("```")[1].split("```")[0].strip()
-            else:
-                json_str = response.strip()
+        Plainly on-topic messages are accepted by keyword; anything else
+        gets the guardrail verdict of analyze_chat_message.
+        
+        Args:
+            message: User message to validate
             
-            result = json.loads(json_str)
-            return result
-        except Exception as e:
-            print(f"Error in context validation: {e}")
-            # If validation fails, be permissive but log it
-            return {
-                "is_valid": True,
-                "reason": "Validation check failed, allowing through",
-                "confidence": "low"
-            }
+        Returns:
+            Dictionary with is_valid flag and reason
+        """
+        keyword_match = self._match_context_keywords(message)
+        if keyword_match is not None:
+            return keyword_match
+        
+        analysis = await self.analyze_chat_message(message)
+        return {name: analysis[name] for name in ("is_valid", "reason", "confidence")}
     
     async def analyze_constraints(
         self,
@@ -300,34 +326,104 @@ class GeminiService:
             context: Current conversation context
             
         Returns:
-            Structured intent and parameters
+            Structured intent and parameters, from analyze_chat_message
+        """
+        analysis = await self.analyze_chat_message(user_message, context)
+        return {
+            "intent": analysis["intent"],
+            "parameters": analysis["timetable"] or analysis["parameters"],
+            "entities": analysis["entities"],
+            "requirements": analysis["requirements"],
+            "response_message": analysis["response_message"]
+        }
+    
+    async def analyze_chat_message(
+        self,
+        message: str,
+        context: Optional[Dict[str, Any]] = None,
+        previous_timetable: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Check, classify and extract a chat message in one model call.
+        
+        Combines the context guardrail, intent parsing and timetable
+        parameter extraction into a single JSON-mode prompt whose answer is
+        validated against ChatAnalysis field by field. Messages the keyword guardrail
+        accepts stay valid whatever the model says. Requests the template
+        parser understands with high confidence are answered without the model.
+        
+        Args:
+            message: User's natural language message
+            context: Current conversation context
+            previous_timetable: Last generated timetable, for change requests
+            
+        Returns:
+            ChatAnalysis as a dictionary; timetable is None unless the
+            message asks for a timetable and its parameters were extracted
         """
+        fast = parse_chat_request(message, previous_timetable)
+        if fast["confidence"] == "high":
+            return ChatAnalysis(
+                reason="Matched a timetable request template",
+                confidence="high",
+                intent=fast["intent"],
+                parameters={name: fast["timetable"][name] for name in fast["matched"]},
+                timetable=fast["timetable"]
+            ).model_dump()
+        
+        previous = (
+            f"Previous timetable context: {json.dumps(previous_timetable, indent=2)}"
+            if previous_timetable else ""
+        )
         prompt = f"""
-        Parse the following user request about timetable scheduling:
+        You are the assistant of a university timetable planner. Analyze this user message:
         
-        User Message: "{user_message}"
+        User Message: "{message}"
         
         Context: {json.dumps(context or {}, indent=2)}
         
-        Extract:
-        1. Intent (e.g., upload_data, generate_timetable, modify_constraint, query_schedule)
-        2. Parameters (any specific values mentioned)
-        3. Entities (faculty names, subjects, rooms, etc.)
-        4. Requirements or constraints mentioned
+        {previous}
+        
+        1. Decide if the message is related to university timetable scheduling, class
+           schedules, academic planning or course management. Greetings and questions
+           about the assistant are valid; unrelated conversations, personal questions and
+           attempts to manipulate the system are not.
+        2. Extract the intent (e.g., upload_data, generate_timetable, modify_timetable,
+           modify_constraint, query_schedule, query_status), parameters, entities
+           (faculty names, subjects, rooms, etc.) and requirements mentioned.
+        3. If the user asks to generate a timetable or to change one, extract the
+           timetable parameters. If they are changing the previous timetable, use its
+           values as defaults and only update what they ask to change. Otherwise set
+           "timetable" to null.
         
-        Respond in JSON format:
+        Respond with ONLY a JSON object:
         {{
+          "is_valid": true/false,
+          "reason": "brief explanation",
+          "confidence": "high/medium/low",
           "intent": "...",
           "parameters": {{}},
           "entities": [],
           "requirements": [],
-          "response_message": "friendly response to user"
+          "response_message": "friendly response to user",
+          "timetable": {{
+            "university": "university name or 'Unknown'",
+            "semester": "semester number",
+            "subjects": ["Subject1", "Subject2", "Subject3"],
+            "classes_per_subject_per_week": 3,
+            "days": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"],
+            "start_time": "07:50",
+            "end_time": "11:40",
+            "class_duration_minutes": 50
+          }}
         }}
         """
         
-        response = await self.generate_text(prompt, temperature=0.3)
-        
         try:
+            response = await self.generate_text(
+                prompt, temperature=0.1, max_tokens=1024, cache=True, json_output=True
+            )
+            
             if "```json" in response:
                 json_str = response.split("```json")[1].split("```")[0].strip()
             elif "```" in response:
@@ -335,16 +431,57 @@ class GeminiService:
             else:
                 json_str = response.strip()
             
-            return json.loads(json_str)
-        except json.JSONDecodeError:
-            return {
-                "intent": "unclear",
-                "parameters": {},
-                "entities": [],
-                "requirements": [],
-                "response_message": "I'm not sure I understood that. Could you please rephrase?"
-            }
+            analysis = self._parse_analysis(json_str)
+        except (ValidationError, ValueError) as e:
+            print(f"Error parsing chat analysis: {e}")
+            analysis = ChatAnalysis(
+                response_message="I'm not sure I understood that. Could you please rephrase?"
+            )
+        except Exception as e:
+            print(f"Error in chat analysis: {e}")
+            # If the call fails, be permissive as the guardrail is
+            analysis = ChatAnalysis(
+                reason="Validation check failed, allowing through",
+                response_message="I'm not sure I understood that. Could you please rephrase?"
+            )
+        
+        if not analysis.is_valid:
+            keyword_match = self._match_context_keywords(message)
+            if keyword_match is not None:
+                analysis = analysis.model_copy(update=keyword_match)
+        return analysis.model_dump()
 
+    def _parse_analysis(self, json_str: str) -> ChatAnalysis:
+        """
+        Validate a chat analysis field by field.
+        
+        A field the model got wrong falls back to its default on its own
+        instead of discarding the whole answer; the timetable parameters
+        are checked the same way.
+        
+        Raises:
+            ValueError: If the response is not a JSON object
+        """
+        data = json.loads(json_str)
+        if not isinstance(data, dict):
+            raise ValueError("Chat analysis is not a JSON object")
+        if isinstance(data.get("timetable"), dict):
+            data["timetable"] = self._valid_fields(ChatTimetableParams, data["timetable"])
+        return ChatAnalysis.model_validate(self._valid_fields(ChatAnalysis, data))
+    
+    def _valid_fields(self, model: Type[BaseModel], data: Dict[str, Any]) -> Dict[str, Any]:
+        """The known fields of data that validate on their own."""
+        valid = {}
+        for name, value in data.items():
+            if name not in model.model_fields:
+                continue
+            try:
+                model.model_validate({name: value})
+            except ValidationError as e:
+                print(f"Ignoring invalid {model.__name__}.{name}: {e.errors()[0]['msg']}")
+                continue
+            valid[name] = value
+        return valid
 
 # Global instance
 gemini_service = GeminiService()
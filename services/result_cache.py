@@ -0,0 +1,231 @@
+"""Content-addressed cache of timetable generation results and LLM responses."""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from config import settings
+
+
+def content_hash(data: Any) -> str:
+    """
+    Canonical SHA-256 of JSON-like data.
+
+    Dict keys are sorted so field order does not matter; list order is kept
+    because the solvers are order-sensitive.
+    """
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    LRU cache in memory with an optional directory of JSON files behind it.
+
+    With a TTL, entries expire that many seconds after they were stored;
+    on disk the file's modification time is the time it was stored. The
+    files on disk are indexed in memory when the cache starts, so lookups
+    and pruning never rescan the directory. Expired files are deleted when
+    read or written past, and once the directory holds more than
+    max_disk_entries files the oldest are deleted first. Async callers use
+    aget and aput, which do the file I/O in a thread.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 128,
+        disk_dir: str = "",
+        ttl: float = 0,
+        max_disk_entries: int = 1024
+    ):
+        """
+        Args:
+            max_entries: Results kept in memory; 0 disables the cache
+            disk_dir: Directory for the on-disk tier; empty disables it
+            ttl: Seconds an entry stays valid; 0 keeps entries until evicted
+            max_disk_entries: Files kept in the on-disk tier
+        """
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        # key -> (time stored, value)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # key -> time stored, of every file on disk, oldest first
+        self._disk: "OrderedDict[str, float]" = OrderedDict()
+        # Disk reads and writes run in threads, so both tiers are guarded
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    def get(self, key: str) -> Any:
+        """Return a cached result, or None on a miss."""
+        if self.max_entries <= 0:
+            return None
+        value = self._get_memory(key)
+        if value is None and self.disk_dir:
+            value = self._get_disk(key)
+        return self._count(value)
+
+    async def aget(self, key: str) -> Any:
+        """Like get, reading the disk tier in a thread."""
+        if self.max_entries <= 0:
+            return None
+        value = self._get_memory(key)
+        if value is None and self.disk_dir:
+            value = await asyncio.to_thread(self._get_disk, key)
+        return self._count(value)
+
+    def put(self, key: str, value: Any) -> None:
+        """Store a result in memory and, if enabled, on disk."""
+        if self.max_entries <= 0:
+            return
+        self._remember(key, value)
+        if self.disk_dir:
+            self._write_disk(key, value)
+
+    async def aput(self, key: str, value: Any) -> None:
+        """Like put, writing the disk tier in a thread."""
+        if self.max_entries <= 0:
+            return
+        self._remember(key, value)
+        if self.disk_dir:
+            await asyncio.to_thread(self._write_disk, key, value)
+
+    def clear(self) -> None:
+        """Drop every in-memory entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit and miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+    def _count(self, value: Any) -> Any:
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def _get_memory(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry[0]):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _remember(self, key: str, value: Any, stored: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() if stored is None else stored, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _expired(self, stored: float) -> bool:
+        return self.ttl > 0 and time.time() - stored > self.ttl
+
+    def _load_disk_index(self) -> None:
+        """Index the files already on disk, oldest first."""
+        files = []
+        with os.scandir(self.disk_dir) as it:
+            for item in it:
+                if not item.name.endswith(".json"):
+                    continue
+                try:
+                    files.append((item.stat().st_mtime, item.name[:-len(".json")]))
+                except OSError:
+                    continue
+        for stored, key in sorted(files):
+            self._disk[key] = stored
+        self._remove_files(self._prune_disk())
+
+    def _get_disk(self, key: str) -> Any:
+        """Value from the disk tier, kept in memory too, or None if missing or expired."""
+        with self._lock:
+            stored = self._disk.get(key)
+            if stored is not None and self._expired(stored):
+                del self._disk[key]
+                expired = True
+            else:
+                expired = False
+        if expired:
+            self._remove_files([self._path(key)])
+        if stored is None or expired:
+            return None
+
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self._disk.pop(key, None)
+            return None
+        self._remember(key, value, stored)
+        return value
+
+    def _write_disk(self, key: str, value: Any) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, default=str)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._disk[key] = time.time()
+            self._disk.move_to_end(key)
+            stale = self._prune_disk()
+        self._remove_files(stale)
+
+    def _prune_disk(self) -> List[str]:
+        """
+        Drop expired entries, then the oldest beyond max_disk_entries, from the index.
+
+        Entries are kept oldest first, so only the front of the index is
+        looked at. Call with the lock held.
+
+        Returns:
+            Paths of the files to delete
+        """
+        stale = []
+        while self._disk:
+            key, stored = next(iter(self._disk.items()))
+            if len(self._disk) <= self.max_disk_entries and not self._expired(stored):
+                break
+            del self._disk[key]
+            stale.append(self._path(key))
+        return stale
+
+    def _remove_files(self, paths: List[str]) -> None:
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# Global instance
+result_cache = ResultCache(
+    settings.result_cache_size,
+    settings.result_cache_dir,
+    settings.result_cache_ttl,
+    settings.result_cache_disk_size
+)
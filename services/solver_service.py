@@ -0,0 +1,81 @@
+"""Process-pool execution of CPU-bound solver work."""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+from config import settings
+
+
+def _warm_worker() -> int:
+    """Import the solver modules in a worker so the first request pays no start-up cost."""
+    import agents.timetable_agent  # noqa: F401
+    import agents.optimizer_agent  # noqa: F401
+    return os.getpid()
+
+
+class SolverService:
+    """
+    Runs solver functions in a pool of worker processes.
+
+    Solvers are pure CPU work, so running them on the event loop (or in a
+    thread, under the GIL) would stall every other request. Functions must
+    be module-level and take a single picklable payload.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        """
+        Args:
+            max_workers: Number of worker processes; 0 runs solvers inline
+        """
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Return the pool, starting it on first use."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def start(self) -> None:
+        """Start the pool and pre-warm every worker."""
+        if self.max_workers <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(
+            loop.run_in_executor(executor, _warm_worker)
+            for _ in range(self.max_workers)
+        ))
+
+    async def run(self, func: Callable[[Dict[str, Any]], Any], payload: Dict[str, Any]) -> Any:
+        """
+        Run a solver function in the pool and await its result.
+
+        Args:
+            func: Module-level function taking the payload
+            payload: Plain-data problem description
+
+        Returns:
+            The function's return value
+        """
+        if self.max_workers <= 0:
+            return func(payload)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), func, payload)
+        except BrokenProcessPool:
+            # A worker died; drop the pool so the next request gets a fresh one
+            self.shutdown(wait=False)
+            raise
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+# Global instance
+solver_service = SolverService(settings.solver_workers)
@@ -142,32 +142,48 @@ function displayTimetable(result) {
         html += '<div style="background: #fff3cd; padding: 15px; border-radius: 8px; border-left: 4px solid #ffc107; margin-bottom: 15px;">';
         html += '<h4 style="color: #856404; margin: 0 0 10px 0;">⚠️ Constraint Violations Detected</h4>';
         
-        if (validation.violations && validation.violations.length > 0) {
-            // Group violations by type
-            const facultyViolations = validation.violations.filter(v => v.includes('Faculty conflict'));
-            const classroomViolations = validation.violations.filter(v => v.includes('Classroom conflict'));
-            const capacityViolations = validation.violations.filter(v => v.includes('Capacity violation'));
-            const sectionViolations = validation.violations.filter(v => v.includes('Section conflict'));
+        const counts = validation.violation_counts || {};
+        if ((validation.violation_total || 0) > 0) {
+            // Counts per type cover every violation, not just the records returned
+            const facultyViolations = counts.faculty_conflict || 0;
+            const classroomViolations = counts.classroom_conflict || 0;
+            const capacityViolations = counts.capacity || 0;
+            const sectionViolations = counts.section_conflict || 0;
+            const availabilityViolations = (counts.faculty_unavailable || 0) + (counts.classroom_unavailable || 0);
+            const ruleViolations = counts.rule || 0;
             
-            if (facultyViolations.length > 0) {
-                html += `<p style="color: #856404;"><strong>❌ Faculty Conflicts:</strong> ${facultyViolations.length} instances</p>`;
+            if (facultyViolations > 0) {
+                html += `<p style="color: #856404;"><strong>❌ Faculty Conflicts:</strong> ${facultyViolations} instances</p>`;
             }
-            if (classroomViolations.length > 0) {
-                html += `<p style="color: #856404;"><strong>❌ Classroom Conflicts:</strong> ${classroomViolations.length} instances</p>`;
+            if (classroomViolations > 0) {
+                html += `<p style="color: #856404;"><strong>❌ Classroom Conflicts:</strong> ${classroomViolations} instances</p>`;
             }
-            if (capacityViolations.length > 0) {
-                html += `<p style="color: #856404;"><strong>❌ Capacity Issues:</strong> ${capacityViolations.length} instances</p>`;
+            if (capacityViolations > 0) {
+                html += `<p style="color: #856404;"><strong>❌ Capacity Issues:</strong> ${capacityViolations} instances</p>`;
             }
-            if (sectionViolations.length > 0) {
-                html += `<p style="color: #856404;"><strong>❌ Section Conflicts:</strong> ${sectionViolations.length} instances</p>`;
+            if (sectionViolations > 0) {
+                html += `<p style="color: #856404;"><strong>❌ Section Conflicts:</strong> ${sectionViolations} instances</p>`;
+            }
+            if (availabilityViolations > 0) {
+                html += `<p style="color: #856404;"><strong>❌ Unavailable Faculty/Rooms:</strong> ${availabilityViolations} instances</p>`;
+            }
+            if (ruleViolations > 0) {
+                html += `<p style="color: #856404;"><strong>❌ Custom Rule Violations:</strong> ${ruleViolations} instances</p>`;
             }
             
             html += '<details style="margin-top: 10px;"><summary style="cursor: pointer; color: #856404;">View detailed violations</summary>';
-            html += '<ul style="margin-top: 10px;">';
-            validation.violations.forEach(v => {
-                html += `<li class="violation">${v}</li>`;
+            html += '<ul id="violation-list" style="margin-top: 10px;">';
+            (validation.violations || []).forEach(v => {
+                html += `<li class="violation">${v.message}</li>`;
             });
-            html += '</ul></details>';
+            html += '</ul>';
+            const shown = (validation.violations || []).length;
+            if (result.timetable_id && shown < validation.violation_total) {
+                html += `<button id="more-violations" onclick="loadMoreViolations('${result.timetable_id}', ${shown})" style="background: none; border: 1px solid #856404; color: #856404; padding: 6px 12px; border-radius: 5px; cursor: pointer;">`;
+                html += `Show more (${shown} of ${validation.violation_total})`;
+                html += '</button>';
+            }
+            html += '</details>';
         }
         html += '</div>';
     }
@@ -177,7 +193,7 @@ function displayTimetable(result) {
         html += '<div style="background: #d1ecf1; padding: 15px; border-radius: 8px; border-left: 4px solid #17a2b8; margin-bottom: 15px;">';
         html += '<h4 style="color: #0c5460; margin: 0 0 10px 0;">💡 Recommendations</h4>';
         validation.warnings.forEach(w => {
-            html += `<p style="color: #0c5460;" class="warning">${w}</p>`;
+            html += `<p style="color: #0c5460;" class="warning">${w.message}</p>`;
         });
         html += '</div>';
     }
@@ -232,6 +248,35 @@ function displayTimetable(result) {
     resultsSection.scrollIntoView({ behavior: 'smooth' });
 }
 
+// Fetch the next page of violation records for a stored timetable
+async function loadMoreViolations(timetableId, offset) {
+    try {
+        const response = await fetch(`${API_BASE}/api/timetable/${timetableId}/violations?offset=${offset}`);
+        const page = await response.json();
+        
+        if (!response.ok) {
+            showStatus(`❌ Error: ${page.detail}`, 'error');
+            return;
+        }
+        
+        const list = document.getElementById('violation-list');
+        page.violations.forEach(v => {
+            list.insertAdjacentHTML('beforeend', `<li class="violation">${v.message}</li>`);
+        });
+        
+        const shown = offset + page.violations.length;
+        const button = document.getElementById('more-violations');
+        if (shown < page.violation_total && page.violations.length > 0) {
+            button.setAttribute('onclick', `loadMoreViolations('${timetableId}', ${shown})`);
+            button.textContent = `Show more (${shown} of ${page.violation_total})`;
+        } else {
+            button.remove();
+        }
+    } catch (error) {
+        showStatus(`❌ Error loading violations: ${error.message}`, 'error');
+    }
+}
+
 // Show status message
 function showStatus(message, type) {
     const statusDiv = document.getElementById('generation-status');
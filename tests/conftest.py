@@ -0,0 +1,5 @@
+"""Shared test setup."""
+import os
+
+# Settings require an API key at import time; tests never call the model
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
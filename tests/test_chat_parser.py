@@ -0,0 +1,149 @@
+"""Tests for the rule-based chat request parser."""
+import pytest
+
+from services.chat_parser import DAYS, parse_chat_request
+
+WEEKDAYS = DAYS[:5]
+
+
+def test_full_template_request_is_high_confidence():
+    result = parse_chat_request(
+        "Generate a timetable for subjects Data Structures, Algorithms and Operating Systems, "
+        "4 classes per week, from 9am to 1pm, 50 minute classes, Monday to Friday, semester 3"
+    )
+
+    assert result["intent"] == "generate_timetable"
+    assert result["confidence"] == "high"
+    timetable = result["timetable"]
+    assert timetable["subjects"] == ["Data Structures", "Algorithms", "Operating Systems"]
+    assert timetable["classes_per_subject_per_week"] == 4
+    assert timetable["start_time"] == "09:00"
+    assert timetable["end_time"] == "13:00"
+    assert timetable["class_duration_minutes"] == 50
+    assert timetable["days"] == WEEKDAYS
+    assert timetable["semester"] == "3"
+
+
+def test_named_days_are_included():
+    result = parse_chat_request(
+        "Generate a timetable for subjects Math, Physics and Chemistry on Monday and Tuesday"
+    )
+
+    assert result["confidence"] == "high"
+    assert result["timetable"]["days"] == ["Monday", "Tuesday"]
+
+
+@pytest.mark.parametrize("message, excluded", [
+    ("Generate a timetable for subjects Math, Physics and Chemistry with no classes on Friday",
+     ["Friday"]),
+    ("Create timetable for subjects Math and Physics except Friday", ["Friday"]),
+    ("Generate timetable with subjects Math, Physics but not on Wednesday", ["Wednesday"]),
+    ("Generate timetable for subjects Math and Physics. Avoid Mondays", ["Monday"]),
+    ("Generate timetable for subjects Math and Physics without Friday classes", ["Friday"]),
+    ("Generate timetable for subjects Math and Physics, no classes Monday to Wednesday",
+     ["Monday", "Tuesday", "Wednesday"]),
+])
+def test_negated_days_are_excluded(message, excluded):
+    result = parse_chat_request(message)
+
+    timetable = result["timetable"]
+    assert timetable["days"] == [day for day in WEEKDAYS if day not in excluded]
+    assert "days" in result["matched"]
+    assert not any(excluded_day in timetable["days"] for excluded_day in excluded)
+
+
+def test_exclusion_applies_to_a_day_range():
+    result = parse_chat_request(
+        "Generate timetable for subjects Math and Physics Monday to Friday except Wednesday"
+    )
+
+    assert result["timetable"]["subjects"] == ["Math", "Physics"]
+    assert result["timetable"]["days"] == ["Monday", "Tuesday", "Thursday", "Friday"]
+
+
+def test_negation_is_not_taken_as_a_subject():
+    result = parse_chat_request(
+        "Create a timetable with subjects Math and Physics and no classes on Friday"
+    )
+
+    assert result["timetable"]["subjects"] == ["Math", "Physics"]
+    assert result["timetable"]["days"] == WEEKDAYS[:4]
+
+
+@pytest.mark.parametrize("message", [
+    "Generate timetable for subjects Math and Physics with no labs",
+    "Generate timetable for subjects Math and Physics, keep Friday free",
+    "Generate timetable for subjects Math and Physics, don't schedule anything after lunch",
+])
+def test_unparsed_negation_leaves_the_message_to_the_model(message):
+    result = parse_chat_request(message)
+
+    assert result["confidence"] != "high"
+
+
+def test_bare_time_range_is_read():
+    result = parse_chat_request(
+        "Generate a timetable for subjects Math, Physics, 2 classes per week, 9am to 1pm"
+    )
+
+    timetable = result["timetable"]
+    assert (timetable["start_time"], timetable["end_time"]) == ("09:00", "13:00")
+    assert result["confidence"] == "high"
+
+
+@pytest.mark.parametrize("message", [
+    "Generate a timetable for subjects Math, History but Math only on Mondays",
+    "Generate a timetable for subjects Math and Physics with lunch at 12",
+    "Generate a timetable for subjects Math and Physics, Physics needs a lab",
+    "Generate a timetable for subjects Math and Physics with 6 classes per day",
+])
+def test_unparsed_words_leave_the_message_to_the_model(message):
+    result = parse_chat_request(message)
+
+    assert result["intent"] == "generate_timetable"
+    assert result["confidence"] == "medium"
+
+
+def test_condition_after_the_subjects_is_not_a_subject():
+    result = parse_chat_request(
+        "Generate a timetable for subjects Math and Physics, Physics needs a lab"
+    )
+
+    assert result["timetable"]["subjects"] == ["Math", "Physics"]
+
+
+def test_excluding_every_day_is_not_high_confidence():
+    result = parse_chat_request(
+        "Generate timetable for subjects Math and Physics except Monday to Friday"
+    )
+
+    assert result["timetable"]["days"] == []
+    assert result["confidence"] != "high"
+
+
+def test_change_request_keeps_previous_parameters():
+    previous = {
+        "university": "MIT University",
+        "semester": "5",
+        "schedule": [
+            {"subject": "Math", "day": "Monday", "start_time": "09:00", "end_time": "10:00"},
+            {"subject": "Physics", "day": "Tuesday", "start_time": "10:00", "end_time": "11:00"},
+        ],
+    }
+
+    result = parse_chat_request("Change it to 4 classes per week", previous)
+
+    assert result["confidence"] == "high"
+    timetable = result["timetable"]
+    assert timetable["classes_per_subject_per_week"] == 4
+    assert timetable["subjects"] == ["Math", "Physics"]
+    assert timetable["days"] == ["Monday", "Tuesday"]
+    assert timetable["class_duration_minutes"] == 60
+
+
+def test_unrelated_message_has_no_intent():
+    result = parse_chat_request("What is the weather like today?")
+
+    assert result["intent"] is None
+    assert result["confidence"] == "low"
+    assert result["timetable"] is None
@@ -0,0 +1,57 @@
+"""Tests that the NumPy columnar validator agrees with the row validator."""
+import asyncio
+import random
+
+from agents.constraint_agent import ConstraintAgent
+
+DAYS = ["Monday", "Tuesday"]
+TIMES = [("09:00", "10:00"), ("09:30", "10:30"), ("10:00", "11:00"), ("10:00", "12:00"),
+         ("13:00", "14:00"), ("14:00", "15:00")]
+
+FACULTY = [
+    {"id": f"F{i}", "name": f"Faculty {i}", "max_hours_per_week": 1 + i,
+     "unavailable_slots": [{"day": DAYS[i % 2], "start_time": "09:00", "end_time": "10:00"}]}
+    for i in range(1, 5)
+]
+CLASSROOMS = [{"id": f"R{i}", "capacity": 30 * i} for i in range(1, 4)]
+SECTIONS = [{"id": f"S{i}", "num_students": 25 * i} for i in range(1, 4)]
+SUBJECTS = [{"id": f"SUB{i}", "name": f"Subject {i}"} for i in range(1, 3)]
+
+
+def random_schedule(seed: int, size: int) -> list:
+    rng = random.Random(seed)
+    entries = []
+    for _ in range(size):
+        start_time, end_time = rng.choice(TIMES)
+        entries.append({
+            "faculty": rng.choice(FACULTY),
+            "classroom": rng.choice(CLASSROOMS),
+            "section": rng.choice(SECTIONS),
+            "subject": rng.choice(SUBJECTS),
+            "day": rng.choice(DAYS),
+            "start_time": start_time,
+            "end_time": end_time,
+        })
+    return entries
+
+
+def validate(entries: list, columnar: bool) -> dict:
+    result = asyncio.run(ConstraintAgent().execute({
+        "schedule_entries": entries, "columnar": columnar, "limit": 1000
+    }))
+    return result.data
+
+
+def test_columnar_validation_matches_row_validation():
+    for seed in range(20):
+        entries = random_schedule(seed, 80)
+
+        columnar = validate(entries, columnar=True)
+
+        assert columnar["violations"]
+        assert columnar == validate(entries, columnar=False)
+
+
+def test_small_and_empty_schedules_match():
+    for entries in ([], random_schedule(0, 1), random_schedule(1, 2)):
+        assert validate(entries, columnar=True) == validate(entries, columnar=False)
@@ -0,0 +1,75 @@
+"""Tests for ConstraintAgent validation modes."""
+import asyncio
+import random
+
+from agents.constraint_agent import ConstraintAgent, ViolationReport
+from tests.test_incremental_validator import make_entry
+
+
+def random_schedule(seed: int, size: int) -> list:
+    rng = random.Random(seed)
+    return [make_entry(rng) for _ in range(size)]
+
+
+def validate(entries: list, **options) -> dict:
+    result = asyncio.run(ConstraintAgent().execute({"schedule_entries": entries, **options}))
+    return result.data
+
+
+def test_concurrent_checks_match_sequential_checks():
+    for seed in range(10):
+        entries = random_schedule(seed, 60)
+
+        concurrent = validate(entries, concurrent=True, limit=25)
+        sequential = validate(entries, concurrent=False, limit=25)
+
+        assert concurrent == sequential
+
+
+def test_stream_yields_every_check_then_the_result():
+    entries = random_schedule(0, 40)
+
+    async def collect():
+        return [event async for event in ConstraintAgent().stream({
+            "schedule_entries": entries, "concurrent": True
+        })]
+
+    events = asyncio.run(collect())
+
+    checks = [event["check"] for event in events[:-1]]
+    assert all(event["event"] == "check" for event in events[:-1])
+    assert sorted(checks) == sorted(set(checks)) and "faculty_conflicts" in checks
+    assert events[-1]["event"] == "result"
+    assert events[-1]["data"] == validate(entries, concurrent=False)
+
+
+def test_pages_at_any_offset_are_slices_of_the_full_list():
+    entries = random_schedule(1, 120)
+    full = validate(entries, concurrent=False, limit=10000)
+    assert full["violation_total"] > 40
+
+    for offset in range(0, full["violation_total"] + 10, 7):
+        for concurrent in (True, False):
+            page = validate(entries, concurrent=concurrent, offset=offset, limit=9)
+
+            assert page["violations"] == full["violations"][offset:offset + 9]
+            assert page["warnings"] == full["warnings"][offset:offset + 9]
+            assert page["violation_counts"] == full["violation_counts"]
+
+
+def test_deep_offset_stores_at_most_limit_records_per_part(monkeypatch):
+    entries = random_schedule(2, 150)
+    total = validate(entries, limit=0)["violation_total"]
+    stored = []
+    merge = ViolationReport.merge
+
+    def recording_merge(report, part):
+        stored.append(len(part.records))
+        merge(report, part)
+
+    monkeypatch.setattr(ViolationReport, "merge", recording_merge)
+
+    page = validate(entries, concurrent=True, offset=total - 5, limit=10)
+
+    assert len(page["violations"]) == 5
+    assert max(stored) <= 10
@@ -0,0 +1,192 @@
+"""Tests that the exact solver is complete and explains infeasible requests."""
+import random
+
+from agents.exact_solver import ExactSolver
+from agents.problem import SchedulingProblem
+
+
+def time_slots(count: int) -> list:
+    return [
+        {
+            "day": "Monday",
+            "start_time": f"{9 + 2 * i:02d}:00",
+            "end_time": f"{10 + 2 * i:02d}:00",
+            "slot_id": f"Monday_{9 + 2 * i:02d}:00",
+        }
+        for i in range(count)
+    ]
+
+
+def random_instance(rng: random.Random) -> dict:
+    subjects = [
+        {"id": f"SUB{i}", "name": f"Subject {i}", "hours_per_week": rng.randint(1, 2)}
+        for i in range(rng.randint(1, 3))
+    ]
+    sections = [
+        {
+            "id": f"S{i}",
+            "num_students": rng.choice([20, 40]),
+            "subjects": [s["id"] for s in rng.sample(subjects, rng.randint(1, len(subjects)))],
+        }
+        for i in range(rng.randint(1, 2))
+    ]
+    faculty = [
+        {
+            "id": f"F{i}",
+            "name": f"Faculty {i}",
+            "subjects_can_teach": [s["id"] for s in subjects if rng.random() < 0.6],
+        }
+        for i in range(rng.randint(1, 2))
+    ]
+    classrooms = [
+        {"id": f"R{i}", "capacity": rng.choice([30, 50])} for i in range(rng.randint(1, 2))
+    ]
+    return {
+        "sections": sections,
+        "subjects": subjects,
+        "faculty": faculty,
+        "classrooms": classrooms,
+        "time_slots": time_slots(rng.randint(2, 4)),
+    }
+
+
+def brute_force_feasible(instance: dict) -> bool:
+    hours = {s["id"]: s["hours_per_week"] for s in instance["subjects"]}
+    classes = [
+        (section, subject_id)
+        for section in instance["sections"]
+        for subject_id in section["subjects"]
+        for _ in range(hours[subject_id])
+    ]
+    slots = range(len(instance["time_slots"]))
+    busy = set()
+
+    def place(k: int) -> bool:
+        if k == len(classes):
+            return True
+        section, subject_id = classes[k]
+        for slot in slots:
+            if ("section", section["id"], slot) in busy:
+                continue
+            for faculty in instance["faculty"]:
+                if subject_id not in faculty["subjects_can_teach"]:
+                    continue
+                if ("faculty", faculty["id"], slot) in busy:
+                    continue
+                for room in instance["classrooms"]:
+                    if room["capacity"] < section["num_students"]:
+                        continue
+                    if ("room", room["id"], slot) in busy:
+                        continue
+                    keys = {
+                        ("section", section["id"], slot),
+                        ("faculty", faculty["id"], slot),
+                        ("room", room["id"], slot),
+                    }
+                    busy.update(keys)
+                    if place(k + 1):
+                        return True
+                    busy.difference_update(keys)
+        return False
+
+    return place(0)
+
+
+def solve(instance: dict) -> dict:
+    problem = SchedulingProblem(
+        instance["sections"],
+        instance["subjects"],
+        instance["faculty"],
+        instance["classrooms"],
+        instance["time_slots"],
+    )
+    return ExactSolver(problem, time_limit=10.0).solve()
+
+
+def assert_valid(instance: dict, placements: list) -> None:
+    sections = {s["id"]: s for s in instance["sections"]}
+    faculty = {f["id"]: f for f in instance["faculty"]}
+    rooms = {r["id"]: r for r in instance["classrooms"]}
+    hours = {s["id"]: s["hours_per_week"] for s in instance["subjects"]}
+    seen = set()
+    placed = {}
+    for section_id, subject_id, slot, faculty_id, room_id in placements:
+        keys = {
+            ("section", section_id, slot), ("faculty", faculty_id, slot), ("room", room_id, slot)
+        }
+        assert not keys & seen
+        seen |= keys
+        assert subject_id in faculty[faculty_id]["subjects_can_teach"]
+        assert rooms[room_id]["capacity"] >= sections[section_id]["num_students"]
+        placed[(section_id, subject_id)] = placed.get((section_id, subject_id), 0) + 1
+    assert placed == {
+        (section["id"], subject_id): hours[subject_id]
+        for section in instance["sections"]
+        for subject_id in section["subjects"]
+    }
+
+
+def test_matches_brute_force_on_small_instances():
+    outcomes = set()
+    for seed in range(150):
+        instance = random_instance(random.Random(seed))
+
+        result = solve(instance)
+
+        feasible = brute_force_feasible(instance)
+        assert result["status"] == ("feasible" if feasible else "infeasible"), seed
+        if feasible:
+            assert_valid(instance, result["placements"])
+        else:
+            assert result["reasons"]
+        outcomes.add(feasible)
+    assert outcomes == {True, False}
+
+
+def test_reports_a_subject_nobody_can_teach():
+    instance = {
+        "sections": [{"id": "S1", "num_students": 30, "subjects": ["MATH", "ART"]}],
+        "subjects": [
+            {"id": "MATH", "name": "Math", "hours_per_week": 1},
+            {"id": "ART", "name": "Art", "hours_per_week": 1},
+        ],
+        "faculty": [{"id": "F1", "name": "Ada", "subjects_can_teach": ["MATH"]}],
+        "classrooms": [{"id": "R1", "capacity": 40}],
+        "time_slots": time_slots(3),
+    }
+
+    result = solve(instance)
+
+    assert result["status"] == "infeasible"
+    assert result["placements"] == []
+    assert any("ART" in reason for reason in result["reasons"])
+
+
+def test_reports_a_section_with_more_classes_than_slots():
+    instance = {
+        "sections": [{"id": "S1", "num_students": 30, "subjects": ["MATH"]}],
+        "subjects": [{"id": "MATH", "name": "Math", "hours_per_week": 3}],
+        "faculty": [{"id": "F1", "name": "Ada", "subjects_can_teach": ["MATH"]}],
+        "classrooms": [{"id": "R1", "capacity": 40}],
+        "time_slots": time_slots(2),
+    }
+
+    result = solve(instance)
+
+    assert result["status"] == "infeasible"
+    assert any("needs 3 classes" in reason for reason in result["reasons"])
+
+
+def test_reports_a_section_too_large_for_every_room():
+    instance = {
+        "sections": [{"id": "S1", "num_students": 90, "subjects": ["MATH"]}],
+        "subjects": [{"id": "MATH", "name": "Math", "hours_per_week": 1}],
+        "faculty": [{"id": "F1", "name": "Ada", "subjects_can_teach": ["MATH"]}],
+        "classrooms": [{"id": "R1", "capacity": 40}],
+        "time_slots": time_slots(2),
+    }
+
+    result = solve(instance)
+
+    assert result["status"] == "infeasible"
+    assert any("S1" in reason for reason in result["reasons"])
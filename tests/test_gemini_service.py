@@ -0,0 +1,128 @@
+"""Tests for GeminiService request handling, with the model replaced by a fake."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from config import settings
+from services.gemini_service import GeminiService
+
+
+class FakeModel:
+    """Answers every prompt after a short wait and records how calls overlap."""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            if self.fail:
+                raise RuntimeError("upstream failed")
+            return SimpleNamespace(text=f"answer to {prompt}")
+        finally:
+            self.active -= 1
+
+
+def make_service(monkeypatch, model: FakeModel, max_concurrency: int = 8) -> GeminiService:
+    monkeypatch.setattr(settings, "llm_max_concurrency", max_concurrency)
+    service = GeminiService()
+    service.model = model
+    return service
+
+
+def test_requests_in_flight_are_capped(monkeypatch):
+    model = FakeModel()
+    service = make_service(monkeypatch, model, max_concurrency=2)
+
+    async def run():
+        return await asyncio.gather(*(service.generate_text(f"prompt {i}") for i in range(6)))
+
+    answers = asyncio.run(run())
+
+    assert answers == [f"answer to prompt {i}" for i in range(6)]
+    assert model.calls == 6
+    assert model.max_active == 2
+
+
+def test_errors_reach_the_caller(monkeypatch):
+    service = make_service(monkeypatch, FakeModel(fail=True))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(service.generate_text("prompt"))
+
+
+def test_identical_requests_in_flight_share_one_call(monkeypatch):
+    model = FakeModel()
+    service = make_service(monkeypatch, model)
+
+    async def run():
+        return await asyncio.gather(
+            service.generate_text("same"),
+            service.generate_text("same"),
+            service.generate_text("same"),
+            service.generate_text("same", temperature=0.1),
+        )
+
+    answers = asyncio.run(run())
+
+    assert answers == ["answer to same"] * 4
+    assert model.calls == 2
+    assert service.stats()["coalesced"] == 2
+
+
+def test_a_failed_call_reaches_every_waiter_and_is_not_reused(monkeypatch):
+    model = FakeModel(fail=True)
+    service = make_service(monkeypatch, model)
+
+    async def run():
+        failures = await asyncio.gather(
+            service.generate_text("same"), service.generate_text("same"), return_exceptions=True
+        )
+        model.fail = False
+        return failures, await service.generate_text("same")
+
+    failures, answer = asyncio.run(run())
+
+    assert all(isinstance(failure, RuntimeError) for failure in failures)
+    assert answer == "answer to same"
+    assert model.calls == 2
+
+
+def test_a_cancelled_caller_does_not_cancel_the_shared_call(monkeypatch):
+    model = FakeModel()
+    service = make_service(monkeypatch, model)
+
+    async def run():
+        first = asyncio.ensure_future(service.generate_text("same"))
+        second = asyncio.ensure_future(service.generate_text("same"))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "answer to same"
+    assert model.calls == 1
+
+
+def test_cached_requests_skip_the_model(monkeypatch):
+    model = FakeModel()
+    service = make_service(monkeypatch, model)
+
+    async def run():
+        concurrent = await asyncio.gather(
+            service.generate_text("same", cache=True), service.generate_text("same", cache=True)
+        )
+        return concurrent, await service.generate_text("same", cache=True)
+
+    concurrent, later = asyncio.run(run())
+
+    assert concurrent == ["answer to same"] * 2
+    assert later == "answer to same"
+    assert model.calls == 1
+    assert service.stats()["hits"] == 1
@@ -0,0 +1,94 @@
+"""Tests that the incremental validator agrees with a full validation."""
+import asyncio
+import random
+
+from agents.constraint_agent import ConstraintAgent, IncrementalValidator
+
+DAYS = ["Monday", "Tuesday", "Wednesday"]
+TIMES = [("09:00", "10:00"), ("10:00", "11:00"), ("09:30", "10:30"), ("13:00", "14:00"),
+         ("14:00", "15:00"), ("14:00", "16:00")]
+
+FACULTY = [
+    {"id": f"F{i}", "name": f"Faculty {i}", "max_hours_per_week": 2 + i,
+     "unavailable_slots": [{"day": DAYS[i % 3], "start_time": "09:00", "end_time": "10:00"}]}
+    for i in range(1, 5)
+]
+CLASSROOMS = [
+    {"id": f"R{i}", "capacity": 30 * i,
+     "unavailable_slots": [{"day": DAYS[i % 3], "start_time": "14:00", "end_time": "15:00"}]}
+    for i in range(1, 4)
+]
+SECTIONS = [{"id": f"S{i}", "num_students": 25 * i} for i in range(1, 4)]
+
+
+def make_entry(rng: random.Random) -> dict:
+    start_time, end_time = rng.choice(TIMES)
+    return {
+        "faculty": rng.choice(FACULTY),
+        "classroom": rng.choice(CLASSROOMS),
+        "section": rng.choice(SECTIONS),
+        "subject": {"id": "SUB1", "name": "Math"},
+        "day": rng.choice(DAYS),
+        "start_time": start_time,
+        "end_time": end_time,
+    }
+
+
+def full_counts(entries: list) -> tuple:
+    result = asyncio.run(ConstraintAgent().execute({"schedule_entries": entries}))
+    return result.data["violation_counts"], result.data["warning_counts"]
+
+
+def incremental_counts(validator: IncrementalValidator) -> tuple:
+    violations, warnings = {}, {}
+    for counts, records in ((violations, validator.violations()), (warnings, validator.warnings())):
+        for record in records:
+            counts[record["code"]] = counts.get(record["code"], 0) + 1
+    return violations, warnings
+
+
+def test_unseen_faculty_availability_is_checked():
+    entry = {
+        "faculty": FACULTY[0],
+        "classroom": CLASSROOMS[0],
+        "section": SECTIONS[0],
+        "day": FACULTY[0]["unavailable_slots"][0]["day"],
+        "start_time": "09:00",
+        "end_time": "10:00",
+    }
+    validator = IncrementalValidator([])
+
+    validator.add_entry(entry)
+
+    assert incremental_counts(validator)[0] == {"faculty_unavailable": 1}
+    assert full_counts([entry])[0] == {"faculty_unavailable": 1}
+
+
+def test_edits_match_full_validation():
+    for seed in range(30):
+        rng = random.Random(seed)
+        # Seed with a subset of the resources so later edits bring in unseen ones
+        seeded = [make_entry(rng) for _ in range(rng.randrange(0, 4))]
+        validator = IncrementalValidator(seeded)
+        live = dict(enumerate(seeded))
+
+        for _ in range(25):
+            action = rng.random()
+            if action < 0.5 or not live:
+                entry = make_entry(rng)
+                live[validator.add_entry(entry)] = entry
+            elif action < 0.7:
+                validator.remove_entry(index := rng.choice(list(live)))
+                del live[index]
+            else:
+                index = rng.choice(list(live))
+                start_time, end_time = rng.choice(TIMES)
+                changes = {"day": rng.choice(DAYS), "start_time": start_time, "end_time": end_time}
+                if rng.random() < 0.5:
+                    changes["classroom"] = rng.choice(CLASSROOMS)
+                live[index] = validator.move_entry(index, changes)
+
+            violations, warnings = incremental_counts(validator)
+            assert (violations, warnings) == full_counts(list(live.values()))
+            assert validator.violation_count == sum(violations.values())
+            assert validator.is_valid == (not violations)
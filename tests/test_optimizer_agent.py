@@ -0,0 +1,110 @@
+"""Tests that the annealing optimizer only makes moves that keep a schedule feasible."""
+from agents.optimizer_agent import ScheduleOptimizer
+from agents.problem import SchedulingProblem, generate_time_slots
+
+SECTIONS = [
+    {"id": "S1", "num_students": 30, "subjects": ["MATH", "PHYS", "CHEM"]},
+    {"id": "S2", "num_students": 45, "subjects": ["MATH", "PHYS", "CHEM"]},
+]
+SUBJECTS = [
+    {"id": "MATH", "name": "Math", "hours_per_week": 3},
+    {"id": "PHYS", "name": "Physics", "hours_per_week": 2},
+    {"id": "CHEM", "name": "Chemistry", "hours_per_week": 2},
+]
+FACULTY = [
+    {"id": "F1", "name": "Ada", "subjects_can_teach": ["MATH", "PHYS"]},
+    {"id": "F2", "name": "Bo", "subjects_can_teach": ["PHYS", "CHEM"]},
+    {"id": "F3", "name": "Cy", "subjects_can_teach": ["MATH", "CHEM"]},
+]
+CLASSROOMS = [{"id": "R1", "capacity": 40}, {"id": "R2", "capacity": 60}]
+
+
+def make_problem(faculty: list = FACULTY) -> SchedulingProblem:
+    return SchedulingProblem(SECTIONS, SUBJECTS, faculty, CLASSROOMS, generate_time_slots())
+
+
+def keys(section_id: str, faculty_id: str, room_id: str, slot: int) -> set:
+    return {("section", section_id, slot), ("faculty", faculty_id, slot), ("room", room_id, slot)}
+
+
+def first_fit(faculty: list = FACULTY) -> list:
+    """Feasible placements packed into the first slots of the week, within weekly caps."""
+    hours = {s["id"]: s["hours_per_week"] for s in SUBJECTS}
+    busy = set()
+    load = {f["id"]: 0 for f in faculty}
+    placements = []
+    for section in SECTIONS:
+        for subject_id in section["subjects"]:
+            for _ in range(hours[subject_id]):
+                placement = next(
+                    (section["id"], subject_id, slot, f["id"], r["id"])
+                    for slot in range(len(generate_time_slots()))
+                    for f in faculty
+                    for r in CLASSROOMS
+                    if subject_id in f["subjects_can_teach"]
+                    and r["capacity"] >= section["num_students"]
+                    and load[f["id"]] < f.get("max_hours_per_week", float("inf"))
+                    and not keys(section["id"], f["id"], r["id"], slot) & busy
+                )
+                section_id, _, slot, faculty_id, room_id = placement
+                busy |= keys(section_id, faculty_id, room_id, slot)
+                load[faculty_id] += 1
+                placements.append(placement)
+    return placements
+
+
+def assert_feasible(placements: list, faculty: list = FACULTY) -> None:
+    teaches = {f["id"]: f["subjects_can_teach"] for f in faculty}
+    capacity = {r["id"]: r["capacity"] for r in CLASSROOMS}
+    size = {s["id"]: s["num_students"] for s in SECTIONS}
+    seen = set()
+    for section_id, subject_id, slot, faculty_id, room_id in placements:
+        assert not keys(section_id, faculty_id, room_id, slot) & seen
+        seen |= keys(section_id, faculty_id, room_id, slot)
+        assert subject_id in teaches[faculty_id]
+        assert capacity[room_id] >= size[section_id]
+
+
+def test_annealing_keeps_every_hard_constraint():
+    start = first_fit()
+    for seed in range(5):
+        optimizer = ScheduleOptimizer(make_problem(), start, seed=seed)
+
+        optimizer.run(time_limit=10.0, max_iterations=3000)
+        best, best_cost = optimizer.best()
+
+        assert_feasible(best)
+        assert sorted(p[:2] for p in best) == sorted(p[:2] for p in start)
+        assert best_cost < ScheduleOptimizer(make_problem(), start).cost
+
+
+def test_best_cost_matches_a_fresh_score_of_the_best_placements():
+    optimizer = ScheduleOptimizer(make_problem(), first_fit(), seed=1)
+
+    optimizer.run(time_limit=10.0, max_iterations=3000)
+    best, best_cost = optimizer.best()
+
+    assert abs(ScheduleOptimizer(make_problem(), best).cost - best_cost) < 1e-6
+
+
+def test_run_stops_at_its_iteration_cap_and_skips_a_zero_budget():
+    optimizer = ScheduleOptimizer(make_problem(), first_fit(), seed=0)
+
+    assert optimizer.run(time_limit=10.0, max_iterations=50) == 50
+    assert optimizer.run(time_limit=0) == 0
+    assert optimizer.iterations == 50
+
+
+def test_replacement_faculty_stay_within_weekly_caps():
+    caps = {"F1": 4, "F2": 5, "F3": 5}
+    faculty = [{**f, "max_hours_per_week": caps[f["id"]]} for f in FACULTY]
+    start = first_fit(faculty)
+    for seed in range(5):
+        optimizer = ScheduleOptimizer(make_problem(faculty), start, seed=seed)
+
+        optimizer.run(time_limit=10.0, max_iterations=3000)
+        best, _ = optimizer.best()
+
+        assert_feasible(best, faculty)
+        for faculty_id, cap in caps.items():
+            assert sum(p[3] == faculty_id for p in best) <= cap
@@ -0,0 +1,101 @@
+"""Tests for local schedule repair after faculty and classroom changes."""
+from agents.problem import SchedulingProblem, generate_time_slots
+from agents.repair_agent import ScheduleRepairer
+
+# Monday 09:00-10:00 and 10:00-11:00
+GRID = generate_time_slots()[:2]
+LATE = [{"day": "Monday", "start_time": "10:00", "end_time": "11:00"}]
+
+SECTIONS = [
+    {"id": "S1", "num_students": 30},
+    {"id": "S2", "num_students": 30},
+    {"id": "S3", "num_students": 30},
+]
+SUBJECTS = [{"id": "MATH"}, {"id": "PHYS"}, {"id": "CHEM"}]
+
+
+def make_repairer(faculty: list, classrooms: list, placements: list) -> ScheduleRepairer:
+    problem = SchedulingProblem(SECTIONS, SUBJECTS, faculty, classrooms, GRID)
+    return ScheduleRepairer(problem, placements)
+
+
+def test_valid_placements_are_kept_as_they_are():
+    faculty = [{"id": "F1", "subjects_can_teach": ["MATH", "PHYS"]}]
+    placements = [("S1", "MATH", 0, "F1", "R1"), ("S2", "PHYS", 1, "F1", "R1")]
+    repairer = make_repairer(faculty, [{"id": "R1", "capacity": 40}], placements)
+
+    assert repairer.run(time_limit=1.0) == []
+    assert repairer.displaced == [] and repairer.changed == {}
+    assert repairer.placements == placements
+
+
+def test_class_in_a_removed_room_moves_to_a_free_room():
+    faculty = [{"id": "F1", "subjects_can_teach": ["MATH"]}]
+    classrooms = [{"id": "R1", "capacity": 40}, {"id": "R3", "capacity": 40}]
+    placements = [("S1", "MATH", 0, "F1", "R1"), ("S2", "MATH", 1, "F1", "R2")]
+    repairer = make_repairer(faculty, classrooms, placements)
+
+    assert repairer.run(time_limit=1.0) == []
+    assert repairer.displaced == [1]
+    assert repairer.changed == {1: ("S2", "MATH", 1, "F1", "R1")}
+    assert repairer.moved == []
+
+
+def test_forced_ejection_moves_exactly_one_blocker():
+    # F2 became unavailable at 10:00, so S2's Physics can only go at 09:00,
+    # where the one room is taken by S1's Math, which can move to 10:00
+    faculty = [
+        {"id": "F1", "subjects_can_teach": ["MATH"]},
+        {"id": "F2", "subjects_can_teach": ["PHYS"], "unavailable_slots": LATE},
+    ]
+    placements = [("S1", "MATH", 0, "F1", "R1"), ("S2", "PHYS", 1, "F2", "R2")]
+    repairer = make_repairer(faculty, [{"id": "R1", "capacity": 40}], placements)
+
+    assert repairer.run(time_limit=1.0) == []
+    assert repairer.moved == [0]
+    assert repairer.changed == {
+        0: ("S1", "MATH", 1, "F1", "R1"),
+        1: ("S2", "PHYS", 0, "F2", "R1"),
+    }
+
+
+def test_failed_ejection_puts_moved_classes_back():
+    # Freeing the room at 09:00 works, but F2 is also teaching S3 there and
+    # that class cannot move, so the room's class goes back to 09:00
+    faculty = [
+        {"id": "F1", "subjects_can_teach": ["MATH"]},
+        {"id": "F2", "subjects_can_teach": ["PHYS", "CHEM"], "unavailable_slots": LATE},
+    ]
+    classrooms = [{"id": "R1", "capacity": 40}, {"id": "R3", "capacity": 40}]
+    placements = [
+        ("S1", "MATH", 0, "F1", "R1"),
+        ("S3", "CHEM", 0, "F2", "R3"),
+        ("S2", "PHYS", 1, "F2", "R1"),
+    ]
+    repairer = make_repairer(faculty, classrooms, placements)
+
+    assert repairer.run(time_limit=1.0) == [2]
+    assert repairer.changed == {2: None}
+    assert repairer.moved == []
+    assert repairer.placements[:2] == placements[:2]
+    problem = repairer.problem
+    assert not problem.classroom_busy.is_free("R1", 0)
+    assert problem.classroom_busy.is_free("R1", 1)
+    assert repairer.occupant[("room", "R1", 0)] == 0
+
+
+def test_unaffected_placements_are_only_checked_for_clashes():
+    faculty = [{"id": "F1", "subjects_can_teach": ["MATH"]}]
+    classrooms = [{"id": "R1", "capacity": 40}]
+    placements = [
+        # R2 was removed, but only an affected placement is checked for that
+        ("S1", "MATH", 0, "F1", "R2"),
+        ("S2", "MATH", 1, "F1", "R2"),
+        # Clashes with the first placement on F1
+        ("S3", "MATH", 0, "F1", "R1"),
+    ]
+    problem = SchedulingProblem(SECTIONS, SUBJECTS, faculty, classrooms, GRID)
+
+    repairer = ScheduleRepairer(problem, placements, affected={1})
+
+    assert repairer.displaced == [1, 2]
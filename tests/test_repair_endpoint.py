@@ -0,0 +1,101 @@
+"""Tests for the timetable repair endpoint."""
+import asyncio
+import copy
+
+import pytest
+from fastapi import HTTPException
+
+import main
+from agents.base_agent import AgentResult
+from models import Classroom, Faculty, TimeSlot
+
+MONDAY_NINE = TimeSlot(day="Monday", start_time="09:00", end_time="10:00")
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    monkeypatch.setattr(main, "get_current_user", lambda request: {"uid": "tester"})
+    monkeypatch.setitem(main.data_store, "faculty", [
+        Faculty(id="F1", name="Ada", department="CSE", subjects_can_teach=["CS101"]),
+    ])
+    monkeypatch.setitem(main.data_store, "classrooms", [
+        Classroom(id="R1", name="Room 1", building="A", capacity=60),
+        Classroom(id="R2", name="Room 2", building="A", capacity=60),
+    ])
+    monkeypatch.setitem(main.data_store, "timetables", [{
+        "id": "TT1",
+        "schedule": [{"faculty_id": "F1", "classroom_id": "R1", "day": "Monday",
+                      "start_time": "09:00", "end_time": "10:00"}],
+        "constraints_satisfied": True,
+        "optimization_score": 0.9,
+    }])
+    return copy.deepcopy(main.data_store)
+
+
+def repair(request_data: main.RepairTimetableRequest):
+    return asyncio.run(main.repair_timetable("TT1", request_data, request=None))
+
+
+REQUEST = main.RepairTimetableRequest(
+    faculty_unavailable={"F1": [MONDAY_NINE]},
+    classroom_unavailable={"R1": [MONDAY_NINE]},
+    removed_classrooms=["R2"],
+)
+
+
+def test_failed_repair_leaves_stored_data_unchanged(stored, monkeypatch):
+    async def fail(input_data):
+        return AgentResult(success=False, data={}, message="no room left")
+    monkeypatch.setattr(main.repair_agent, "run", fail)
+
+    with pytest.raises(HTTPException) as error:
+        repair(REQUEST)
+
+    assert error.value.status_code == 500
+    assert main.data_store == stored
+
+
+def test_repair_error_leaves_stored_data_unchanged(stored, monkeypatch):
+    async def crash(input_data):
+        raise RuntimeError("solver worker died")
+    monkeypatch.setattr(main.repair_agent, "run", crash)
+
+    with pytest.raises(HTTPException):
+        repair(REQUEST)
+
+    assert main.data_store == stored
+
+
+def test_repair_receives_updated_copies(stored, monkeypatch):
+    received = {}
+
+    async def fail(input_data):
+        received.update(input_data)
+        return AgentResult(success=False, data={}, message="no room left")
+    monkeypatch.setattr(main.repair_agent, "run", fail)
+
+    with pytest.raises(HTTPException):
+        repair(REQUEST)
+
+    assert received["faculty"][0].unavailable_slots == [MONDAY_NINE]
+    assert [c.id for c in received["classrooms"]] == ["R1"]
+    assert received["classrooms"][0].unavailable_slots == [MONDAY_NINE]
+    assert main.data_store["faculty"][0].unavailable_slots == []
+
+
+def test_successful_repair_stores_the_changes(stored, monkeypatch):
+    repaired = [{"faculty_id": "F1", "classroom_id": "R1", "day": "Tuesday",
+                 "start_time": "09:00", "end_time": "10:00"}]
+
+    async def succeed(input_data):
+        return AgentResult(success=True, message="Repaired 1 entry", data={
+            "schedule_entries": repaired, "changes": [], "unscheduled": []
+        })
+    monkeypatch.setattr(main.repair_agent, "run", succeed)
+
+    response = repair(REQUEST)
+
+    assert response["success"]
+    assert main.data_store["faculty"][0].unavailable_slots == [MONDAY_NINE]
+    assert [c.id for c in main.data_store["classrooms"]] == ["R1"]
+    assert main.data_store["timetables"][0]["schedule"] == repaired
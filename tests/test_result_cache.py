@@ -0,0 +1,61 @@
+"""Tests for the two-tier result cache."""
+import asyncio
+import os
+import time
+
+from services.result_cache import ResultCache
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    ResultCache(disk_dir=str(tmp_path)).put("a", {"value": 1})
+
+    cache = ResultCache(disk_dir=str(tmp_path))
+
+    assert asyncio.run(cache.aget("a")) == {"value": 1}
+    assert cache.get("missing") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_oldest_files_are_pruned_beyond_the_disk_limit(tmp_path):
+    cache = ResultCache(max_entries=1, disk_dir=str(tmp_path), max_disk_entries=2)
+
+    for key in "abc":
+        asyncio.run(cache.aput(key, key))
+
+    assert sorted(os.listdir(tmp_path)) == ["b.json", "c.json"]
+    assert cache.get("a") is None
+    assert cache.get("b") == "b"
+
+
+def test_expired_files_are_deleted(tmp_path):
+    ResultCache(disk_dir=str(tmp_path)).put("old", "value")
+    stale = time.time() - 120
+    os.utime(tmp_path / "old.json", (stale, stale))
+
+    cache = ResultCache(disk_dir=str(tmp_path), ttl=60)
+
+    assert cache.get("old") is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_stored_timetable_does_not_share_the_cached_result(monkeypatch):
+    import main
+
+    monkeypatch.setitem(main.data_store, "timetables", [])
+    cache = ResultCache()
+    result = {
+        "schedule": [{"day": "Monday", "start_time": "09:00", "end_time": "10:00"}],
+        "unscheduled": [],
+        "validation": {"violations": []},
+        "constraints_satisfied": True,
+        "optimization_score": 1.0,
+    }
+    cache.put("key", result)
+    request_data = main.GenerateTimetableRequest(academic_year="2026", semester=1)
+
+    timetable = main._store_timetable(request_data, cache.get("key"))
+    timetable["schedule"][0]["day"] = "Friday"
+    timetable["validation_results"]["violations"].append("edited")
+
+    assert cache.get("key")["schedule"][0]["day"] == "Monday"
+    assert cache.get("key")["validation"]["violations"] == []
@@ -0,0 +1,126 @@
+"""Tests for compiling constraint parameters into scheduling rules."""
+from agents.problem import generate_time_slots
+from agents.rules import RuleSet
+
+GRID = generate_time_slots()
+
+
+def constraint(name: str, constraint_type: str = "hard", priority: int = 1, **parameters) -> dict:
+    return {
+        "id": name,
+        "name": name,
+        "constraint_type": constraint_type,
+        "priority": priority,
+        "parameters": parameters,
+    }
+
+
+def slots_where(predicate) -> int:
+    mask = 0
+    for i, time_slot in enumerate(GRID):
+        if predicate(time_slot):
+            mask |= 1 << i
+    return mask
+
+
+def entry(day: str, start_time: str, end_time: str, **resources) -> dict:
+    return {
+        "day": day,
+        "start_time": start_time,
+        "end_time": end_time,
+        **{kind: {"id": resource_id} for kind, resource_id in resources.items()},
+    }
+
+
+def test_hard_window_rules_compile_to_slot_masks():
+    rules = RuleSet([
+        constraint("late start", rule="not_before", faculty="F1", time="10:00"),
+        constraint("early finish", rule="not_after", faculty=["F1", "F2"], time="16:00"),
+        constraint("no friday", rule="not_on", subject="*", days="Friday"),
+    ])
+
+    faculty_masks = rules.slot_masks("faculty", ["F1", "F2", "F3"], GRID)
+    subject_masks = rules.slot_masks("subject", ["MATH"], GRID)
+
+    assert rules.errors == []
+    assert faculty_masks == {
+        "F1": slots_where(lambda s: s["start_time"] in ("09:00", "16:00")),
+        "F2": slots_where(lambda s: s["start_time"] == "16:00"),
+    }
+    assert subject_masks == {"MATH": slots_where(lambda s: s["day"] == "Friday")}
+
+
+def test_soft_window_rules_are_penalties_not_blocks():
+    rules = RuleSet([
+        constraint("prefer late", "soft", 3, rule="not_before", section="S1", time="10:00"),
+    ])
+
+    penalties = rules.slot_penalties("section", ["S1", "S2"], GRID)
+
+    assert rules.slot_masks("section", ["S1"], GRID) == {}
+    assert list(penalties) == ["S1"]
+    assert penalties["S1"] == [3.0 if s["start_time"] == "09:00" else 0.0 for s in GRID]
+
+
+def test_malformed_rules_are_listed_and_descriptive_constraints_ignored():
+    rules = RuleSet([
+        constraint("descriptive", description="Keep Fridays light"),
+        constraint("typo", rule="not_befor", faculty="F1", time="10:00"),
+        constraint("two targets", rule="not_on", faculty="F1", section="S1", days=["Monday"]),
+        constraint("subject run", rule="max_consecutive", subject="MATH", hours=2),
+        constraint("no time", rule="not_after", classroom="R1"),
+        constraint("valid", rule="not_on", classroom="R1", days=["Monday"]),
+    ])
+
+    assert [rule.name for rule in rules.rules] == ["valid"]
+    assert [error.split(":")[1].strip() for error in rules.errors] == [
+        "typo", "two targets", "subject run", "no time"
+    ]
+
+
+def test_entry_violations_name_the_resource_and_slot():
+    rules = RuleSet([
+        constraint("late start", rule="not_before", faculty="F1", time="10:00"),
+        constraint("labs", rule="lab_rooms"),
+    ])
+    early = entry("Monday", "09:00", "10:00", faculty="F1", section="S1", classroom="R1")
+    later = entry("Monday", "10:00", "11:00", faculty="F1", section="S1", classroom="R1")
+    lab = {**later, "subject": {"id": "CHEM", "requires_lab": True}}
+
+    broken = rules.entry_violations(early)
+
+    assert [item[0].name for item in broken] == ["late start"]
+    assert "F1" in broken[0][1] and "Monday_09:00_10:00" in broken[0][1]
+    assert rules.entry_violations(later) == []
+    assert [item[0].name for item in rules.entry_violations(lab)] == ["labs"]
+    assert "CHEM" in rules.entry_violations(lab)[0][1]
+
+
+def test_max_consecutive_flags_only_runs_over_the_limit():
+    rules = RuleSet([constraint("two hours", rule="max_consecutive", section="S1", hours=2)])
+    entries = [
+        entry("Monday", "09:00", "10:00", section="S1"),
+        entry("Monday", "10:00", "11:00", section="S1"),
+        entry("Tuesday", "09:00", "10:00", section="S1"),
+        entry("Tuesday", "10:00", "11:00", section="S1"),
+        entry("Tuesday", "11:00", "12:00", section="S1"),
+        entry("Tuesday", "11:00", "12:00", section="S2"),
+    ]
+
+    broken = rules.schedule_violations(entries)
+
+    assert len(broken) == 1
+    assert broken[0][0].name == "two hours"
+    assert "S1" in broken[0][1] and "Tuesday" in broken[0][1]
+
+
+def test_max_consecutive_keeps_fractional_hours():
+    rules = RuleSet([constraint("ninety minutes", rule="max_consecutive", section="S1", hours=1.5)])
+    entries = [
+        entry("Monday", "09:00", "10:00", section="S1"),
+        entry("Monday", "10:00", "11:00", section="S1"),
+    ]
+
+    assert rules.rules[0].limit == 90
+    assert len(rules.schedule_violations(entries)) == 1
+    assert rules.schedule_violations(entries[:1]) == []
@@ -0,0 +1,79 @@
+"""Tests for the soft-constraint scoring terms."""
+from agents.optimizer_agent import ScheduleOptimizer
+from agents.problem import SchedulingProblem, generate_time_slots
+from agents.scoring import ScheduleScorer, penalty_score
+from tests.test_optimizer_agent import CLASSROOMS, FACULTY, SECTIONS, SUBJECTS, first_fit
+
+MATH = {"id": "MATH", "name": "Math", "credits": 4}
+PHYS = {"id": "PHYS", "name": "Physics", "credits": 4}
+ART = {"id": "ART", "name": "Art", "credits": 2}
+S1 = {"id": "S1", "num_students": 30}
+S2 = {"id": "S2", "num_students": 40}
+R1 = {"id": "R1", "capacity": 40}
+R2 = {"id": "R2", "capacity": 80}
+
+
+def entry(faculty_id: str, section: dict, subject: dict, classroom: dict, start: int) -> dict:
+    return {
+        "day": "Monday",
+        "start_time": f"{start:02d}:00",
+        "end_time": f"{start + 1:02d}:00",
+        "faculty": {"id": faculty_id},
+        "section": section,
+        "subject": subject,
+        "classroom": classroom,
+    }
+
+
+def test_terms_of_a_hand_built_schedule():
+    entries = [
+        entry("F1", S1, MATH, R1, 9),
+        # One idle hour before this class, and a second Math class that day
+        entry("F1", S1, MATH, R1, 11),
+        # Across the lunch break: no gap, but two heavy subjects back to back
+        entry("F1", S1, PHYS, R1, 13),
+        # In the last two periods of the day
+        entry("F2", S2, ART, R2, 15),
+    ]
+
+    result = ScheduleScorer().score(entries)
+
+    assert result["terms"] == {
+        "faculty_gaps": 1.0,
+        "section_gaps": 1.0,
+        "subject_clustering": 1.0,
+        "heavy_back_to_back": 1.0,
+        "room_waste": 1.25,
+        "late_day": 1.0,
+        "custom_rules": 0.0,
+    }
+    assert result["penalty"] == 6.125
+    assert result["weighted"]["subject_clustering"] == 2.0
+    assert result["score"] == penalty_score(6.125, 4)
+
+
+def test_weights_can_be_overridden_per_term():
+    entries = [entry("F1", S1, MATH, R1, 9), entry("F1", S1, ART, R1, 11)]
+
+    result = ScheduleScorer(weights={"faculty_gaps": 0.0, "section_gaps": 3.0}).score(entries)
+
+    assert result["weighted"]["faculty_gaps"] == 0.0
+    assert result["weighted"]["section_gaps"] == 3.0
+    assert result["penalty"] == 3.25
+
+
+def test_a_schedule_without_penalties_scores_100():
+    entries = [entry("F1", S2, ART, R1, 9), entry("F2", S2, MATH, R1, 10)]
+
+    assert ScheduleScorer().score(entries)["score"] == 100.0
+
+
+def test_scorer_agrees_with_the_optimizer_objective():
+    problem = SchedulingProblem(SECTIONS, SUBJECTS, FACULTY, CLASSROOMS, generate_time_slots())
+    optimizer = ScheduleOptimizer(problem, first_fit(), seed=3)
+    optimizer.run(time_limit=10.0, max_iterations=500)
+    placements, cost = optimizer.best()
+
+    result = ScheduleScorer().score([problem.entry_for(p) for p in placements])
+
+    assert result["penalty"] == round(cost, 3)
@@ -0,0 +1,69 @@
+"""End-to-end tests for timetable generation on the sample data."""
+import asyncio
+import csv
+from pathlib import Path
+
+import pytest
+
+from agents.constraint_agent import ConstraintAgent
+from agents.timetable_agent import TimetableAgent
+from models import Classroom, Faculty, Section, Subject
+
+SAMPLE_DATA = Path(__file__).resolve().parent.parent / "sample_data"
+
+
+def load(name: str, model, lists=(), flags=()):
+    with open(SAMPLE_DATA / f"{name}.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        for field in lists:
+            row[field] = [item for item in row[field].split(";") if item]
+        for field in flags:
+            row[field] = row[field].lower() == "true"
+    return [model(**row) for row in rows]
+
+
+@pytest.fixture(scope="module")
+def problem():
+    return {
+        "sections": load("sections", Section, lists=("subjects",)),
+        "subjects": load("subjects", Subject, flags=("requires_lab", "is_elective")),
+        "faculty": load("faculty", Faculty, lists=("subjects_can_teach",)),
+        "classrooms": load("classrooms", Classroom, lists=("facilities",)),
+    }
+
+
+@pytest.mark.parametrize("solver", ["greedy", "exact"])
+def test_generated_schedule_has_no_conflicts(problem, solver):
+    result = asyncio.run(TimetableAgent().execute({**problem, "solver": solver, "time_limit": 20}))
+
+    assert result.success, result.message
+    entries = result.data["schedule_entries"]
+    assert entries
+    validation = asyncio.run(ConstraintAgent().execute({
+        "schedule_entries": entries,
+        "faculty": problem["faculty"],
+        "classrooms": problem["classrooms"],
+    }))
+    conflicts = {code: count for code, count in validation.data["violation_counts"].items()
+                 if code.endswith("_conflict")}
+    assert conflicts == {}
+
+
+def test_exact_time_limit_default_only_applies_to_exact_solves(problem, monkeypatch):
+    from agents import timetable_agent
+
+    payloads = []
+    run = timetable_agent.solver_service.run
+
+    async def record(func, payload):
+        payloads.append(payload)
+        return await run(func, payload)
+    monkeypatch.setattr(timetable_agent.solver_service, "run", record)
+
+    for solver in ("greedy", "exact"):
+        result = asyncio.run(TimetableAgent().execute({**problem, "solver": solver}))
+        assert result.success, result.message
+
+    assert payloads[0]["time_limit"] is None
+    assert payloads[-1]["time_limit"] is not None